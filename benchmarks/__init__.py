@@ -0,0 +1,4 @@
+"""Reproducible benchmarks of the data pipeline, training and inference.
+
+Run ``python -m benchmarks --help`` for the available options.
+"""
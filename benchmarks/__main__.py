@@ -0,0 +1,166 @@
+"""Run the benchmarks, e.g. `python -m benchmarks --output result.json`.
+
+Compare two result files with
+`python -m benchmarks --compare baseline.json result.json`.
+"""
+import argparse
+import platform
+import sys
+from datetime import datetime
+from json import dumps, loads
+from os import cpu_count
+from . import environment
+
+BENCHMARK_NAMES = [
+    "image_to_numpy_array",
+    "batch_generator",
+    "training_block",
+    "model_serialization",
+    "inference",
+    "dataset_import",
+    "training_under_load",
+    "cpu_budget",
+]
+
+
+def _parse_arguments(arguments):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark data pipeline, training and inference.",
+    )
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--resolution", type=int, default=128)
+    parser.add_argument("--input-size", type=int, default=64)
+    parser.add_argument("--labels", type=int, default=4)
+    parser.add_argument("--filters", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--batches", type=int, default=20)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--inference-images", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--clients",
+        type=int,
+        default=4,
+        help="Page requesting threads of training_under_load.",
+    )
+    parser.add_argument(
+        "--training-processes",
+        type=int,
+        default=1,
+        help="Concurrent trainings of training_under_load and cpu_budget.",
+    )
+    parser.add_argument(
+        "--load-blocks",
+        type=int,
+        default=3,
+        help="Training blocks per training of training_under_load and "
+        "cpu_budget.",
+    )
+    parser.add_argument(
+        "--decode-cpus",
+        type=int,
+        default=2,
+        help="Decode CPUs per training process of cpu_budget.",
+    )
+    parser.add_argument(
+        "--idle-seconds",
+        type=float,
+        default=5,
+        help="Duration of the page traffic before training starts.",
+    )
+    parser.add_argument(
+        "--packed",
+        action="store_true",
+        help="Store the synthetic dataset in shards.",
+    )
+    parser.add_argument(
+        "--thumbnails",
+        action="store_true",
+        help="Store thumbnails with the synthetic dataset.",
+    )
+    parser.add_argument("--only", nargs="+", choices=BENCHMARK_NAMES)
+    parser.add_argument("--output", help="Write the results to this file.")
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("BASELINE", "CURRENT"),
+        help="Compare two result files instead of running benchmarks.",
+    )
+    return parser.parse_args(arguments)
+
+
+def _flatten(dictionary: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in dictionary.items():
+        name = prefix + str(key)
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(baseline_path: str, current_path: str) -> str:
+    """Get a table of the relative changes of all numeric results."""
+    with open(baseline_path) as f:
+        baseline = _flatten(loads(f.read())["results"])
+    with open(current_path) as f:
+        current = _flatten(loads(f.read())["results"])
+    lines = []
+    for name in sorted(baseline.keys() & current.keys()):
+        change = ""
+        if baseline[name] != 0:
+            change = "{:+.1%}".format(current[name] / baseline[name] - 1)
+        lines.append(
+            "{:<70} {:>14.4f} {:>14.4f} {:>8}".format(
+                name, baseline[name], current[name], change
+            )
+        )
+    return "\n".join(lines)
+
+
+def run(options) -> dict:
+    """Run the selected benchmarks in a fresh environment."""
+    environment.setup()
+    try:
+        # models can only be imported after django.setup()
+        from .suite import BENCHMARKS, BenchmarkContext
+
+        context = BenchmarkContext(options)
+        results = {}
+        for name in options.only or BENCHMARK_NAMES:
+            print("Running {}".format(name), file=sys.stderr)
+            results[name] = BENCHMARKS[name](context)
+    finally:
+        environment.teardown()
+
+    return {
+        "meta": {
+            "date": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": cpu_count(),
+            "options": vars(options),
+        },
+        "results": results,
+    }
+
+
+def main(arguments=None):
+    options = _parse_arguments(arguments)
+    if options.compare:
+        print(compare(*options.compare))
+        return
+
+    result_json = dumps(run(options), indent=2)
+    if options.output:
+        with open(options.output, "w") as f:
+            f.write(result_json)
+    else:
+        print(result_json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Step times of concurrent trainings with and without CPU budgets.
+
+The training processes run blocks at the same time, first unpinned, with
+TensorFlow and the decode workers of all processes on all cores, then
+with the CPUs split by schoolnn.training.cpu_budget. The spread of the
+step times shows how much decoding and other trainings disturb the fit.
+"""
+from statistics import median, pstdev
+from typing import List
+from schoolnn.models import TrainingPass, TrainingStepMetrics
+from schoolnn.training.cpu_budget import available_cpus, cpu_budgets
+from .load import _SPAWN, _percentile, _train
+
+
+def _step_statistics(training_passes: List[TrainingPass]) -> dict:
+    step_milliseconds = [
+        step_metrics.performance_dict["step_milliseconds"]
+        for step_metrics in TrainingStepMetrics.objects.filter(
+            training_pass__in=training_passes
+        )
+    ]
+    return {
+        "blocks": len(step_milliseconds),
+        "median_step_milliseconds": median(step_milliseconds),
+        "stdev_step_milliseconds": pstdev(step_milliseconds),
+        "p95_step_milliseconds": _percentile(step_milliseconds, 95),
+        "max_step_milliseconds": max(step_milliseconds),
+    }
+
+
+def benchmark_cpu_budget(context) -> dict:
+    """Measure step times of unpinned and pinned concurrent trainings."""
+    options = context.options
+    cpus = available_cpus()
+    process_count = options.training_processes
+    budgets = {
+        "unpinned": [None] * process_count,
+        "pinned": cpu_budgets(cpus, process_count, options.decode_cpus),
+    }
+    result = {
+        "cpus": len(cpus),
+        "training_processes": process_count,
+        "decode_cpus": options.decode_cpus,
+    }
+    for name, process_budgets in budgets.items():
+        training_passes = [
+            context.new_training_pass() for _ in range(process_count)
+        ]
+        processes = [
+            _SPAWN.Process(
+                target=_train,
+                args=(
+                    training_pass.id,
+                    context.image_dimensions,
+                    options.load_blocks,
+                    budget,
+                ),
+            )
+            for training_pass, budget in zip(training_passes, process_budgets)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        result[name] = {
+            **_step_statistics(training_passes),
+            "training_failures": sum(
+                process.exitcode != 0 for process in processes
+            ),
+        }
+    return result
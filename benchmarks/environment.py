@@ -0,0 +1,58 @@
+"""Set up a throwaway Django environment for benchmarking."""
+import shutil
+import django
+from dotenv import load_dotenv
+from os import environ, path, remove, makedirs
+from uuid import uuid4
+from django.core.management import call_command
+
+BENCHMARK_STORAGE = "/tmp/schoolnnbenchmark-{}".format(uuid4().hex)
+BENCHMARK_DATABASE = "/tmp/schoolnn-benchmark-{}.sqlite3".format(uuid4().hex)
+
+# Name of the configured PostgreSQL database, None for SQLite
+_postgresql_database_name = None
+
+
+def setup():
+    """Migrate a fresh database, must run before importing models.
+
+    With PostgreSQL a throwaway test_<DATABASE_NAME> database is created.
+    """
+    global _postgresql_database_name
+    environ.setdefault("DJANGO_SETTINGS_MODULE", "schoolnn_app.settings")
+    environ.setdefault("SECRET_KEY", "benchmark")
+    environ["STORAGE"] = BENCHMARK_STORAGE
+    environ["DATABASE"] = BENCHMARK_DATABASE
+    load_dotenv()
+    django.setup()
+
+    from django.db import connection
+
+    if connection.vendor == "postgresql":
+        _postgresql_database_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        # Inherited by worker processes
+        environ["DATABASE_NAME"] = connection.settings_dict["NAME"]
+    else:
+        call_command("migrate", verbosity=0)
+    makedirs(BENCHMARK_STORAGE, exist_ok=True)
+
+
+def setup_worker():
+    """Use the environment of the benchmark in a spawned process."""
+    django.setup()
+
+
+def teardown():
+    """Remove database and storage."""
+    if _postgresql_database_name is not None:
+        from django.db import connection
+
+        connection.creation.destroy_test_db(
+            _postgresql_database_name, verbosity=0
+        )
+    elif path.exists(BENCHMARK_DATABASE):
+        remove(BENCHMARK_DATABASE)
+    shutil.rmtree(BENCHMARK_STORAGE)
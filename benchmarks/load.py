@@ -0,0 +1,172 @@
+"""Page latency while training blocks write to the same database.
+
+Client threads request the pages teachers look at during a training, first
+without training (idle) and then while training processes run blocks and
+save the model weights after each block. Lock contention between these
+writes and the page queries shows up as latency and failed requests.
+"""
+import multiprocessing
+from statistics import median
+from threading import Event, Thread
+from time import perf_counter, sleep
+from typing import Callable, List, Tuple
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+from . import environment
+
+# Training processes are spawned, forking after TensorFlow started hangs
+_SPAWN = multiprocessing.get_context("spawn")
+
+
+def _train(
+    training_pass_id: int, image_dimensions, block_count: int, budget=None
+):
+    environment.setup_worker()
+    from schoolnn.models import TrainingPass
+    from schoolnn.training.cpu_budget import apply_budget
+    from schoolnn.training.batch_generator import (
+        BatchGeneratorTraining,
+        BatchGeneratorValidation,
+    )
+    from schoolnn.training.do_training_block import do_training_block
+    from schoolnn.training.load_dataset import (
+        get_training_and_validation_images,
+    )
+
+    if budget is not None:
+        apply_budget(budget)
+    training_pass = TrainingPass.objects.get(pk=training_pass_id)
+    training_images, validation_images = get_training_and_validation_images(
+        training_pass
+    )
+    training_generator = BatchGeneratorTraining(
+        image_list=training_images,
+        training_pass=training_pass,
+        image_dimensions=image_dimensions,
+    )
+    validation_generator = BatchGeneratorValidation(
+        image_list=validation_images,
+        training_pass=training_pass,
+        image_dimensions=image_dimensions,
+    )
+    for _ in range(block_count):
+        do_training_block(
+            training_pass_to_continue=training_pass,
+            training_generator=training_generator,
+            validation_generator=validation_generator,
+        )
+    training_generator.close()
+    validation_generator.close()
+
+
+def _percentile(values: List[float], percent: int) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, len(ordered) * percent // 100)]
+
+
+class _PageTraffic:
+    """Client threads requesting pages until stopped."""
+
+    def __init__(self, user, urls: List[str], clients: int):
+        """Prepare one logged in client per thread."""
+        self.urls = urls
+        self.clients = []
+        for _ in range(clients):
+            client = Client()
+            client.force_login(user)
+            self.clients.append(client)
+        # Pairs of milliseconds and failure, appended by all threads
+        self.requests: List[Tuple[float, bool]] = []
+        self._stop = Event()
+
+    def _request_loop(self, client: Client):
+        i = 0
+        while not self._stop.is_set():
+            start = perf_counter()
+            try:
+                response = client.get(self.urls[i % len(self.urls)])
+                failed = response.status_code != 200
+            except Exception:
+                failed = True
+            self.requests.append((1000 * (perf_counter() - start), failed))
+            i += 1
+        connections.close_all()
+
+    def run_while(self, keep_running: Callable[[], bool]) -> dict:
+        """Request pages as long as keep_running is true."""
+        self.requests = []
+        self._stop.clear()
+        threads = [
+            Thread(target=self._request_loop, args=(client,))
+            for client in self.clients
+        ]
+        start = perf_counter()
+        for thread in threads:
+            thread.start()
+        while keep_running():
+            sleep(0.1)
+        self._stop.set()
+        for thread in threads:
+            thread.join()
+        seconds = perf_counter() - start
+
+        milliseconds = [request[0] for request in self.requests]
+        return {
+            "requests": len(milliseconds),
+            "errors": sum(request[1] for request in self.requests),
+            "requests_per_second": len(milliseconds) / seconds,
+            "median_milliseconds": median(milliseconds),
+            "p95_milliseconds": _percentile(milliseconds, 95),
+            "max_milliseconds": max(milliseconds),
+        }
+
+
+def benchmark_training_under_load(context) -> dict:
+    """Measure page latency without and during training."""
+    options = context.options
+    project = context.project
+    training_passes = [
+        context.new_training_pass() for _ in range(options.training_processes)
+    ]
+    urls = [
+        "/dataset/",
+        "/project/{}/training".format(project.id),
+        "/project/{}/training/compare".format(project.id),
+        "/project/{}/training/{}".format(project.id, training_passes[0].id),
+    ]
+
+    with override_settings(ALLOWED_HOSTS=["testserver"]):
+        traffic = _PageTraffic(context.user, urls, options.clients)
+        idle_end = perf_counter() + options.idle_seconds
+        idle = traffic.run_while(lambda: perf_counter() < idle_end)
+
+        processes = [
+            _SPAWN.Process(
+                target=_train,
+                args=(
+                    training_pass.id,
+                    context.image_dimensions,
+                    options.load_blocks,
+                ),
+            )
+            for training_pass in training_passes
+        ]
+        for process in processes:
+            process.start()
+        training = traffic.run_while(
+            lambda: any(process.is_alive() for process in processes)
+        )
+        for process in processes:
+            process.join()
+
+    return {
+        "database": connections["default"].vendor,
+        "clients": options.clients,
+        "training_processes": options.training_processes,
+        "training_failures": sum(
+            process.exitcode != 0 for process in processes
+        ),
+        "idle": idle,
+        "training": training,
+    }
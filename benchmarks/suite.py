@@ -0,0 +1,241 @@
+"""The benchmarks, every benchmark returns a json dumpable dictionary."""
+from io import BytesIO
+from statistics import mean, median
+from time import perf_counter
+from typing import Callable, Dict, List
+from uuid import uuid4
+from schoolnn.dataset import zip_to_full_dataset
+from schoolnn.models import (
+    Dataset,
+    Image,
+    TrainingPass,
+    TrainingStepMetrics,
+    User,
+)
+from schoolnn.training.batch_generator import (
+    BatchGeneratorTraining,
+    BatchGeneratorValidation,
+    image_to_numpy_array,
+)
+from schoolnn.training.do_training_block import (
+    bytes_to_keras_model,
+    do_training_block,
+    keras_model_to_bytes,
+)
+from schoolnn.training.inference import infere_images
+from schoolnn.training.load_dataset import get_training_and_validation_images
+from schoolnn.training.training_management import _initialize_training_pass
+from .cpu import benchmark_cpu_budget
+from .load import benchmark_training_under_load
+from .synthetic import synthetic_dataset, synthetic_project, synthetic_zip
+
+
+def _summary(seconds: List[float]) -> dict:
+    return {
+        "repeat": len(seconds),
+        "mean_seconds": mean(seconds),
+        "median_seconds": median(seconds),
+        "min_seconds": min(seconds),
+        "max_seconds": max(seconds),
+    }
+
+
+class BenchmarkContext:
+    """Synthetic dataset, project and training pass shared by benchmarks."""
+
+    def __init__(self, options):
+        """Generate the synthetic dataset described by the options."""
+        self.options = options
+        self.user = User.objects.create(username=uuid4().hex)
+        self.dataset = synthetic_dataset(
+            user=self.user,
+            image_count=options.images,
+            resolution=options.resolution,
+            label_count=options.labels,
+            seed=options.seed,
+            packed=options.packed,
+            thumbnails=options.thumbnails,
+        )
+        self.project = synthetic_project(
+            dataset=self.dataset,
+            input_size=options.input_size,
+            filters=options.filters,
+        )
+        training_parameter = self.project.training_parameter
+        training_parameter.batch_size = options.batch_size
+        self.project.training_parameter = training_parameter
+        self.project.save()
+
+    @property
+    def image_dimensions(self):
+        return (self.options.input_size, self.options.input_size)
+
+    def new_training_pass(self) -> TrainingPass:
+        """Get a freshly initialized training pass."""
+        return _initialize_training_pass(
+            project=self.project, training_pass_name="benchmark"
+        )
+
+    def image_list(self) -> List[Image]:
+        return list(Image.objects.filter(dataset=self.dataset))
+
+
+def benchmark_image_to_numpy_array(context: BenchmarkContext) -> dict:
+    """Decode and resize single images from the storage."""
+    sources = [image.source for image in context.image_list()]
+    start = perf_counter()
+    for source in sources:
+        image_to_numpy_array(
+            source, target_dimensions=context.image_dimensions
+        )
+    seconds = perf_counter() - start
+    return {
+        "images": len(sources),
+        "seconds": seconds,
+        "images_per_second": len(sources) / seconds,
+    }
+
+
+def benchmark_batch_generator(context: BenchmarkContext) -> dict:
+    """Yield training batches with different numbers of processes."""
+    training_pass = context.new_training_pass()
+    training_images, _ = get_training_and_validation_images(training_pass)
+    batch_count = context.options.batches
+    result = {}
+    for processes_count in context.options.processes:
+        generator = BatchGeneratorTraining(
+            image_list=training_images,
+            training_pass=training_pass,
+            image_dimensions=context.image_dimensions,
+            processes_count=processes_count,
+        )
+        start = perf_counter()
+        generator.reset_batch_count(batch_count)
+        for _ in generator:
+            pass
+        seconds = perf_counter() - start
+        generator.close()
+        result[str(processes_count)] = {
+            "batches": batch_count,
+            "seconds": seconds,
+            "batches_per_second": batch_count / seconds,
+            "data_wait_seconds": generator.data_wait_seconds,
+        }
+    return result
+
+
+def benchmark_training_block(context: BenchmarkContext) -> dict:
+    """Run whole training blocks including validation and saving."""
+    training_pass = context.new_training_pass()
+    training_images, validation_images = get_training_and_validation_images(
+        training_pass
+    )
+    training_generator = BatchGeneratorTraining(
+        image_list=training_images,
+        training_pass=training_pass,
+        image_dimensions=context.image_dimensions,
+    )
+    validation_generator = BatchGeneratorValidation(
+        image_list=validation_images,
+        training_pass=training_pass,
+        image_dimensions=context.image_dimensions,
+    )
+    seconds = []
+    for _ in range(context.options.repeat):
+        start = perf_counter()
+        do_training_block(
+            training_pass_to_continue=training_pass,
+            training_generator=training_generator,
+            validation_generator=validation_generator,
+        )
+        seconds.append(perf_counter() - start)
+    training_generator.close()
+    validation_generator.close()
+
+    last_metrics = (
+        TrainingStepMetrics.objects.filter(training_pass=training_pass)
+        .order_by("-id")
+        .first()
+    )
+    return {
+        **_summary(seconds),
+        "last_block_performance": last_metrics.performance_dict,
+    }
+
+
+def benchmark_model_serialization(context: BenchmarkContext) -> dict:
+    """Convert the keras model from and to bytes."""
+    model_bytes = context.new_training_pass().checkpoint
+    model = bytes_to_keras_model(model_bytes)
+    to_bytes_seconds = []
+    from_bytes_seconds = []
+    for _ in range(context.options.repeat):
+        start = perf_counter()
+        keras_model_to_bytes(model)
+        to_bytes_seconds.append(perf_counter() - start)
+        start = perf_counter()
+        bytes_to_keras_model(model_bytes)
+        from_bytes_seconds.append(perf_counter() - start)
+    return {
+        "model_bytes": len(model_bytes),
+        "keras_model_to_bytes": _summary(to_bytes_seconds),
+        "bytes_to_keras_model": _summary(from_bytes_seconds),
+    }
+
+
+def benchmark_inference(context: BenchmarkContext) -> dict:
+    """Classify images with and without Grad-CAM heatmap."""
+    training_pass = context.new_training_pass()
+    images = context.image_list()[: context.options.inference_images]
+    images_binary = [image.read_bytes() for image in images]
+    result = {}
+    for with_heatmap in [False, True]:
+        seconds = []
+        for _ in range(context.options.repeat):
+            start = perf_counter()
+            infere_images(
+                training_pass=training_pass,
+                images=[BytesIO(b) for b in images_binary],
+                with_heatmap=with_heatmap,
+            )
+            seconds.append(perf_counter() - start)
+        key = "with_grad_cam" if with_heatmap else "without_grad_cam"
+        result[key] = {
+            "images": len(images_binary),
+            "images_per_second": len(images_binary) / median(seconds),
+            **_summary(seconds),
+        }
+    return result
+
+
+def benchmark_dataset_import(context: BenchmarkContext) -> dict:
+    """Import a zip file as uploaded by teachers."""
+    options = context.options
+    zip_binary = synthetic_zip(
+        image_count=options.images,
+        resolution=options.resolution,
+        label_count=options.labels,
+        seed=options.seed,
+    )
+    dataset = Dataset.objects.create(name="import", user=context.user)
+    start = perf_counter()
+    zip_to_full_dataset(zip_binary, dataset)
+    seconds = perf_counter() - start
+    return {
+        "images": options.images,
+        "zip_bytes": len(zip_binary.getvalue()),
+        "seconds": seconds,
+        "images_per_second": options.images / seconds,
+    }
+
+
+BENCHMARKS: Dict[str, Callable[[BenchmarkContext], dict]] = {
+    "image_to_numpy_array": benchmark_image_to_numpy_array,
+    "batch_generator": benchmark_batch_generator,
+    "training_block": benchmark_training_block,
+    "model_serialization": benchmark_model_serialization,
+    "inference": benchmark_inference,
+    "dataset_import": benchmark_dataset_import,
+    "training_under_load": benchmark_training_under_load,
+    "cpu_budget": benchmark_cpu_budget,
+}
@@ -0,0 +1,143 @@
+"""Generate synthetic datasets of configurable size and resolution."""
+from contextlib import ExitStack
+from io import BytesIO
+from os import makedirs
+from typing import Iterator, Tuple
+from uuid import uuid4
+from zipfile import ZipFile
+from numpy import random, uint8
+from PIL import Image as PillowImage
+from schoolnn.models import (
+    Architecture,
+    Dataset,
+    Image,
+    Label,
+    Project,
+    User,
+)
+from schoolnn.shards import ShardWriter
+from schoolnn.thumbnails import THUMBNAIL_SIZES, image_dir, thumbnail_jpegs
+
+
+def synthetic_images(
+    image_count: int,
+    resolution: int,
+    label_count: int,
+    seed: int = 0,
+) -> Iterator[Tuple[int, bytes]]:
+    """Yield label index and jpeg bytes, every label has its own tint."""
+    random_state = random.RandomState(seed)
+    tints = random_state.randint(0, 256, size=(label_count, 3))
+    for i in range(image_count):
+        label_index = i % label_count
+        noise = random_state.randint(-64, 64, size=(resolution, resolution, 3))
+        pixels = (tints[label_index] + noise).clip(0, 255).astype(uint8)
+        jpeg = BytesIO()
+        PillowImage.fromarray(pixels).save(jpeg, format="JPEG")
+        yield label_index, jpeg.getvalue()
+
+
+def synthetic_zip(
+    image_count: int,
+    resolution: int,
+    label_count: int,
+    seed: int = 0,
+) -> BytesIO:
+    """Get a zip file as uploaded by teachers, one folder per label."""
+    zip_binary = BytesIO()
+    with ZipFile(zip_binary, "w") as zip_file:
+        images = synthetic_images(image_count, resolution, label_count, seed)
+        for i, (label_index, jpeg) in enumerate(images):
+            zip_file.writestr(
+                "label{}/{:08}.jpg".format(label_index, i),
+                jpeg,
+            )
+    zip_binary.seek(0)
+    return zip_binary
+
+
+def synthetic_dataset(
+    user: User,
+    image_count: int,
+    resolution: int,
+    label_count: int,
+    seed: int = 0,
+    packed: bool = False,
+    thumbnails: bool = False,
+) -> Dataset:
+    """Create a dataset with images in the database and the storage."""
+    dataset = Dataset.objects.create(
+        name=uuid4().hex[:15], user=user, packed=packed, thumbnails=thumbnails
+    )
+    makedirs(dataset.dir, exist_ok=True)
+    labels = [
+        Label.objects.create(dataset=dataset, name="label{}".format(i))
+        for i in range(label_count)
+    ]
+
+    sizes = [None] + (list(THUMBNAIL_SIZES) if thumbnails else [])
+    images = synthetic_images(image_count, resolution, label_count, seed)
+    with ExitStack() as stack:
+        shard_writers = {
+            size: stack.enter_context(
+                ShardWriter(image_dir(dataset.dir, size))
+            )
+            for size in (sizes if packed else [])
+        }
+        for label_index, jpeg in images:
+            image = Image.objects.create(
+                dataset=dataset, label=labels[label_index]
+            )
+            encoded = {None: jpeg}
+            if thumbnails:
+                encoded.update(
+                    thumbnail_jpegs(PillowImage.open(BytesIO(jpeg)))
+                )
+            for size, image_jpeg in encoded.items():
+                if packed:
+                    shard_writers[size].append(
+                        image.id, image.label_id, image_jpeg
+                    )
+                else:
+                    image.write_bytes(image_jpeg, size)
+
+    return dataset
+
+
+def synthetic_project(
+    dataset: Dataset, input_size: int, filters: int
+) -> Project:
+    """Create a project with a small convolutional architecture."""
+    architecture = Architecture.objects.create(
+        name=uuid4().hex[:15],
+        architecture_json=[
+            {"type": "Input", "shape": [input_size, input_size, 3]},
+            {
+                "type": "Conv2D",
+                "activation": "relu",
+                "filters": filters,
+                "strides": [1, 1],
+                "kernel_size": [3, 3],
+                "padding": "same",
+            },
+            {"type": "MaxPooling2D", "pool_size": [2, 2], "strides": [2, 2]},
+            {
+                "type": "Conv2D",
+                "activation": "relu",
+                "filters": filters,
+                "strides": [1, 1],
+                "kernel_size": [3, 3],
+                "padding": "same",
+            },
+            {"type": "MaxPooling2D", "pool_size": [2, 2], "strides": [2, 2]},
+            {"type": "Flatten"},
+            {"type": "Dense", "activation": "relu", "units": 32},
+        ],
+        user=dataset.user,
+    )
+    return Project.objects.create(
+        name=uuid4().hex[:15],
+        user=dataset.user,
+        dataset=dataset,
+        architecture=architecture,
+    )
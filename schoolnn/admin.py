@@ -3,6 +3,7 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.forms import UserCreationForm
 from schoolnn.models import User
 from schoolnn.models import Workspace
+from schoolnn.models import TrainingPass
 from django.contrib.auth.models import Group
 
 
@@ -26,6 +27,15 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class TrainingPassAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "project", "status", "profiling")
+    list_editable = ("profiling",)
+    list_filter = ("status", "profiling")
+    fields = ("name", "project", "status", "profiling")
+    readonly_fields = ("name", "project", "status")
+
+
 admin.site.register(User, UserAdmin)
 admin.site.register(Workspace)
+admin.site.register(TrainingPass, TrainingPassAdmin)
 admin.site.unregister(Group)
@@ -1,8 +1,24 @@
 """Manages TODO."""
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete
 
 
 class SchoolnnConfig(AppConfig):
     """Manages TODO."""
 
     name = "schoolnn"
+
+    def ready(self):
+        """Tune every new database connection, clean up unused files."""
+        from .contact_sheet import prune_sheets_when_relabeled
+        from .database import configure_sqlite
+        from .instrumentation import REGISTRY
+        from .labelling import images_relabeled
+        from .models import TrainingPass
+        from .models.models import delete_unused_weights
+
+        connection_created.connect(configure_sqlite)
+        post_delete.connect(delete_unused_weights, sender=TrainingPass)
+        images_relabeled.connect(prune_sheets_when_relabeled)
+        REGISTRY.retire_dead_snapshots()
@@ -0,0 +1,178 @@
+"""Contact sheets, many thumbnails of a dataset tiled into one JPEG.
+
+Image grids show the tiles of a few sheets as CSS sprites instead of
+requesting every image on its own. The images of a selection (a label or
+all unlabeled images) are ordered by id and split into pages of
+SHEET_IMAGE_COUNT images. A sheet is cached on disk under a key derived
+from its image ids, so it is rendered again once the image set changes.
+Sheets no longer matching a page are deleted after relabelling and
+imports.
+"""
+import os
+from collections import defaultdict
+from hashlib import sha1
+from io import BytesIO
+from typing import Dict, List, NamedTuple, Optional, Set
+from numpy import array, stack, uint8, zeros
+from PIL import Image as ImagePillow, ImageOps
+from .models import Dataset, Image, Label
+
+TILE_SIZE = 128
+SHEET_COLUMNS = 10
+SHEET_IMAGE_COUNT = 100
+UNLABELED = "unlabeled"
+
+
+class Tile(NamedTuple):
+    """Position of an image on a contact sheet."""
+
+    image_id: int
+    page: int
+    x: int
+    y: int
+
+
+def selection_image_ids(dataset: Dataset, selection: str) -> List[int]:
+    """Get the ids of a label's images or of all unlabeled images."""
+    images = Image.objects.filter(dataset=dataset)
+    if selection == UNLABELED:
+        images = images.filter(label__isnull=True)
+    else:
+        label = Label.objects.get(dataset=dataset, pk=int(selection))
+        images = images.filter(label=label)
+    return list(images.order_by("id").values_list("id", flat=True))
+
+
+def page_count(image_ids: List[int]) -> int:
+    return (len(image_ids) + SHEET_IMAGE_COUNT - 1) // SHEET_IMAGE_COUNT
+
+
+def page_image_ids(image_ids: List[int], page: int) -> List[int]:
+    start = page * SHEET_IMAGE_COUNT
+    return image_ids[slice(start, start + SHEET_IMAGE_COUNT)]
+
+
+def sheet_key(image_ids: List[int]) -> str:
+    """Get the cache key of the sheet of these images."""
+    key_source = "{}:{}:{}".format(
+        TILE_SIZE, SHEET_COLUMNS, ",".join(str(i) for i in image_ids)
+    )
+    return sha1(key_source.encode()).hexdigest()
+
+
+def tiles(image_ids: List[int]) -> Dict[int, Tile]:
+    """Get the tiles of all images of a selection by image id."""
+    result = {}
+    for i, image_id in enumerate(image_ids):
+        page, index = divmod(i, SHEET_IMAGE_COUNT)
+        row, column = divmod(index, SHEET_COLUMNS)
+        result[image_id] = Tile(
+            image_id, page, column * TILE_SIZE, row * TILE_SIZE
+        )
+    return result
+
+
+def tile_grid(tile_arrays: array, columns: int) -> array:
+    """Arrange images of shape (n, height, width, 3) row by row."""
+    tile_count, height, width, channels = tile_arrays.shape
+    rows = (tile_count + columns - 1) // columns
+    padded = zeros(
+        (rows * columns, height, width, channels), dtype=tile_arrays.dtype
+    )
+    padded[:tile_count] = tile_arrays
+    return (
+        padded.reshape(rows, columns, height, width, channels)
+        .transpose(0, 2, 1, 3, 4)
+        .reshape(rows * height, columns * width, channels)
+    )
+
+
+def _tile_array(image: Image) -> array:
+    image_pil = ImagePillow.open(BytesIO(image.read_bytes(TILE_SIZE)))
+    image_pil = ImageOps.fit(
+        image_pil.convert("RGB"),
+        (TILE_SIZE, TILE_SIZE),
+        ImagePillow.ANTIALIAS,
+    )
+    return array(image_pil, dtype=uint8)
+
+
+def render_sheet(dataset: Dataset, image_ids: List[int]) -> bytes:
+    """Get the JPEG encoded contact sheet of the images."""
+    images = {
+        image.id: image
+        for image in Image.objects.filter(dataset=dataset, id__in=image_ids)
+    }
+    for image in images.values():
+        image.dataset = dataset  # Avoid a query per image
+    tile_arrays = stack([_tile_array(images[i]) for i in image_ids])
+    sheet = BytesIO()
+    ImagePillow.fromarray(tile_grid(tile_arrays, SHEET_COLUMNS)).save(
+        sheet, format="JPEG", quality=85
+    )
+    return sheet.getvalue()
+
+
+def sheet_dir(dataset: Dataset) -> str:
+    return os.path.join(dataset.dir, "contact-sheets")
+
+
+def sheet_path(dataset: Dataset, key: str) -> str:
+    return os.path.join(sheet_dir(dataset), "{}.jpg".format(key))
+
+
+def current_sheet_keys(dataset: Dataset) -> Set[str]:
+    """Get the keys of the sheets of every page of every selection."""
+    image_ids_by_label: Dict[Optional[int], List[int]] = defaultdict(list)
+    images = (
+        Image.objects.filter(dataset=dataset)
+        .order_by("id")
+        .values_list("id", "label_id")
+    )
+    for image_id, label_id in images:
+        image_ids_by_label[label_id].append(image_id)
+    return {
+        sheet_key(page_image_ids(image_ids, page))
+        for image_ids in image_ids_by_label.values()
+        for page in range(page_count(image_ids))
+    }
+
+
+def prune_sheets(dataset: Dataset):
+    """Delete the cached sheets no longer matching a page."""
+    directory = sheet_dir(dataset)
+    if not os.path.isdir(directory):
+        return
+    current_keys = current_sheet_keys(dataset)
+    for filename in os.listdir(directory):
+        # Sheets being written are kept
+        key, extension = os.path.splitext(filename)
+        if extension != ".jpg" or key in current_keys:
+            continue
+        try:
+            os.remove(os.path.join(directory, filename))
+        except FileNotFoundError:
+            # Pruned by another process
+            pass
+
+
+def prune_sheets_when_relabeled(sender, dataset_id: int, **kwargs):
+    """Prune the sheets of a dataset, receiver of images_relabeled."""
+    # Only the id is needed, no query if no sheet is cached
+    prune_sheets(Dataset(pk=dataset_id))
+
+
+def get_sheet(dataset: Dataset, image_ids: List[int]) -> Optional[str]:
+    """Get the path of the cached sheet, rendered if missing."""
+    if not image_ids:
+        return None
+    path = sheet_path(dataset, sheet_key(image_ids))
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(temporary_path, "wb") as f:
+        f.write(render_sheet(dataset, image_ids))
+    os.replace(temporary_path, path)
+    return path
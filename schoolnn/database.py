@@ -0,0 +1,86 @@
+"""Tuning of SQLite connections and retries of locked writes.
+
+Every new SQLite connection switches to write-ahead logging, so readers
+are not blocked while the training worker saves model weights, and gets a
+larger page cache and memory mapped reads. Writes of the training loop
+are retried with exponential backoff if another writer holds the lock
+longer than the busy timeout. Writes that may rather be dropped than
+delay their caller wait for the lock only as long as busy_timeout allows.
+"""
+from contextlib import contextmanager
+from random import random
+from time import sleep
+from typing import Callable, Iterator, TypeVar
+from django.db import OperationalError, connection
+from schoolnn_app.settings import (
+    SQLITE_CACHE_KIB,
+    SQLITE_MMAP_BYTES,
+)
+from .instrumentation import DATABASE_LOCKED_RETRIES
+
+LOCKED_WRITE_ATTEMPTS = 6
+LOCKED_BACKOFF_SECONDS = 0.5
+
+T = TypeVar("T")
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Set the pragmas of a new connection, receiver of connection_created."""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        # Durable at checkpoints, safe against corruption in WAL mode
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        # Negative values are KiB instead of pages
+        cursor.execute("PRAGMA cache_size=-{:d}".format(SQLITE_CACHE_KIB))
+        cursor.execute("PRAGMA mmap_size={:d}".format(SQLITE_MMAP_BYTES))
+
+
+def _is_locked(error: OperationalError) -> bool:
+    return "locked" in str(error) or "busy" in str(error)
+
+
+@contextmanager
+def busy_timeout(milliseconds: int) -> Iterator[None]:
+    """Let SQLite writes wait at most milliseconds for the lock.
+
+    Applies to the connection of this thread until the block is left,
+    other databases are not changed.
+    """
+    if connection.vendor != "sqlite":
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA busy_timeout")
+        previous_milliseconds = cursor.fetchone()[0]
+        cursor.execute("PRAGMA busy_timeout={:d}".format(milliseconds))
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "PRAGMA busy_timeout={:d}".format(previous_milliseconds)
+            )
+
+
+def retry_when_locked(
+    write: Callable[[], T],
+    attempts: int = LOCKED_WRITE_ATTEMPTS,
+    backoff_seconds: float = LOCKED_BACKOFF_SECONDS,
+) -> T:
+    """Call write until it does not fail because the database is locked.
+
+    The waiting time doubles after every attempt and is jittered, so that
+    competing writers do not retry in lockstep. write must be safe to
+    repeat, e.g. one transaction.
+    """
+    for attempt in range(attempts):
+        try:
+            return write()
+        except OperationalError as error:
+            if not _is_locked(error) or attempt == attempts - 1:
+                raise
+            DATABASE_LOCKED_RETRIES.inc()
+            sleep(backoff_seconds * 2 ** attempt * (0.5 + random()))
+    raise ValueError("attempts must be positive.")
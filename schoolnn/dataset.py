@@ -1,7 +1,23 @@
+from schoolnn.contact_sheet import prune_sheets
 from schoolnn.models import Dataset, Image, Label
+from schoolnn.shards import ShardWriter
+from schoolnn.thumbnails import (
+    THUMBNAIL_SIZES,
+    image_dir,
+    jpeg_bytes,
+    thumbnail_jpegs,
+)
+from schoolnn.instrumentation import (
+    REGISTRY,
+    DATASET_IMPORT_IMAGES,
+    DATASET_IMPORT_SECONDS,
+)
 from os import makedirs
+from contextlib import ExitStack
 from io import BytesIO
+from typing import Dict, Optional
 from zipfile import ZipFile
+from time import time
 from django.db import transaction
 from PIL import Image as ImagePillow, ImageOps, UnidentifiedImageError
 
@@ -16,39 +32,87 @@ ACCEPTED_IMAGE_FORMATS = [
 
 @transaction.atomic
 def zip_to_full_dataset(zip_file: BytesIO, dataset: Dataset):
-    """Unzip images to storage."""
+    """Unzip images to storage.
+
+    New datasets are stored packed and get thumbnails.
+    """
+    import_start = time()
     dataset_zip = ZipFile(zip_file)
     makedirs(dataset.dir, exist_ok=True)
 
+    if not dataset.image_set.exists():
+        dataset.packed = True
+        dataset.thumbnails = True
+        dataset.save(update_fields=["packed", "thumbnails"])
+
     label_name_dict = {}
 
-    for entry in dataset_zip.namelist():
-        fileending = entry.split(".")[-1]
-        if fileending.lower() not in ACCEPTED_IMAGE_FORMATS:
-            print("Skip file because of file ending:", entry)
-            continue
-
-        image_binary = BytesIO(dataset_zip.read(entry))
-        try:
-            image_pil = ImagePillow.open(image_binary)
-        except UnidentifiedImageError:
-            print("Skip file, seems to be no valid image: ", entry)
-            continue
-
-        label_name = entry.split("/")[0].title()
-        if label_name not in label_name_dict:
-            label_name_dict[label_name] = Label.objects.create(
-                dataset=dataset, name=label_name
+    with ExitStack() as stack:
+        shard_writers = None
+        if dataset.packed:
+            # One writer for the originals and one per thumbnail size
+            sizes = [None]
+            if dataset.thumbnails:
+                sizes += THUMBNAIL_SIZES
+            shard_writers = {
+                size: stack.enter_context(
+                    ShardWriter(image_dir(dataset.dir, size))
+                )
+                for size in sizes
+            }
+        for entry in dataset_zip.namelist():
+            _import_zip_entry(
+                dataset_zip, entry, dataset, label_name_dict, shard_writers
             )
 
-        width, height = image_pil.size
-        target_size = min([width, height, 512])
-        image_pil = ImageOps.fit(
-            image_pil, (target_size, target_size), ImagePillow.ANTIALIAS
-        )
+    # Pages of the selections shifted by the new images
+    transaction.on_commit(lambda: prune_sheets(dataset))
+    DATASET_IMPORT_SECONDS.observe(time() - import_start)
+    REGISTRY.flush()
+
 
-        image = Image.objects.create(
-            dataset=dataset,
-            label=label_name_dict[label_name],
+def _import_zip_entry(
+    dataset_zip: ZipFile,
+    entry: str,
+    dataset: Dataset,
+    label_name_dict: Dict[str, Label],
+    shard_writers: Optional[Dict[Optional[int], ShardWriter]],
+):
+    """Import one file of the zip, skip it if it is no image."""
+    fileending = entry.split(".")[-1]
+    if fileending.lower() not in ACCEPTED_IMAGE_FORMATS:
+        print("Skip file because of file ending:", entry)
+        return
+
+    image_binary = BytesIO(dataset_zip.read(entry))
+    try:
+        image_pil = ImagePillow.open(image_binary)
+    except UnidentifiedImageError:
+        print("Skip file, seems to be no valid image: ", entry)
+        return
+
+    label_name = entry.split("/")[0].title()
+    if label_name not in label_name_dict:
+        label_name_dict[label_name] = Label.objects.create(
+            dataset=dataset, name=label_name
         )
-        image_pil.save(image.path)
+
+    width, height = image_pil.size
+    target_size = min([width, height, 512])
+    image_pil = ImageOps.fit(
+        image_pil, (target_size, target_size), ImagePillow.ANTIALIAS
+    )
+
+    image = Image.objects.create(
+        dataset=dataset,
+        label=label_name_dict[label_name],
+    )
+    if shard_writers is None:
+        image.store_pillow(image_pil)
+    else:
+        encoded = {None: jpeg_bytes(image_pil)}
+        if dataset.thumbnails:
+            encoded.update(thumbnail_jpegs(image_pil))
+        for size, image_jpeg in encoded.items():
+            shard_writers[size].append(image.id, image.label_id, image_jpeg)
+    DATASET_IMPORT_IMAGES.inc()
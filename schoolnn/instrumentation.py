@@ -0,0 +1,458 @@
+"""In-process metrics exposed in the Prometheus text format.
+
+Training runs in a separate worker process. Every process therefore
+flushes a snapshot of its metrics to the METRICS_DIR, the metrics
+endpoint merges these snapshots with the metrics of its own process.
+Counters and histograms are summed over all processes, gauges only over
+processes which are still alive. The counters and histograms of dead
+processes are kept in a retired snapshot, so their pids can be reused.
+"""
+import fcntl
+import os
+from contextlib import contextmanager
+from json import dumps, loads
+from math import inf
+from threading import Lock
+from time import time
+from typing import Callable, Dict, List, Optional, Tuple
+from schoolnn_app.settings import METRICS_DIR
+
+LabelValues = Tuple[Tuple[str, str], ...]
+
+# Samples of dead processes, counters and histograms only
+RETIRED_SNAPSHOT_FILENAME = "retired.json"
+LOCK_FILENAME = ".lock"
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    inf,
+)
+
+
+def _label_key(labels: Dict[str, str]) -> LabelValues:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(label_values: LabelValues) -> str:
+    if not label_values:
+        return ""
+    escaped = [
+        '{}="{}"'.format(key, value.replace("\\", "\\\\").replace('"', '\\"'))
+        for key, value in label_values
+    ]
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class Metric:
+    """Base class of all metrics, holds one value per label set."""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str):
+        """Create a metric without any samples."""
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[LabelValues, object] = {}
+        self._lock = Lock()
+
+    def samples(self) -> Dict[LabelValues, object]:
+        """Get a copy of all samples."""
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self):
+        """Remove all samples."""
+        with self._lock:
+            self._values = {}
+
+
+class Counter(Metric):
+    """Monotonically increasing value."""
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        """Increase the counter."""
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    """Value which can go up and down."""
+
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        """Set the gauge to a value."""
+        with self._lock:
+            self._values[_label_key(labels)] = float(value)
+
+
+class Histogram(Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        """Create a histogram with the given upper bucket bounds."""
+        super().__init__(name, documentation)
+        self.buckets = buckets
+
+    def observe(self, value: float, **labels):
+        """Add an observation."""
+        key = _label_key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = {
+                    "buckets": [0] * len(self.buckets),
+                    "sum": 0.0,
+                    "count": 0,
+                }
+                self._values[key] = state
+            for i, upper_bound in enumerate(self.buckets):
+                if value <= upper_bound:
+                    state["buckets"][i] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the context in seconds."""
+        start = time()
+        try:
+            yield
+        finally:
+            self.observe(time() - start, **labels)
+
+
+class Registry:
+    """Collection of all metrics of a process."""
+
+    def __init__(self, snapshot_dir: Optional[str] = None):
+        """Create an empty registry, snapshots are written to a dir."""
+        self.snapshot_dir = snapshot_dir
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._flushed = False
+
+    def _register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError("Duplicate metric: {}".format(metric.name))
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        """Create and register a counter."""
+        return self._register(Counter(name, documentation))
+
+    def gauge(self, name: str, documentation: str) -> Gauge:
+        """Create and register a gauge."""
+        return self._register(Gauge(name, documentation))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Create and register a histogram."""
+        return self._register(Histogram(name, documentation, buckets))
+
+    def register_collector(self, collector: Callable[[], None]):
+        """Call a function updating gauges before every export."""
+        self._collectors.append(collector)
+
+    def reset(self):
+        """Drop all samples, e.g. those inherited by a forked process."""
+        for metric in self._metrics.values():
+            metric.reset()
+
+    def collect(self):
+        """Run all collectors."""
+        for collector in self._collectors:
+            collector()
+
+    def snapshot(self) -> dict:
+        """Get all samples as json dumpable dictionary."""
+        return {
+            name: [
+                [list(key), value] for key, value in metric.samples().items()
+            ]
+            for name, metric in self._metrics.items()
+        }
+
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(self.snapshot_dir, "{}.json".format(pid))
+
+    def flush(self):
+        """Write the samples of this process to the snapshot directory."""
+        if self.snapshot_dir is None:
+            return
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        path = self._snapshot_path(os.getpid())
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "w") as f:
+            f.write(dumps(self.snapshot()))
+        os.replace(temporary_path, path)
+        self._flushed = True
+
+    def _snapshot_pids(self) -> List[int]:
+        pids = []
+        for filename in os.listdir(self.snapshot_dir):
+            name, extension = os.path.splitext(filename)
+            if extension == ".json" and name.isdigit():
+                pids.append(int(name))
+        return pids
+
+    @contextmanager
+    def _snapshot_lock(self, operation: int):
+        with open(os.path.join(self.snapshot_dir, LOCK_FILENAME), "a") as f:
+            fcntl.flock(f, operation)
+            yield
+
+    def _snapshot_dead(self, pid: int) -> bool:
+        # Before the first flush a snapshot of the own pid is a stale one
+        if pid == os.getpid():
+            return not self._flushed
+        return not _process_alive(pid)
+
+    def retire_dead_snapshots(self):
+        """Add the snapshots of dead processes to the retired snapshot.
+
+        Their counters and histograms are kept, as a new process reusing
+        the pid of a dead one would overwrite its snapshot and let them
+        go down. Their gauges are dropped.
+        """
+        if self.snapshot_dir is None or not os.path.isdir(self.snapshot_dir):
+            return
+        with self._snapshot_lock(fcntl.LOCK_EX):
+            dead_paths = [
+                self._snapshot_path(pid)
+                for pid in self._snapshot_pids()
+                if self._snapshot_dead(pid)
+            ]
+            if not dead_paths:
+                return
+            retired_path = os.path.join(
+                self.snapshot_dir, RETIRED_SNAPSHOT_FILENAME
+            )
+            retired = _read_snapshot(retired_path) or {}
+            for dead_path in dead_paths:
+                snapshot = _read_snapshot(dead_path) or {}
+                for metric in self._metrics.values():
+                    if isinstance(metric, Gauge):
+                        continue
+                    samples = _merged(
+                        metric, _samples(retired, metric), snapshot
+                    )
+                    retired[metric.name] = [
+                        [list(key), value] for key, value in samples.items()
+                    ]
+            temporary_path = retired_path + ".tmp"
+            with open(temporary_path, "w") as f:
+                f.write(dumps(retired))
+            os.replace(temporary_path, retired_path)
+            for dead_path in dead_paths:
+                os.remove(dead_path)
+
+    def _foreign_snapshots(self) -> List[Tuple[bool, dict]]:
+        snapshots = []
+        for pid in self._snapshot_pids():
+            if pid == os.getpid():
+                continue
+            snapshot = _read_snapshot(self._snapshot_path(pid))
+            if snapshot is not None:
+                snapshots.append((_process_alive(pid), snapshot))
+        retired = _read_snapshot(
+            os.path.join(self.snapshot_dir, RETIRED_SNAPSHOT_FILENAME)
+        )
+        if retired is not None:
+            snapshots.append((False, retired))
+        return snapshots
+
+    def _merged_samples(self, metric: Metric, foreign) -> Dict:
+        merged = metric.samples()
+        for alive, snapshot in foreign:
+            if isinstance(metric, Gauge) and not alive:
+                continue
+            merged = _merged(metric, merged, snapshot)
+        return merged
+
+    def render_text(self) -> str:
+        """Export all metrics of all processes in the text format."""
+        self.collect()
+        foreign = []
+        if self.snapshot_dir is not None and os.path.isdir(self.snapshot_dir):
+            self.retire_dead_snapshots()
+            with self._snapshot_lock(fcntl.LOCK_SH):
+                foreign = self._foreign_snapshots()
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(
+                "# HELP {} {}".format(metric.name, metric.documentation)
+            )
+            lines.append("# TYPE {} {}".format(metric.name, metric.type_name))
+            samples = self._merged_samples(metric, foreign)
+            for key, value in sorted(samples.items()):
+                if isinstance(metric, Histogram):
+                    lines += _histogram_lines(metric, key, value)
+                else:
+                    lines.append(
+                        "{}{} {}".format(
+                            metric.name,
+                            _format_labels(key),
+                            _format_value(value),
+                        )
+                    )
+        return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(
+    histogram: Histogram, key: LabelValues, state: dict
+) -> List[str]:
+    lines = []
+    for upper_bound, count in zip(histogram.buckets, state["buckets"]):
+        bucket_key = key + (("le", _format_value(upper_bound)),)
+        lines.append(
+            "{}_bucket{} {}".format(
+                histogram.name, _format_labels(bucket_key), count
+            )
+        )
+    lines.append(
+        "{}_sum{} {}".format(
+            histogram.name, _format_labels(key), _format_value(state["sum"])
+        )
+    )
+    lines.append(
+        "{}_count{} {}".format(
+            histogram.name, _format_labels(key), state["count"]
+        )
+    )
+    return lines
+
+
+def _read_snapshot(path: str) -> Optional[dict]:
+    try:
+        with open(path) as f:
+            return loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _samples(snapshot: dict, metric: Metric) -> Dict:
+    return {
+        tuple(tuple(pair) for pair in key): value
+        for key, value in snapshot.get(metric.name, [])
+    }
+
+
+def _merged(metric: Metric, samples: Dict, snapshot: dict) -> Dict:
+    """Add the samples of a metric in a snapshot to the given ones."""
+    merged = dict(samples)
+    for key, value in _samples(snapshot, metric).items():
+        if key not in merged:
+            merged[key] = value
+        elif isinstance(metric, Histogram):
+            merged[key] = {
+                "buckets": [
+                    a + b
+                    for a, b in zip(merged[key]["buckets"], value["buckets"])
+                ],
+                "sum": merged[key]["sum"] + value["sum"],
+                "count": merged[key]["count"] + value["count"],
+            }
+        else:
+            merged[key] += value
+    return merged
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+REGISTRY = Registry(snapshot_dir=METRICS_DIR)
+
+TRAINING_QUEUE_DEPTH = REGISTRY.gauge(
+    "schoolnn_training_queue_depth",
+    "Training passes waiting in the queue of the TrainingManager.",
+)
+TRAINING_PASSES = REGISTRY.gauge(
+    "schoolnn_training_passes",
+    "Training passes by status.",
+)
+TRAINING_BLOCKS = REGISTRY.counter(
+    "schoolnn_training_blocks_total",
+    "Finished training blocks.",
+)
+TRAINING_IMAGES = REGISTRY.counter(
+    "schoolnn_training_images_total",
+    "Images used for fitting models.",
+)
+TRAINING_BLOCK_PHASE_SECONDS = REGISTRY.histogram(
+    "schoolnn_training_block_phase_seconds",
+    "Duration of the phases of training blocks.",
+)
+BATCH_QUEUE_FILL = REGISTRY.gauge(
+    "schoolnn_batch_generator_queue_fill",
+    "Batches ordered from the decode pool but not yet fetched.",
+)
+BATCHES = REGISTRY.counter(
+    "schoolnn_batch_generator_batches_total",
+    "Batches yielded by the batch generators.",
+)
+BATCH_WAIT_SECONDS = REGISTRY.histogram(
+    "schoolnn_batch_generator_wait_seconds",
+    "Time blocked on the decode pool to yield a batch.",
+)
+INFERENCE_STAGE_SECONDS = REGISTRY.histogram(
+    "schoolnn_inference_stage_seconds",
+    "Duration of the stages of an inference request.",
+)
+INFERENCE_IMAGES = REGISTRY.counter(
+    "schoolnn_inference_images_total",
+    "Classified images.",
+)
+DATASET_IMPORT_IMAGES = REGISTRY.counter(
+    "schoolnn_dataset_import_images_total",
+    "Images imported into datasets.",
+)
+DATASET_IMPORT_SECONDS = REGISTRY.histogram(
+    "schoolnn_dataset_import_seconds",
+    "Duration of dataset imports.",
+    buckets=(1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, inf),
+)
+DATABASE_LOCKED_RETRIES = REGISTRY.counter(
+    "schoolnn_database_locked_retries_total",
+    "Writes retried because the database was locked.",
+)
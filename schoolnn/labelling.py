@@ -0,0 +1,71 @@
+"""Assign and remove labels of many images at once.
+
+Images are updated set-based, LABELLING_CHUNK_SIZE images per UPDATE
+statement, all chunks in one transaction. Caches depending on the labels
+of images (preprocessed tensors, indexes) connect to images_relabeled,
+which is sent once per chunk after the transaction is committed.
+"""
+from functools import partial
+from typing import Iterable, List, Optional
+from django.db import transaction
+from django.dispatch import Signal
+from .models import Dataset, Image, Label
+
+LABELLING_CHUNK_SIZE = 500
+
+# Sent with dataset_id, image_ids and label_id (None if unlabeled)
+images_relabeled = Signal()
+
+
+def _chunks(image_ids: List[int]) -> Iterable[List[int]]:
+    for start in range(0, len(image_ids), LABELLING_CHUNK_SIZE):
+        yield image_ids[slice(start, start + LABELLING_CHUNK_SIZE)]
+
+
+def _update_labels(
+    images, dataset_id: int, image_ids: Iterable, label_id: Optional[int]
+) -> int:
+    image_ids = sorted({int(image_id) for image_id in image_ids})
+    updated_count = 0
+    with transaction.atomic():
+        for chunk in _chunks(image_ids):
+            # Only notify about images which actually changed
+            changed_ids = list(
+                images.filter(pk__in=chunk).values_list("id", flat=True)
+            )
+            if not changed_ids:
+                continue
+            updated_count += Image.objects.filter(pk__in=changed_ids).update(
+                label_id=label_id
+            )
+            transaction.on_commit(
+                partial(
+                    images_relabeled.send,
+                    sender=Image,
+                    dataset_id=dataset_id,
+                    image_ids=changed_ids,
+                    label_id=label_id,
+                )
+            )
+    return updated_count
+
+
+def set_label(dataset: Dataset, image_ids: Iterable, label: Label) -> int:
+    """Assign the label to the images of the dataset.
+
+    Images of other datasets are ignored. Returns the number of images
+    whose label changed.
+    """
+    if label.dataset_id != dataset.id:
+        raise ValueError("Label does not belong to the dataset.")
+    images = Image.objects.filter(dataset=dataset).exclude(label=label)
+    return _update_labels(images, dataset.id, image_ids, label.id)
+
+
+def remove_label(label: Label, image_ids: Iterable) -> int:
+    """Remove the label from those of the images having it.
+
+    Returns the number of images which are unlabeled now.
+    """
+    images = Image.objects.filter(label=label)
+    return _update_labels(images, label.dataset_id, image_ids, None)
@@ -0,0 +1,26 @@
+# Generated by Django 3.1.14 on 2026-10-19 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schoolnn", "0002_auto_20210330_1356"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="trainingpass",
+            name="profiling",
+            field=models.CharField(
+                choices=[
+                    ("off", "Aus"),
+                    ("python", "Python (cProfile)"),
+                    ("tensorflow", "Python und TensorFlow-Trace"),
+                ],
+                default="off",
+                max_length=15,
+            ),
+        ),
+    ]
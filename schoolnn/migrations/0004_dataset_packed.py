@@ -0,0 +1,18 @@
+# Generated by Django 3.1.14 on 2026-10-19 14:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schoolnn", "0003_trainingpass_profiling"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dataset",
+            name="packed",
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.1.14 on 2026-10-19 14:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schoolnn", "0004_dataset_packed"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dataset",
+            name="thumbnails",
+            field=models.BooleanField(default=False),
+        ),
+    ]
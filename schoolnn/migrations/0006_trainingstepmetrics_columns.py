@@ -0,0 +1,141 @@
+# Generated by Django 3.1.14 on 2026-10-19 14:37
+
+from json import dumps, loads
+from django.db import migrations, models
+
+_BATCH_SIZE = 1000
+
+
+def _decoded(metrics_json) -> dict:
+    # Older blocks stored a JSON string inside the JSON field
+    if isinstance(metrics_json, str):
+        return loads(metrics_json)
+    return metrics_json
+
+
+def metrics_json_to_columns(apps, schema_editor):
+    TrainingStepMetrics = apps.get_model("schoolnn", "TrainingStepMetrics")
+    changed = []
+    for step_metrics in TrainingStepMetrics.objects.iterator():
+        metrics = _decoded(step_metrics.metrics_json)
+        performance = metrics.get("performance", {})
+        step_metrics.training_loss = metrics["training"]["loss"]
+        step_metrics.training_accuracy = metrics["training"]["accuracy"]
+        step_metrics.validation_loss = metrics["validation"]["loss"]
+        step_metrics.validation_accuracy = metrics["validation"]["accuracy"]
+        step_metrics.duration_milliseconds = round(
+            1000 * sum(performance.get("seconds", {}).values())
+        )
+        step_metrics.performance_json = performance
+        # The time of older blocks is unknown
+        step_metrics.created_at = None
+        changed.append(step_metrics)
+    TrainingStepMetrics.objects.bulk_update(
+        changed,
+        [
+            "training_loss",
+            "training_accuracy",
+            "validation_loss",
+            "validation_accuracy",
+            "duration_milliseconds",
+            "performance_json",
+            "created_at",
+        ],
+        batch_size=_BATCH_SIZE,
+    )
+
+
+def columns_to_metrics_json(apps, schema_editor):
+    TrainingStepMetrics = apps.get_model("schoolnn", "TrainingStepMetrics")
+    changed = []
+    for step_metrics in TrainingStepMetrics.objects.iterator():
+        step_metrics.metrics_json = dumps(
+            {
+                "training": {
+                    "loss": step_metrics.training_loss,
+                    "accuracy": step_metrics.training_accuracy,
+                },
+                "validation": {
+                    "loss": step_metrics.validation_loss,
+                    "accuracy": step_metrics.validation_accuracy,
+                },
+                "performance": step_metrics.performance_json,
+            }
+        )
+        changed.append(step_metrics)
+    TrainingStepMetrics.objects.bulk_update(
+        changed, ["metrics_json"], batch_size=_BATCH_SIZE
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schoolnn", "0005_dataset_thumbnails"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="trainingstepmetrics",
+            name="created_at",
+            field=models.DateTimeField(auto_now_add=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="trainingstepmetrics",
+            name="duration_milliseconds",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="trainingstepmetrics",
+            name="epoche",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="trainingstepmetrics",
+            name="epoche_offset",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="trainingstepmetrics",
+            name="performance_json",
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AddField(
+            model_name="trainingstepmetrics",
+            name="training_accuracy",
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name="trainingstepmetrics",
+            name="training_loss",
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name="trainingstepmetrics",
+            name="validation_accuracy",
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name="trainingstepmetrics",
+            name="validation_loss",
+            field=models.FloatField(null=True),
+        ),
+        # Nullable, so that reverting can add it again to existing rows
+        migrations.AlterField(
+            model_name="trainingstepmetrics",
+            name="metrics_json",
+            field=models.JSONField(null=True),
+        ),
+        migrations.RunPython(metrics_json_to_columns, columns_to_metrics_json),
+        migrations.RemoveField(
+            model_name="trainingstepmetrics",
+            name="metrics_json",
+        ),
+        migrations.AddIndex(
+            model_name="trainingstepmetrics",
+            index=models.Index(
+                fields=["training_pass", "validation_accuracy"],
+                name="schoolnn_tr_trainin_f6c4b7_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 3.1.14 on 2026-10-19 14:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schoolnn", "0006_trainingstepmetrics_columns"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ModelWeights",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("digest", models.CharField(max_length=64, unique=True)),
+                ("weights", models.BinaryField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name="trainingpass",
+            name="warm_started_from",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to="schoolnn.trainingpass",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="trainingpass",
+            name="model_weights",
+            field=models.BinaryField(default=b""),
+        ),
+        migrations.AddField(
+            model_name="trainingpass",
+            name="initial_weights",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="schoolnn.modelweights",
+            ),
+        ),
+    ]
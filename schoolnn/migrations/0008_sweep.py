@@ -0,0 +1,64 @@
+# Generated by Django 3.1.14 on 2026-10-19 15:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schoolnn", "0007_trainingpass_initial_weights"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Sweep",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("name", models.CharField(max_length=15)),
+                (
+                    "strategy",
+                    models.CharField(
+                        choices=[
+                            ("grid", "Alle Kombinationen"),
+                            ("random", "Zufällige Auswahl"),
+                        ],
+                        max_length=15,
+                    ),
+                ),
+                ("search_space_json", models.JSONField()),
+                ("blocks_per_rung", models.IntegerField(null=True)),
+                ("rung", models.IntegerField(default=0)),
+                (
+                    "project",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="schoolnn.project",
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.AddField(
+            model_name="trainingpass",
+            name="sweep",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to="schoolnn.sweep",
+            ),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 3.1.14 on 2026-10-19 15:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schoolnn", "0008_sweep"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrainingProgressEvent",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("kind", models.CharField(max_length=15)),
+                ("data_json", models.JSONField(default=dict)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "training_pass",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="schoolnn.trainingpass",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,56 @@
+from json import loads
+from django.db import migrations
+
+_OLD_DEFAULT_LEARNING_RATE = 0.01
+# Keras's default of every optimizer but SGD, which defaults to 0.01
+_KERAS_DEFAULT_LEARNING_RATE = 0.001
+
+
+def _decoded(parameter_json) -> dict:
+    # Older projects stored a JSON string inside the JSON field
+    if isinstance(parameter_json, str):
+        return loads(parameter_json)
+    return parameter_json
+
+
+def _keras_default_learning_rate(row) -> bool:
+    parameter = _decoded(row.training_parameter_json)
+    if (
+        parameter.get("learning_rate") != _OLD_DEFAULT_LEARNING_RATE
+        or parameter.get("optimizer") == "sgd"
+    ):
+        return False
+    parameter["learning_rate"] = _KERAS_DEFAULT_LEARNING_RATE
+    row.training_parameter_json = parameter
+    row.save(update_fields=["training_parameter_json"])
+    return True
+
+
+def keras_default_learning_rates(apps, schema_editor):
+    """Keep projects and passes at the learning rate they trained with.
+
+    The stored learning rate was not applied until the optimizer was
+    compiled with it, every optimizer used its Keras default. Projects
+    and passes still at the old default of 0.01 get that Keras default,
+    continued passes apply their stored rate at every block. Passes of
+    sweeps were created with the rate applied already.
+    """
+    Project = apps.get_model("schoolnn", "Project")
+    TrainingPass = apps.get_model("schoolnn", "TrainingPass")
+    for project in Project.objects.exclude(training_parameter_json=None):
+        _keras_default_learning_rate(project)
+    for training_pass in TrainingPass.objects.filter(sweep=None):
+        _keras_default_learning_rate(training_pass)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schoolnn", "0009_trainingprogressevent"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            keras_default_learning_rates, migrations.RunPython.noop
+        ),
+    ]
@@ -7,14 +7,21 @@ from .models import (  # noqa: F401
     Label,
     Architecture,
     Project,
+    ModelWeights,
+    Sweep,
     TrainingPass,
     TrainingStepMetrics,
+    TrainingProgressEvent,
     Note,
     Visiblity,
 )
 from .training import (  # noqa: F401
+    LearningRateSchedule,
     LossFunction,
     Optimizer,
+    Precision,
+    ProfilingMode,
+    SweepStrategy,
     TerminationCondition,
     TrainingParameter,
     TrainingPassState,
@@ -1,14 +1,24 @@
 """All ORM models."""
 import os
-from typing import Optional
+from hashlib import sha256
+from typing import Optional, Union
 from django.contrib.auth.models import AbstractUser
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.urls import reverse
-from json import loads
-from .training import TrainingParameter, TrainingPassState
+from .training import (
+    ProfilingMode,
+    SweepStrategy,
+    TrainingParameter,
+    TrainingPassState,
+)
 from schoolnn_app.settings import STORAGE
+from schoolnn import shards
+from schoolnn.shards import ShardPointer
+from schoolnn.thumbnails import image_dir, jpeg_bytes, thumbnail_jpegs
+from PIL import Image as ImagePillow
 from schoolnn.resources.static.layer_list import default_layers
 from schoolnn.resources.static.default_training_parameters import (
     default_training_parameters,
@@ -49,12 +59,47 @@ class User(AbstractUser, TimestampedModelMixin):
         return reverse("user-detail", kwargs={"pk": self.pk})
 
 
+def _count_per_dataset(model, **filters) -> Coalesce:
+    """Count the rows of a model per dataset as correlated subquery."""
+    rows = (
+        model.objects.filter(dataset=models.OuterRef("pk"), **filters)
+        .order_by()
+        .values("dataset")
+        .annotate(count=models.Count("pk"))
+        .values("count")
+    )
+    return Coalesce(
+        models.Subquery(rows, output_field=models.IntegerField()), 0
+    )
+
+
+class DatasetQuerySet(models.QuerySet):
+    """Queries of datasets."""
+
+    def with_counts(self) -> "DatasetQuerySet":
+        """Annotate image_count, unlabeled_count and label_count.
+
+        All counts are computed within the query fetching the datasets.
+        """
+        return self.annotate(
+            image_count=_count_per_dataset(Image),
+            unlabeled_count=_count_per_dataset(Image, label__isnull=True),
+            label_count=_count_per_dataset(Label),
+        )
+
+
 class Dataset(TimestampedModelMixin):
     """Set of images used for training."""
 
+    objects = DatasetQuerySet.as_manager()
+
     name = models.CharField(max_length=15)
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True)
     custom = models.BooleanField(default=False)
+    # Images are stored in shards instead of one file per image
+    packed = models.BooleanField(default=False)
+    # Thumbnails of all THUMBNAIL_SIZES are stored next to the images
+    thumbnails = models.BooleanField(default=False)
 
     def __str__(self) -> str:
         return self.name
@@ -101,6 +146,52 @@ class Image(models.Model):
         """Get the path of this image in the workspace storage folder."""
         return os.path.join(dataset.dir, self.filename)
 
+    @property
+    def source(self) -> Union[str, ShardPointer]:
+        """Get the path or, if packed, the shard location of this image."""
+        return self.get_source(self.dataset)
+
+    def get_source(
+        self, dataset: Dataset, size: Optional[int] = None
+    ) -> Union[str, ShardPointer]:
+        """Get the path or, if packed, the shard location of this image.
+
+        If a thumbnail size is given and the dataset has thumbnails, the
+        thumbnail is located instead of the original.
+        """
+        if size is not None and not dataset.thumbnails:
+            size = None
+        directory = image_dir(dataset.dir, size)
+        if dataset.packed:
+            return shards.get_reader(directory).pointer(self.id)
+        return os.path.join(directory, self.filename)
+
+    def read_bytes(self, size: Optional[int] = None) -> bytes:
+        """Get the encoded image or the thumbnail of a size."""
+        source = self.get_source(self.dataset, size)
+        if isinstance(source, ShardPointer):
+            return shards.read_pointer(source)
+        with open(source, "rb") as f:
+            return f.read()
+
+    def write_bytes(self, encoded: bytes, size: Optional[int] = None):
+        """Store the encoded image, the image must be saved before."""
+        directory = image_dir(self.dataset.dir, size)
+        if self.dataset.packed:
+            with shards.ShardWriter(directory) as writer:
+                writer.append(self.id, self.label_id, encoded)
+            return
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, self.filename), "wb") as f:
+            f.write(encoded)
+
+    def store_pillow(self, image_pil: ImagePillow.Image):
+        """Store the image and, if the dataset has them, its thumbnails."""
+        self.write_bytes(jpeg_bytes(image_pil))
+        if self.dataset.thumbnails:
+            for size, thumbnail in thumbnail_jpegs(image_pil).items():
+                self.write_bytes(thumbnail, size)
+
 
 class Architecture(TimestampedModelMixin):
     """One sequential neural network architecture."""
@@ -151,19 +242,128 @@ class Project(TimestampedModelMixin):
         self.training_parameter_json = training_parameter.to_dict()
 
 
+class ModelWeights(models.Model):
+    """Serialized keras model, stored once per content.
+
+    Training passes started from the same checkpoint share their initial
+    weights instead of storing a copy each.
+    """
+
+    digest = models.CharField(max_length=64, unique=True)
+    weights = models.BinaryField()
+
+    @classmethod
+    def store(cls, weights: bytes) -> "ModelWeights":
+        """Get the stored weights with this content, created if missing."""
+        model_weights, _ = cls.objects.get_or_create(
+            digest=sha256(weights).hexdigest(),
+            defaults={"weights": weights},
+        )
+        return model_weights
+
+
+class Sweep(TimestampedModelMixin):
+    """Group of training passes searching for good training parameters.
+
+    With successive halving, every pass pauses after blocks_per_rung
+    blocks. Once all did, the better half continues for twice as many
+    blocks and the others are stopped, and so on.
+    """
+
+    name = models.CharField(max_length=15)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE)
+    strategy = models.CharField(
+        max_length=15,
+        choices=[(s.value, s.human_readable) for s in SweepStrategy],
+    )
+    # Parameter name to the values searched
+    search_space_json = models.JSONField()
+    # None without successive halving
+    blocks_per_rung = models.IntegerField(null=True)
+    rung = models.IntegerField(default=0)
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def rung_block_limit(self) -> Optional[int]:
+        """Get the blocks every pass trains before the current selection."""
+        if not self.blocks_per_rung:
+            return None
+        return self.blocks_per_rung * 2 ** self.rung
+
+
+class TrainingPassQuerySet(models.QuerySet):
+    """Queries of training passes."""
+
+    def with_metrics_summary(self) -> "TrainingPassQuerySet":
+        """Annotate block_count and the best validation metrics.
+
+        The values are aggregated in SQL, so training passes can be sorted
+        and filtered by them. Every value is a correlated subquery: an
+        aggregate over the join would group by all columns of the pass,
+        including its checkpoint.
+        """
+        pass_metrics = (
+            TrainingStepMetrics.objects.filter(
+                training_pass=models.OuterRef("pk")
+            )
+            .order_by()
+            .values("training_pass")
+        )
+
+        def summary(aggregate: models.Aggregate) -> models.Subquery:
+            return models.Subquery(
+                pass_metrics.annotate(value=aggregate).values("value")[:1],
+                output_field=aggregate.output_field,
+            )
+
+        return self.annotate(
+            block_count=Coalesce(summary(models.Count("id")), 0),
+            best_validation_accuracy=summary(
+                models.Max(
+                    "validation_accuracy", output_field=models.FloatField()
+                )
+            ),
+            lowest_validation_loss=summary(
+                models.Min("validation_loss", output_field=models.FloatField())
+            ),
+        )
+
+
 class TrainingPass(models.Model):
     """One training pass of a project."""
 
+    objects = TrainingPassQuerySet.as_manager()
+
     name = models.CharField(max_length=15)
     duration_milliseconds = models.BigIntegerField(default=0)
     dataset_id = models.ForeignKey(Dataset, on_delete=models.CASCADE)
     training_parameter_json = models.JSONField()
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
     architecture = models.ForeignKey(Architecture, on_delete=models.CASCADE)
-    model_weights = models.BinaryField()
+    # Empty until the first block saved a checkpoint
+    model_weights = models.BinaryField(default=b"")
+    initial_weights = models.ForeignKey(
+        ModelWeights, null=True, on_delete=models.PROTECT
+    )
+    warm_started_from = models.ForeignKey(
+        "self", null=True, blank=True, on_delete=models.SET_NULL
+    )
+    sweep = models.ForeignKey(
+        Sweep, null=True, blank=True, on_delete=models.SET_NULL
+    )
     status = models.CharField(max_length=15)
     epoche = models.IntegerField(default=0)
     epoche_offset = models.IntegerField(default=0)
+    profiling = models.CharField(
+        max_length=15,
+        default=ProfilingMode.OFF.value,
+        choices=[(mode.value, mode.human_readable) for mode in ProfilingMode],
+    )
+
+    def __str__(self):
+        return "{} ({})".format(self.name, self.id)
 
     @property
     def training_parameter(self) -> TrainingParameter:
@@ -175,6 +375,27 @@ class TrainingPass(models.Model):
         """Assign training parameter object and save json representation."""
         self.training_parameter_json = training_parameter.to_dict()
 
+    @property
+    def checkpoint(self) -> bytes:
+        """Get the latest weights, the initial ones before the first block."""
+        if self.model_weights:
+            return self.model_weights
+        return self.initial_weights.weights
+
+    @property
+    def profiling_mode(self) -> ProfilingMode:
+        return ProfilingMode(self.profiling)
+
+    @property
+    def dir(self) -> str:
+        """Get the folder containing files stored for the training pass."""
+        return "{}/training-pass-{}".format(STORAGE, self.id)
+
+    @property
+    def profile_dir(self) -> str:
+        """Get the folder containing the profiling output."""
+        return os.path.join(self.dir, "profile")
+
     @property
     def duration_seconds(self) -> int:
         return round(self.duration_milliseconds / 1000)
@@ -213,16 +434,71 @@ class TrainingPass(models.Model):
         return TrainingPassState(self.status).human_readable
 
 
+def delete_unused_weights(sender, instance: TrainingPass, **kwargs):
+    """Delete the initial weights of a deleted pass if no pass uses them.
+
+    Receiver of post_delete of TrainingPass.
+    """
+    ModelWeights.objects.filter(
+        pk=instance.initial_weights_id, trainingpass=None
+    ).delete()
+
+
 class TrainingStepMetrics(models.Model):
     """Training and validation metrics of a training block/step."""
 
     training_pass = models.ForeignKey(TrainingPass, on_delete=models.CASCADE)
-    metrics_json = models.JSONField()
+    # Epoche and offset within the epoche after the block
+    epoche = models.IntegerField(default=0)
+    epoche_offset = models.IntegerField(default=0)
+    training_loss = models.FloatField(null=True)
+    training_accuracy = models.FloatField(null=True)
+    validation_loss = models.FloatField(null=True)
+    validation_accuracy = models.FloatField(null=True)
+    # Null for blocks recorded before the timestamp was stored
+    created_at = models.DateTimeField(auto_now_add=True, null=True)
+    duration_milliseconds = models.IntegerField(default=0)
+    # Timings and throughput of the block, see BlockTelemetry
+    performance_json = models.JSONField(default=dict)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["training_pass", "validation_accuracy"])
+        ]
 
     @property
     def metrics_dict(self) -> dict:
         """Obtain metrics as dictionary."""
-        return loads(self.metrics_json)
+        return {
+            "training": {
+                "loss": self.training_loss,
+                "accuracy": self.training_accuracy,
+            },
+            "validation": {
+                "loss": self.validation_loss,
+                "accuracy": self.validation_accuracy,
+            },
+            "performance": self.performance_dict,
+        }
+
+    @property
+    def performance_dict(self) -> dict:
+        """Obtain timings and throughput of the block, if recorded."""
+        return self.performance_json
+
+
+class TrainingProgressEvent(models.Model):
+    """Live progress of a training, published by the training worker.
+
+    Readers remember the id of the last event they got and ask for newer
+    ones. Only the latest events of a pass are kept.
+    """
+
+    training_pass = models.ForeignKey(TrainingPass, on_delete=models.CASCADE)
+    # "batch" while a block is trained, "block" after its metrics are saved
+    kind = models.CharField(max_length=15)
+    data_json = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
 
 
 class Note(TimestampedModelMixin):
@@ -1,6 +1,7 @@
 """Models used for domain logic / training."""
 from enum import Enum
-from typing import Optional
+from math import cos, pi
+from typing import Optional, Sequence
 from .augmentation_options import AugmentationOptions
 
 
@@ -57,24 +58,175 @@ class Optimizer(Enum):
         return [e.value for e in cls]
 
 
+class Precision(Enum):
+    """Floating point format used for the layer computations."""
+
+    FLOAT32 = "float32"
+    MIXED_BFLOAT16 = "mixed_bfloat16"
+
+    @classmethod
+    def to_array(cls):
+        return [e.value for e in cls]
+
+
+# Reduce on plateau halves the learning rate after PLATEAU_PATIENCE blocks
+# without improvement, no schedule goes below MIN_LEARNING_RATE_FACTOR
+PLATEAU_PATIENCE = 5
+PLATEAU_FACTOR = 0.5
+MIN_LEARNING_RATE_FACTOR = 0.01
+
+
+class LearningRateSchedule(Enum):
+    """Adjustment of the learning rate during training."""
+
+    CONSTANT = "constant"
+    REDUCE_ON_PLATEAU = "reduce_on_plateau"
+    COSINE = "cosine"
+
+    @property
+    def human_readable(self):
+        """Get human readable text of the schedule."""
+        lookup_dict = {
+            self.CONSTANT: "Konstant",
+            self.REDUCE_ON_PLATEAU: "Halbieren bei Stillstand",
+            self.COSINE: "Kosinus-Abfall bis zum Trainingsende",
+        }
+        return lookup_dict[self]
+
+    @classmethod
+    def to_array(cls):
+        return [e.value for e in cls]
+
+
+def blocks_without_improvement(
+    validation_losses: Sequence[Optional[float]], min_delta: float = 0.0
+) -> int:
+    """Count the blocks since the validation loss improved last.
+
+    An improvement has to be larger than min_delta, blocks without
+    validation loss are ignored.
+    """
+    best = None
+    count = 0
+    for loss in validation_losses:
+        if loss is None:
+            continue
+        if best is None or loss < best - min_delta:
+            best = loss
+            count = 0
+        else:
+            count += 1
+    return count
+
+
+def plateau_count(
+    validation_losses: Sequence[Optional[float]], patience: int
+) -> int:
+    """Count how often the loss did not improve for patience blocks."""
+    best = None
+    waiting = 0
+    plateaus = 0
+    for loss in validation_losses:
+        if loss is None:
+            continue
+        if best is None or loss < best:
+            best = loss
+            waiting = 0
+            continue
+        waiting += 1
+        if waiting >= patience:
+            plateaus += 1
+            waiting = 0
+    return plateaus
+
+
+class SweepStrategy(Enum):
+    """How the training parameters of a sweep are chosen."""
+
+    GRID = "grid"
+    RANDOM = "random"
+
+    @property
+    def human_readable(self):
+        """Get human readable text of the strategy."""
+        lookup_dict = {
+            self.GRID: "Alle Kombinationen",
+            self.RANDOM: "Zufällige Auswahl",
+        }
+        return lookup_dict[self]
+
+    @classmethod
+    def to_array(cls):
+        return [e.value for e in cls]
+
+
+class ProfilingMode(Enum):
+    """Profiling of the training blocks of a training pass."""
+
+    OFF = "off"
+    PYTHON = "python"
+    TENSORFLOW = "tensorflow"
+
+    @property
+    def human_readable(self):
+        """Get human readable text of the profiling mode."""
+        lookup_dict = {
+            self.OFF: "Aus",
+            self.PYTHON: "Python (cProfile)",
+            self.TENSORFLOW: "Python und TensorFlow-Trace",
+        }
+        return lookup_dict[self]
+
+    @classmethod
+    def to_array(cls):
+        return [e.value for e in cls]
+
+
 class TerminationCondition:
     """Combination of conditions, when to stop training."""
 
     def __init__(
-        self, seconds: Optional[int] = None, epochs: Optional[int] = None
+        self,
+        seconds: Optional[int] = None,
+        epochs: Optional[int] = None,
+        patience: Optional[int] = None,
+        min_delta: float = 0.0,
+        patience_from_block: int = 0,
     ):
-        """Provide multiple conditions, stop learning if one is met."""
+        """Provide multiple conditions, stop learning if one is met.
+
+        With patience, training stops early once the validation loss did
+        not improve by more than min_delta for this many blocks. Only the
+        blocks from patience_from_block on count, e.g. those trained since
+        the pass was continued.
+        """
         self.seconds = seconds
         self.epochs = epochs
+        self.patience = patience
+        self.min_delta = min_delta
+        self.patience_from_block = patience_from_block
 
     def to_dict(self) -> dict:
         """Dump object to a dictionary."""
-        return {"seconds": self.seconds, "epochs": self.epochs}
+        return {
+            "seconds": self.seconds,
+            "epochs": self.epochs,
+            "patience": self.patience,
+            "min_delta": self.min_delta,
+            "patience_from_block": self.patience_from_block,
+        }
 
     @classmethod
     def from_dict(cls, dictionary: dict):
         """Load object from a dictionary."""
-        return cls(seconds=dictionary["seconds"], epochs=dictionary["epochs"])
+        return cls(
+            seconds=dictionary["seconds"],
+            epochs=dictionary["epochs"],
+            # Conditions stored before early stopping existed lack the keys
+            patience=dictionary.get("patience"),
+            min_delta=dictionary.get("min_delta", 0.0),
+            patience_from_block=dictionary.get("patience_from_block", 0),
+        )
 
     @property
     def time_human_readable(self) -> str:
@@ -91,10 +243,29 @@ class TerminationCondition:
         )
         return result
 
+    def progress(
+        self, running_for_seconds: float, epoche: float
+    ) -> Optional[float]:
+        """Get the fraction of the training done, None if unlimited."""
+        fractions = []
+        if self.seconds:
+            fractions.append(running_for_seconds / self.seconds)
+        if self.epochs:
+            fractions.append(epoche / self.epochs)
+        if not fractions:
+            return None
+        return min(1.0, max(fractions))
+
     def termination_criteria_fulfilled(
-        self, running_for_seconds: float, epoche: int
+        self,
+        running_for_seconds: float,
+        epoche: int,
+        validation_losses: Sequence[Optional[float]] = (),
     ) -> bool:
-        """Check whether training should terminate."""
+        """Check whether training should terminate.
+
+        validation_losses are those of all blocks so far, oldest first.
+        """
         if self.seconds:
             if running_for_seconds >= self.seconds:
                 return True
@@ -103,6 +274,14 @@ class TerminationCondition:
             if epoche >= self.epochs:
                 return True
 
+        if self.patience:
+            first_block = self.patience_from_block
+            blocks = blocks_without_improvement(
+                validation_losses[first_block:], self.min_delta
+            )
+            if blocks >= self.patience:
+                return True
+
         return False
 
 
@@ -119,6 +298,13 @@ class TrainingParameter:
         loss_function: LossFunction,
         optimizer: Optimizer,
         augmentation_options: AugmentationOptions,
+        jit_compile: bool = False,
+        precision: Precision = Precision.FLOAT32,
+        transfer_learning: bool = False,
+        learning_rate_schedule: LearningRateSchedule = (
+            LearningRateSchedule.CONSTANT
+        ),
+        data_parallel_workers: int = 1,
     ):
         """Create a training parameter object."""
         self.validation_split = validation_split
@@ -128,6 +314,13 @@ class TrainingParameter:
         self.loss_function = loss_function
         self.optimizer = optimizer
         self.augmentation_options = augmentation_options
+        self.jit_compile = jit_compile
+        self.precision = precision
+        # Train only a dense head on features of the frozen backbone
+        self.transfer_learning = transfer_learning
+        self.learning_rate_schedule = learning_rate_schedule
+        # Processes training one pass together, see training.data_parallel
+        self.data_parallel_workers = data_parallel_workers
 
     @classmethod
     def from_dict(cls, dictionary: dict):
@@ -144,6 +337,19 @@ class TrainingParameter:
             augmentation_options=AugmentationOptions.from_dict(
                 dictionary["augmentation_options"],
             ),
+            # Parameters stored before these options existed lack the keys
+            jit_compile=dictionary.get("jit_compile", False),
+            precision=Precision(
+                dictionary.get("precision", Precision.FLOAT32.value)
+            ),
+            transfer_learning=dictionary.get("transfer_learning", False),
+            learning_rate_schedule=LearningRateSchedule(
+                dictionary.get(
+                    "learning_rate_schedule",
+                    LearningRateSchedule.CONSTANT.value,
+                )
+            ),
+            data_parallel_workers=dictionary.get("data_parallel_workers", 1),
         )
 
     def to_dict(self) -> dict:
@@ -156,4 +362,29 @@ class TrainingParameter:
             "loss_function": self.loss_function.value,
             "optimizer": self.optimizer.value,
             "augmentation_options": self.augmentation_options.to_dict(),
+            "jit_compile": self.jit_compile,
+            "precision": self.precision.value,
+            "transfer_learning": self.transfer_learning,
+            "learning_rate_schedule": self.learning_rate_schedule.value,
+            "data_parallel_workers": self.data_parallel_workers,
         }
+
+    def scheduled_learning_rate(
+        self,
+        validation_losses: Sequence[Optional[float]],
+        progress: Optional[float],
+    ) -> float:
+        """Get the learning rate of the next block.
+
+        validation_losses are those of all blocks so far, progress is the
+        fraction of the training done (see TerminationCondition.progress).
+        """
+        schedule = self.learning_rate_schedule
+        if schedule == LearningRateSchedule.REDUCE_ON_PLATEAU:
+            plateaus = plateau_count(validation_losses, PLATEAU_PATIENCE)
+            factor = max(PLATEAU_FACTOR ** plateaus, MIN_LEARNING_RATE_FACTOR)
+            return self.learning_rate * factor
+        if schedule == LearningRateSchedule.COSINE and progress is not None:
+            factor = 0.5 * (1 + cos(pi * progress))
+            return self.learning_rate * max(factor, MIN_LEARNING_RATE_FACTOR)
+        return self.learning_rate
@@ -6,14 +6,21 @@ def default_training_parameters() -> str:
         """
         {
             "validation_split": 0.1,
-            "learning_rate": 0.01,
+            "learning_rate": 0.001,
             "termination_condition": {
                 "seconds": 1800,
-                "epochs": 16
+                "epochs": 16,
+                "patience": null,
+                "min_delta": 0.0
             },
             "batch_size": 32,
             "loss_function": "categorical_crossentropy",
             "optimizer": "adam",
+            "jit_compile": false,
+            "precision": "float32",
+            "transfer_learning": false,
+            "learning_rate_schedule": "constant",
+            "data_parallel_workers": 1,
             "augmentation_options": {
                 "channel_shuffle": true,
                 "brightness": true,
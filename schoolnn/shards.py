@@ -0,0 +1,221 @@
+"""Packed storage of the images of a dataset.
+
+Instead of one file per image, the encoded images are appended to a few
+large shard files. Every record consists of a header (image id, label id,
+payload length) followed by the encoded image. The index file holds one
+fixed size entry per record (image id, shard number, payload offset,
+payload length), so a single image is found without scanning the shards.
+Shards are read memory-mapped.
+
+Records are never changed. If an image is written twice, the later index
+entry wins. The label of a record is the label at the time of writing,
+the database stays authoritative for labels.
+"""
+import os
+import re
+from fcntl import flock, LOCK_EX, LOCK_UN
+from mmap import mmap, ACCESS_READ
+from struct import Struct
+from typing import BinaryIO, Dict, NamedTuple, Optional, Tuple
+from numpy import dtype, frombuffer
+
+SHARD_MAX_BYTES = 256 * 1024 * 1024
+INDEX_FILENAME = "index.bin"
+SHARD_FILENAME_PATTERN = re.compile(r"^shard-(\d+)\.bin$")
+
+# image id, label id (0 if unlabeled), payload length
+RECORD_HEADER = Struct("<QQI")
+# image id, shard number, payload offset, payload length
+INDEX_ENTRY = Struct("<QIQI")
+INDEX_DTYPE = dtype(
+    [
+        ("image_id", "<u8"),
+        ("shard", "<u4"),
+        ("offset", "<u8"),
+        ("length", "<u4"),
+    ]
+)
+
+
+class ShardPointer(NamedTuple):
+    """Location of an encoded image, cheap to send to other processes."""
+
+    shard_path: str
+    offset: int
+    length: int
+
+
+def shard_path(dataset_dir: str, shard_number: int) -> str:
+    """Get the path of a shard file of a dataset."""
+    return os.path.join(dataset_dir, "shard-{:0>4}.bin".format(shard_number))
+
+
+def index_path(dataset_dir: str) -> str:
+    """Get the path of the index file of a dataset."""
+    return os.path.join(dataset_dir, INDEX_FILENAME)
+
+
+def _last_shard_number(dataset_dir: str) -> int:
+    matches = [
+        SHARD_FILENAME_PATTERN.match(filename)
+        for filename in os.listdir(dataset_dir)
+    ]
+    shard_numbers = [int(match.group(1)) for match in matches if match]
+    return max(shard_numbers, default=0)
+
+
+class ShardWriter:
+    """Append images to the shards of a dataset, use as context manager."""
+
+    def __init__(self, dataset_dir: str, shard_max_bytes=SHARD_MAX_BYTES):
+        """Prepare writing, the files are opened when entering."""
+        self.dataset_dir = dataset_dir
+        self.shard_max_bytes = shard_max_bytes
+        self._index_file: Optional[BinaryIO] = None
+        self._shard_file: Optional[BinaryIO] = None
+        self._shard_number = 0
+
+    def __enter__(self) -> "ShardWriter":
+        os.makedirs(self.dataset_dir, exist_ok=True)
+        self._index_file = open(index_path(self.dataset_dir), "ab")
+        # Only one writer per dataset, readers are never blocked
+        flock(self._index_file, LOCK_EX)
+        self._open_shard(_last_shard_number(self.dataset_dir))
+        return self
+
+    def __exit__(self, *_args):
+        self._shard_file.close()
+        self._index_file.flush()
+        flock(self._index_file, LOCK_UN)
+        self._index_file.close()
+
+    def _open_shard(self, shard_number: int):
+        if self._shard_file is not None:
+            self._shard_file.close()
+        self._shard_number = shard_number
+        self._shard_file = open(
+            shard_path(self.dataset_dir, shard_number), "ab"
+        )
+
+    def append(
+        self, image_id: int, label_id: Optional[int], payload: bytes
+    ) -> ShardPointer:
+        """Append one encoded image and get its location."""
+        if self._shard_file is None:
+            raise ValueError("ShardWriter must be used as context manager.")
+        if self._shard_file.tell() >= self.shard_max_bytes:
+            self._open_shard(self._shard_number + 1)
+
+        self._shard_file.write(
+            RECORD_HEADER.pack(image_id, label_id or 0, len(payload))
+        )
+        offset = self._shard_file.tell()
+        self._shard_file.write(payload)
+        # The record must be complete before the index points to it
+        self._shard_file.flush()
+        self._index_file.write(
+            INDEX_ENTRY.pack(
+                image_id, self._shard_number, offset, len(payload)
+            )
+        )
+        self._index_file.flush()
+        return ShardPointer(
+            shard_path(self.dataset_dir, self._shard_number),
+            offset,
+            len(payload),
+        )
+
+
+class ShardReader:
+    """Random access to the images of a packed dataset."""
+
+    def __init__(self, dataset_dir: str):
+        """Read the index, entries appended later are loaded on demand."""
+        self.dataset_dir = dataset_dir
+        self._index: Dict[int, Tuple[int, int, int]] = {}
+        self._index_bytes_read = 0
+        self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(index_path(self.dataset_dir), "rb") as f:
+                f.seek(self._index_bytes_read)
+                new_bytes = f.read()
+        except FileNotFoundError:
+            return
+        # Ignore a partially written entry at the end
+        usable_length = len(new_bytes) - len(new_bytes) % INDEX_ENTRY.size
+        entries = frombuffer(new_bytes[:usable_length], dtype=INDEX_DTYPE)
+        for image_id, shard, offset, length in entries.tolist():
+            self._index[image_id] = (shard, offset, length)
+        self._index_bytes_read += usable_length
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, image_id: int) -> bool:
+        return self._lookup(image_id) is not None
+
+    def _lookup(self, image_id: int) -> Optional[Tuple[int, int, int]]:
+        if image_id not in self._index:
+            self._load_index()
+        return self._index.get(image_id)
+
+    def pointer(self, image_id: int) -> ShardPointer:
+        """Get the location of an image."""
+        entry = self._lookup(image_id)
+        if entry is None:
+            raise KeyError(
+                "Image {} not in {}".format(image_id, self.dataset_dir)
+            )
+        shard, offset, length = entry
+        return ShardPointer(
+            shard_path(self.dataset_dir, shard), offset, length
+        )
+
+    def read(self, image_id: int) -> bytes:
+        """Get the encoded image."""
+        return read_pointer(self.pointer(image_id))
+
+
+# Per process caches, shards and index only grow
+_mmaps: Dict[str, mmap] = {}
+_readers: Dict[str, ShardReader] = {}
+
+
+def read_pointer(pointer: ShardPointer) -> bytes:
+    """Get the encoded image at a location."""
+    shard_mmap = _mmaps.get(pointer.shard_path)
+    start, end = pointer.offset, pointer.offset + pointer.length
+    if shard_mmap is None or len(shard_mmap) < end:
+        # The shard grew since it was mapped
+        if shard_mmap is not None:
+            shard_mmap.close()
+        with open(pointer.shard_path, "rb") as f:
+            shard_mmap = mmap(f.fileno(), 0, access=ACCESS_READ)
+        _mmaps[pointer.shard_path] = shard_mmap
+    return shard_mmap[slice(start, end)]
+
+
+def get_reader(dataset_dir: str) -> ShardReader:
+    """Get the cached reader of a dataset."""
+    reader = _readers.get(dataset_dir)
+    if reader is None:
+        reader = ShardReader(dataset_dir)
+        _readers[dataset_dir] = reader
+    return reader
+
+
+def forget(dataset_dir: str):
+    """Drop cached readers and mappings, e.g. before deleting a dataset.
+
+    Shards in sub folders of the dataset are dropped as well.
+    """
+
+    def inside(path: str) -> bool:
+        return path == dataset_dir or path.startswith(dataset_dir + os.sep)
+
+    for directory in [d for d in _readers if inside(d)]:
+        _readers.pop(directory)
+    for path in [p for p in _mmaps if inside(os.path.dirname(p))]:
+        _mmaps.pop(path).close()
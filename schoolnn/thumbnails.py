@@ -0,0 +1,46 @@
+"""Precomputed smaller versions of the images of a dataset."""
+import os
+from io import BytesIO
+from typing import Dict, Optional
+from PIL import Image as ImagePillow
+
+THUMBNAIL_SIZES = (64, 128, 256)
+
+
+def image_dir(dataset_dir: str, size: Optional[int] = None) -> str:
+    """Get the folder of the originals or of the thumbnails of a size."""
+    if size is None:
+        return dataset_dir
+    if size not in THUMBNAIL_SIZES:
+        raise ValueError("No thumbnails of size {}".format(size))
+    return os.path.join(dataset_dir, "thumbnails-{}".format(size))
+
+
+def nearest_thumbnail_size(target_size: int) -> Optional[int]:
+    """Get the smallest thumbnail size not below a target size."""
+    for size in sorted(THUMBNAIL_SIZES):
+        if size >= target_size:
+            return size
+    return None
+
+
+def jpeg_bytes(image_pil: ImagePillow.Image) -> bytes:
+    """Encode an image as JPEG."""
+    image_jpeg = BytesIO()
+    image_pil.convert("RGB").save(image_jpeg, format="JPEG")
+    return image_jpeg.getvalue()
+
+
+def thumbnail_jpegs(image_pil: ImagePillow.Image) -> Dict[int, bytes]:
+    """Get the JPEG encoded thumbnails of a square image by size.
+
+    Images smaller than a thumbnail size are not enlarged, so every size
+    exists for every image.
+    """
+    thumbnails = {}
+    for size in THUMBNAIL_SIZES:
+        thumbnail = image_pil
+        if max(image_pil.size) > size:
+            thumbnail = image_pil.resize((size, size), ImagePillow.ANTIALIAS)
+        thumbnails[size] = jpeg_bytes(thumbnail)
+    return thumbnails
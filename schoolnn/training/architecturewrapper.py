@@ -145,9 +145,14 @@ class WrappedArchitecture:
         for dict_layer in self.json_representation:
             keras_model.add(_dict_to_layer(dict_layer))
 
-        # add auto generated output layer
+        # add auto generated output layer, softmax is kept in float32
+        # for numeric stability if mixed precision is used
         keras_model.add(
-            layers.Dense(units=output_dimension, activation="softmax")
+            layers.Dense(
+                units=output_dimension,
+                activation="softmax",
+                dtype="float32",
+            )
         )
 
         keras_model.compile()
@@ -1,15 +1,24 @@
 """Generate batches for training and validation."""
+import os
 from typing import List, Tuple, Optional, Union, Dict
 from multiprocessing.pool import Pool, AsyncResult
 from queue import Queue
 from random import shuffle, seed, randint
+from time import time
 from io import BytesIO
 from numpy import array
 from tensorflow.keras import utils
 from imgaug import augmenters
 from PIL import ImageOps, Image as PillowImage
 from PIL.JpegImagePlugin import JpegImageFile
+from .cpu_budget import current_budget, pin_decode_worker
 from .one_hot_coding import get_one_hot_encoder
+from .profiling import profile_dir_or_none, worker_profile
+from .watchdog import exit_with_parent
+from ..database import retry_when_locked
+from ..instrumentation import BATCHES, BATCH_QUEUE_FILL, BATCH_WAIT_SECONDS
+from ..shards import ShardPointer, read_pointer
+from ..thumbnails import nearest_thumbnail_size
 from ..models import (
     TrainingPass,
     Image,
@@ -17,10 +26,13 @@ from ..models import (
 
 
 def image_to_numpy_array(
-    image: Union[str, bytes, BytesIO, JpegImageFile],
+    image: Union[str, ShardPointer, bytes, BytesIO, JpegImageFile],
     target_dimensions: Tuple[int, int],
 ) -> array:
     """Get an image as a numpy array."""
+    if isinstance(image, ShardPointer):
+        image = read_pointer(image)
+
     if isinstance(image, (str, BytesIO)):
         image_pil = PillowImage.open(image)
     elif isinstance(image, bytes):
@@ -56,47 +68,96 @@ def numpy_image_batch_to_x_batch(
 class BatchTask:
     """Task to calculate one batch, used by process pool."""
 
-    def __init__(self, filepaths: List[str], labels_hotencoded: List[array]):
-        """Initialize batch task."""
-        self.filepaths = filepaths
+    def __init__(
+        self,
+        image_sources: List[Union[str, ShardPointer]],
+        labels_hotencoded: List[array],
+        profile_dir: Optional[str] = None,
+    ):
+        """Initialize batch task, profile it if a profile dir is given."""
+        self.image_sources = image_sources
         self.labels_hotencoded = labels_hotencoded
+        self.profile_dir = profile_dir
 
     def process(
         self, image_dimensions: Tuple[int, int]
     ) -> Tuple[array, array]:
         """Do the heavy work and get x and y of a batch."""
-        images_array = [
-            image_to_numpy_array(p, target_dimensions=image_dimensions)
-            for p in self.filepaths
-        ]
-        # augment and make to float array
-        x = numpy_image_batch_to_x_batch(array(images_array))
-        y = array(self.labels_hotencoded)
+        with worker_profile(self.profile_dir):
+            images_array = [
+                image_to_numpy_array(s, target_dimensions=image_dimensions)
+                for s in self.image_sources
+            ]
+            # augment and make to float array
+            x = numpy_image_batch_to_x_batch(array(images_array))
+            y = array(self.labels_hotencoded)
         return x, y
 
 
+def _initialize_decode_worker(
+    parent_pid: int, decode_cpus: Optional[Tuple[int, ...]]
+):
+    exit_with_parent(parent_pid)
+    if decode_cpus is not None:
+        pin_decode_worker(decode_cpus)
+
+
+# Decode pools by process id and size, kept for the following passes
+_decode_pools: Dict[Tuple[int, int], Pool] = {}
+
+
+def decode_pool(processes_count: Optional[int] = None) -> Pool:
+    """Get the decode pool shared by all batch generators of this process.
+
+    Without processes_count, there is a decode process per decode CPU of
+    the process's CPU budget, four if there is none. Training and
+    validation generator take turns: a phase gets all batches it ordered
+    before the next one starts, so the active phase has the pool to itself.
+    """
+    budget = current_budget()
+    if processes_count is None:
+        processes_count = len(budget.decode_cpus) if budget else 4
+    # Pools inherited from a forked parent process do not work
+    key = (os.getpid(), processes_count)
+    if key not in _decode_pools:
+        _decode_pools[key] = Pool(
+            processes_count,
+            initializer=_initialize_decode_worker,
+            initargs=(os.getpid(), budget.decode_cpus if budget else None),
+        )
+    return _decode_pools[key]
+
+
 class MultiprocessingBatchGenerator(utils.Sequence):
     """Precalculate batches, outsource heavy work to threadpool."""
 
+    # Label value of the exported metrics
+    metrics_name = "generic"
+
     def __init__(
         self,
         batch_size: int,
         training_pass: TrainingPass,
         image_dimensions: Tuple[int, int],
-        processes_count: int = 4,
+        processes_count: Optional[int] = None,
         precalculate_batches_count: int = 8,
     ):
-        """Initialize batch generator."""
+        """Initialize batch generator, decoding in the shared pool."""
         self.training_pass = training_pass
         self.image_dimensions = image_dimensions
-        self.hotencoder = get_one_hot_encoder(dataset=training_pass.dataset_id)
+        self.dataset = training_pass.dataset_id
+        # Decode the smallest stored version still large enough
+        self.source_size = nearest_thumbnail_size(max(image_dimensions))
+        self.hotencoder = get_one_hot_encoder(dataset=self.dataset)
         self.batch_task_queue: "Queue[AsyncResult]" = Queue()
-        self.pool = Pool(processes_count)
+        self.pool = decode_pool(processes_count)
         self.batch_size = batch_size
         self.batch_count = 0
         self.batches_yielded_count = 0
         self.batches_in_queue_not_fetched = 0
         self.precalculate_batches_count = precalculate_batches_count
+        # Time spent blocking on the pool since the last reset
+        self.data_wait_seconds = 0.0
         # Keras asks sometimes for the same batch
         # twice, meaning running __getitem__(0) twice
         self.deduplication_dict: Dict[int, array] = {}
@@ -107,12 +168,12 @@ class MultiprocessingBatchGenerator(utils.Sequence):
     def pop_image(self) -> Image:
         raise NotImplementedError()
 
-    def generate_and_enqueue_batch_task(self):
-        """Generate and enqueue a batch task."""
-        image_filepaths = []
+    def next_batch_task(self) -> BatchTask:
+        """Get the task of the next batch, advancing the image order."""
+        image_sources = []
         labels_hotencoded = []
 
-        while len(image_filepaths) < self.batch_size:
+        while len(image_sources) < self.batch_size:
             image = self.pop_image()
 
             if image.label is None:
@@ -120,12 +181,19 @@ class MultiprocessingBatchGenerator(utils.Sequence):
                 continue
 
             labels_hotencoded.append(self.hotencoder(image.label))
-            image_filepaths.append(image.path)
+            image_sources.append(
+                image.get_source(self.dataset, self.source_size)
+            )
 
-        batch_task = BatchTask(
-            filepaths=image_filepaths,
+        return BatchTask(
+            image_sources=image_sources,
             labels_hotencoded=labels_hotencoded,
+            profile_dir=profile_dir_or_none(self.training_pass),
         )
+
+    def generate_and_enqueue_batch_task(self):
+        """Generate and enqueue a batch task."""
+        batch_task = self.next_batch_task()
         self.batch_task_queue.put(
             self.pool.apply_async(
                 BatchTask.process, (batch_task, self.image_dimensions)
@@ -148,9 +216,17 @@ class MultiprocessingBatchGenerator(utils.Sequence):
             raise ValueError("Trying to yield batch where none was ordered.")
 
         pool_task = self.batch_task_queue.get()
+        wait_start = time()
         batch = pool_task.get()
+        wait_seconds = time() - wait_start
+        self.data_wait_seconds += wait_seconds
         self.batches_in_queue_not_fetched -= 1
         self.batches_yielded_count += 1
+        BATCH_WAIT_SECONDS.observe(wait_seconds, generator=self.metrics_name)
+        BATCHES.inc(generator=self.metrics_name)
+        BATCH_QUEUE_FILL.set(
+            self.batches_in_queue_not_fetched, generator=self.metrics_name
+        )
         self.deduplication_dict[index] = batch
         return batch
 
@@ -158,33 +234,46 @@ class MultiprocessingBatchGenerator(utils.Sequence):
         self.batch_count = batch_count
         self.batches_yielded_count = 0
         self.deduplication_dict = {}
+        self.data_wait_seconds = 0.0
         generate_max = min(self.precalculate_batches_count, batch_count)
         while self.batches_in_queue_not_fetched < generate_max:
             self.generate_and_enqueue_batch_task()
+        BATCH_QUEUE_FILL.set(
+            self.batches_in_queue_not_fetched, generator=self.metrics_name
+        )
 
     def close(self):
-        self.pool.close()
-        self.pool.join()
+        """Wait for ordered batches, the shared pool keeps running."""
+        while not self.batch_task_queue.empty():
+            self.batch_task_queue.get().wait()
+        self.batches_in_queue_not_fetched = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
 
 class BatchGeneratorTraining(MultiprocessingBatchGenerator):
     """Generate batches for model fitting."""
 
+    metrics_name = "training"
+
     def __init__(
         self,
         image_list: List[Image],
         training_pass: TrainingPass,
         image_dimensions: Tuple[int, int],
-        processes_count=4,
+        processes_count: Optional[int] = None,
         precalculate_batches_count=8,
     ):
         """Get a generator for batches of images and labels for training."""
         self.image_list = image_list
         self.training_pass = training_pass
-        self.image_list_shuffled = image_list[:]  # copy list
-
-        seed(self.training_pass.id + self.training_pass.epoche)
-        shuffle(self.image_list_shuffled)
+        self.image_list_shuffled = self._shuffled_images()
+        # Epoche and offset before each ordered batch of the block
+        self.batch_positions: List[Tuple[int, int]] = []
 
         super().__init__(
             batch_size=training_pass.training_parameter.batch_size,
@@ -194,36 +283,72 @@ class BatchGeneratorTraining(MultiprocessingBatchGenerator):
             precalculate_batches_count=precalculate_batches_count,
         )
 
+    def _shuffled_images(self) -> List[Image]:
+        # copy, to not shuffle original
+        images = self.image_list[:]
+        seed(self.training_pass.id + self.training_pass.epoche)
+        shuffle(images)
+        return images
+
     def pop_image(self) -> Image:
         """Get an image and increase internal counter."""
         if self.training_pass.epoche_offset >= len(self.image_list_shuffled):
             self.training_pass.epoche += 1
             self.training_pass.epoche_offset = 0
-
-            # copy, to not shuffle original
-            self.image_list_shuffled = self.image_list[:]
-            seed(self.training_pass.id + self.training_pass.epoche)
-            shuffle(self.image_list_shuffled)
+            self.image_list_shuffled = self._shuffled_images()
 
         image = self.image_list_shuffled[self.training_pass.epoche_offset]
         self.training_pass.epoche_offset += 1
         return image
 
+    def generate_and_enqueue_batch_task(self):
+        self.batch_positions.append(
+            (self.training_pass.epoche, self.training_pass.epoche_offset)
+        )
+        super().generate_and_enqueue_batch_task()
+
+    def reset_batch_count(self, batch_count: int):
+        # Batches still ordered become the first ones of the block
+        fetched_count = (
+            len(self.batch_positions) - self.batches_in_queue_not_fetched
+        )
+        self.batch_positions = self.batch_positions[fetched_count:]
+        super().reset_batch_count(batch_count)
+
+    def rewind(self, trained_batch_count: int):
+        """Continue after the first trained_batch_count batches of the block.
+
+        Used when fitting stopped early, the images of the batches ordered
+        but not trained are handed out again. The position is saved.
+        """
+        if trained_batch_count < len(self.batch_positions):
+            self.close()
+            epoche, epoche_offset = self.batch_positions[trained_batch_count]
+            if epoche != self.training_pass.epoche:
+                self.training_pass.epoche = epoche
+                self.image_list_shuffled = self._shuffled_images()
+            self.training_pass.epoche_offset = epoche_offset
+            self.batch_positions = []
+        self.on_epoch_end()
+
     def on_epoch_end(self):
         """Callback for keras."""
-        self.training_pass.save(update_fields=["epoche", "epoche_offset"])
-
-    def __del__(self):
-        super().close()
+        retry_when_locked(
+            lambda: self.training_pass.save(
+                update_fields=["epoche", "epoche_offset"]
+            )
+        )
 
 
 class BatchGeneratorValidation(MultiprocessingBatchGenerator):
+    metrics_name = "validation"
+
     def __init__(
         self,
         image_list: List[Image],
         training_pass: TrainingPass,
         image_dimensions: Tuple[int, int],
-        processes_count=4,
+        processes_count: Optional[int] = None,
         precalculate_batches_count=8,
     ):
         """Get a generator for batches of images and labels for validation."""
@@ -0,0 +1,62 @@
+"""Notice pause and stop requests while a block is trained.
+
+The training loop checks the status of a pass only between blocks. The
+callback polls the status column between the batches of a block and ends
+the fit once a pause or stop is requested, so the block is checkpointed
+after the current batch instead of after all of them.
+"""
+from time import time
+from typing import Optional
+from tensorflow.keras import callbacks
+from ..models import TrainingPass, TrainingPassState
+
+# Minimal time between two status queries of a block
+CANCELLATION_POLL_SECONDS = 0.5
+
+_CANCELLING_STATES = (
+    TrainingPassState.PAUSE_REQUESTED.value,
+    TrainingPassState.STOP_REQUESTED.value,
+)
+
+
+def cancellation_requested(training_pass_id: int) -> bool:
+    """Whether the pass is requested to pause or stop, or was deleted.
+
+    Reads the status column only, readers are not blocked by writers.
+    """
+    status = (
+        TrainingPass.objects.filter(pk=training_pass_id)
+        .values_list("status", flat=True)
+        .first()
+    )
+    return status is None or status in _CANCELLING_STATES
+
+
+class CancellationCallback(callbacks.Callback):
+    """Stop fitting when the pass is requested to pause or stop."""
+
+    def __init__(
+        self,
+        training_pass_id: int,
+        poll_seconds: float = CANCELLATION_POLL_SECONDS,
+    ):
+        """Create a callback polling at most every poll_seconds."""
+        super().__init__()
+        self.training_pass_id = training_pass_id
+        self.poll_seconds = poll_seconds
+        self.cancelled = False
+        self.trained_batch_count = 0
+        self._last_poll: Optional[float] = None
+
+    def on_train_batch_end(self, batch, logs=None):
+        self.trained_batch_count += 1
+        now = time()
+        if (
+            self._last_poll is not None
+            and now - self._last_poll < self.poll_seconds
+        ):
+            return
+        self._last_poll = now
+        if cancellation_requested(self.training_pass_id):
+            self.cancelled = True
+            self.model.stop_training = True
@@ -0,0 +1,74 @@
+"""XLA and mixed precision options for training on CPUs."""
+from contextlib import contextmanager
+from time import time
+from typing import List
+from tensorflow.keras import callbacks, mixed_precision, models
+from ..models import Precision, TrainingParameter
+
+_CPUINFO_PATH = "/proc/cpuinfo"
+
+# CPU flags indicating native bfloat16 arithmetic
+_BFLOAT16_CPU_FLAGS = {"avx512_bf16", "amx_bf16"}
+
+
+def cpu_supports_bfloat16() -> bool:
+    """Check whether the CPU has native bfloat16 instructions."""
+    try:
+        with open(_CPUINFO_PATH) as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith("flags"):
+                    flags = set(line.split(":", 1)[1].split())
+                    return bool(flags & _BFLOAT16_CPU_FLAGS)
+    except OSError:
+        pass
+    return False
+
+
+def effective_precision(precision: Precision) -> Precision:
+    """Fall back to float32 if the CPU cannot compute in bfloat16."""
+    if precision == Precision.MIXED_BFLOAT16 and not cpu_supports_bfloat16():
+        return Precision.FLOAT32
+    return precision
+
+
+@contextmanager
+def precision_policy(precision: Precision):
+    """Build keras layers with the given precision inside this context."""
+    previous_policy = mixed_precision.global_policy()
+    mixed_precision.set_global_policy(effective_precision(precision).value)
+    try:
+        yield
+    finally:
+        mixed_precision.set_global_policy(previous_policy)
+
+
+def apply_compile_options(
+    model: models.Model, training_parameter: TrainingParameter
+):
+    """Apply options of a loaded model not persisted by keras."""
+    # Resets the cached train function if the value changes
+    model.jit_compile = training_parameter.jit_compile
+
+
+class StepTimeCallback(callbacks.Callback):
+    """Measure the duration of every training step (batch)."""
+
+    def __init__(self):
+        """Create a callback without any measurements."""
+        super().__init__()
+        self.step_seconds: List[float] = []
+        self._step_start = 0.0
+
+    def on_train_batch_begin(self, batch, logs=None):
+        self._step_start = time()
+
+    def on_train_batch_end(self, batch, logs=None):
+        self.step_seconds.append(time() - self._step_start)
+
+    @property
+    def step_milliseconds(self) -> float:
+        """Median step time, ignoring the first (tracing) step."""
+        steps = sorted(self.step_seconds[1:] or self.step_seconds)
+        if not steps:
+            return 0.0
+        return 1000 * steps[len(steps) // 2]
@@ -0,0 +1,132 @@
+"""Split the CPUs between training processes and their decode workers.
+
+Unpinned, TensorFlow starts a thread per core for every training process
+and the decode workers of both batch generators compete with these
+threads, so step times vary with the decoding load. With
+TRAINING_DECODE_CPUS set, the CPUs of TRAINING_CPUS (all available ones by
+default) are split into disjoint, contiguous sets, one per training
+process (TRAINING_WORKERS). Of each set, TRAINING_DECODE_CPUS CPUs run the
+decode workers and the others TensorFlow, whose thread pools and OpenMP
+are sized to them.
+"""
+import logging
+import os
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+from tensorflow.config import threading
+from schoolnn_app.settings import TRAINING_CPUS, TRAINING_DECODE_CPUS
+
+logger = logging.getLogger(__name__)
+
+
+class CpuBudget(NamedTuple):
+    """CPUs of a training process and of its decode workers."""
+
+    compute_cpus: Tuple[int, ...]
+    decode_cpus: Tuple[int, ...]
+
+
+# Budget applied to this process, None if unpinned
+_budget: Optional[CpuBudget] = None
+
+
+def parse_cpu_list(cpu_list: str) -> List[int]:
+    """Parse a list like "0-3,8" as used by taskset and cgroups."""
+    cpus = set()
+    for part in cpu_list.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cpus.update(range(int(first), int(last or first) + 1))
+    return sorted(cpus)
+
+
+def available_cpus() -> List[int]:
+    return sorted(os.sched_getaffinity(0))
+
+
+def split_cpus(cpus: Sequence[int], parts: int) -> List[Tuple[int, ...]]:
+    """Split cpus into contiguous sets of nearly equal size.
+
+    Contiguous sets keep the cores of a NUMA node together. With fewer
+    CPUs than parts, sets are shared.
+    """
+    cpus = sorted(cpus)
+    if len(cpus) < parts:
+        return [(cpus[i % len(cpus)],) for i in range(parts)]
+    size, larger_count = divmod(len(cpus), parts)
+    sets = []
+    start = 0
+    for i in range(parts):
+        end = start + size + (i < larger_count)
+        sets.append(tuple(cpus[slice(start, end)]))
+        start = end
+    return sets
+
+
+def cpu_budgets(
+    cpus: Sequence[int], worker_count: int, decode_cpu_count: int
+) -> List[CpuBudget]:
+    """Get the budgets of worker_count training processes.
+
+    Every process keeps at least one CPU for TensorFlow, with a single
+    CPU the decode workers share it.
+    """
+    budgets = []
+    for cpu_set in split_cpus(cpus, worker_count):
+        decode_count = min(decode_cpu_count, len(cpu_set) - 1)
+        budgets.append(
+            CpuBudget(
+                compute_cpus=cpu_set[decode_count:],
+                decode_cpus=cpu_set[:decode_count] or cpu_set,
+            )
+        )
+    return budgets
+
+
+def configured_budgets(worker_count: int) -> List[Optional[CpuBudget]]:
+    """Get the budgets of the training processes, None when unpinned."""
+    if TRAINING_DECODE_CPUS <= 0:
+        return [None] * worker_count
+    cpus = parse_cpu_list(TRAINING_CPUS) if TRAINING_CPUS else None
+    return cpu_budgets(
+        cpus or available_cpus(), worker_count, TRAINING_DECODE_CPUS
+    )
+
+
+def current_budget() -> Optional[CpuBudget]:
+    return _budget
+
+
+def limit_threads(cpus: Sequence[int]):
+    """Size the thread pools of TensorFlow and OpenMP to the cpus.
+
+    Must run before TensorFlow executes its first operation, later the
+    pools keep their size and a warning is logged.
+    """
+    threads = len(cpus)
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    try:
+        threading.set_intra_op_parallelism_threads(threads)
+        # Keras models are mostly a chain of layers
+        threading.set_inter_op_parallelism_threads(min(2, threads))
+    except RuntimeError as error:
+        logger.warning(
+            "TensorFlow thread pools not limited to %d threads: %s",
+            threads,
+            error,
+        )
+
+
+def apply_budget(budget: CpuBudget):
+    """Pin this training process to the compute CPUs of its budget."""
+    global _budget
+    _budget = budget
+    os.sched_setaffinity(0, budget.compute_cpus)
+    limit_threads(budget.compute_cpus)
+
+
+def pin_decode_worker(cpus: Sequence[int]):
+    """Pin a decode worker, initializer of the batch generator pools."""
+    os.sched_setaffinity(0, cpus)
+    os.environ["OMP_NUM_THREADS"] = "1"
@@ -0,0 +1,254 @@
+"""Data parallel training of one pass in several processes.
+
+The batches of a block are cut from the training generator in the
+training process as in serial training, so epoche and epoche_offset
+advance exactly the same and a pass can be paused and resumed in either
+mode. The batches are dealt round-robin to the worker processes, which
+decode the images, train their copy of the model starting from the same
+weights and send the trained weights back. Their average, weighted by
+the number of batches, becomes the weights of the block's checkpoint
+(parameter averaging). Every worker keeps the state of its optimizer
+between blocks, the checkpoint stores the optimizer state it was loaded
+with. The workers split the CPUs of the training process between them.
+"""
+import multiprocessing
+import os
+from multiprocessing.connection import Connection
+from statistics import median
+from time import time
+from typing import List, NamedTuple, Optional, Tuple
+from numpy import average, concatenate, ndarray, stack
+from tensorflow.keras import models
+from .batch_generator import BatchGeneratorTraining, BatchTask
+from .compile_options import apply_compile_options
+from .cpu_budget import (
+    available_cpus,
+    current_budget,
+    limit_threads,
+    split_cpus,
+)
+from .do_training_block import bytes_to_keras_model
+from .watchdog import exit_with_parent
+from ..models import TrainingParameter, TrainingPass
+
+MAX_DATA_PARALLEL_WORKERS = 16
+# Time a worker gets to finish its shard when the trainer is closed
+CLOSE_TIMEOUT_SECONDS = 60
+
+# Workers are spawned, forking after TensorFlow started hangs
+_SPAWN = multiprocessing.get_context("spawn")
+
+
+class ShardResult(NamedTuple):
+    """Trained weights and metrics of one worker in one block."""
+
+    weights: List[ndarray]
+    batch_count: int
+    loss: float
+    accuracy: float
+    step_milliseconds: float
+
+
+class BlockResult(NamedTuple):
+    """Metrics of the shards of a block, averaged by batch count."""
+
+    loss: float
+    accuracy: float
+    step_milliseconds: float
+
+
+def average_weights(
+    weight_lists: List[List[ndarray]], counts: List[int]
+) -> List[ndarray]:
+    """Average the weights of several models of one architecture."""
+    return [
+        average(stack(layer_weights), axis=0, weights=counts).astype(
+            layer_weights[0].dtype
+        )
+        for layer_weights in zip(*weight_lists)
+    ]
+
+
+def _train_shard(
+    model: models.Model,
+    batch_tasks: List[BatchTask],
+    image_dimensions: Tuple[int, int],
+    batch_size: int,
+) -> ShardResult:
+    batches = [task.process(image_dimensions) for task in batch_tasks]
+    fit_start = time()
+    history = model.fit(
+        concatenate([x for x, _ in batches]),
+        concatenate([y for _, y in batches]),
+        batch_size=batch_size,
+        shuffle=False,
+        verbose=0,
+    )
+    return ShardResult(
+        weights=model.get_weights(),
+        batch_count=len(batch_tasks),
+        loss=history.history["loss"][0],
+        accuracy=history.history["precision"][0],
+        step_milliseconds=1000 * (time() - fit_start) / len(batch_tasks),
+    )
+
+
+def _worker(
+    connection: Connection,
+    parent_pid: int,
+    cpus: Tuple[int, ...],
+    pinned: bool,
+):
+    """Train shards of blocks until None is received."""
+    exit_with_parent(parent_pid)
+    if pinned:
+        os.sched_setaffinity(0, cpus)
+    limit_threads(cpus)
+    model: Optional[models.Model] = None
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            # The training process closed its end without saying goodbye
+            break
+        if message is None:
+            break
+        (
+            checkpoint,
+            weights,
+            training_parameter_json,
+            learning_rate,
+            batch_tasks,
+            image_dimensions,
+        ) = message
+        try:
+            training_parameter = TrainingParameter.from_dict(
+                training_parameter_json
+            )
+            if checkpoint is not None:
+                model = bytes_to_keras_model(checkpoint)
+            model.set_weights(weights)
+            apply_compile_options(model, training_parameter)
+            model.optimizer.learning_rate = learning_rate
+            connection.send(
+                _train_shard(
+                    model,
+                    batch_tasks,
+                    image_dimensions,
+                    training_parameter.batch_size,
+                )
+            )
+        except Exception as e:
+            connection.send(e)
+    connection.close()
+
+
+class DataParallelTrainer:
+    """Worker processes training the blocks of one pass together."""
+
+    def __init__(self, worker_count: int):
+        """Start the worker processes, sharing the CPU cores.
+
+        With a CPU budget, the workers are pinned to its compute CPUs.
+        """
+        budget = current_budget()
+        cpus = budget.compute_cpus if budget else available_cpus()
+        self.connections: List[Connection] = []
+        self.processes: List[multiprocessing.Process] = []
+        for cpu_set in split_cpus(cpus, worker_count):
+            connection, worker_connection = _SPAWN.Pipe()
+            process = _SPAWN.Process(
+                target=_worker,
+                args=(
+                    worker_connection,
+                    os.getpid(),
+                    cpu_set,
+                    budget is not None,
+                ),
+                daemon=True,
+            )
+            process.start()
+            worker_connection.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+        # Workers are sent the checkpoint once, then only weights
+        self._workers_loaded = False
+
+    def fit(
+        self,
+        model: models.Model,
+        training_pass: TrainingPass,
+        training_generator: BatchGeneratorTraining,
+        batch_count: int,
+    ) -> BlockResult:
+        """Train batch_count batches on the workers.
+
+        model must be loaded from the pass's checkpoint and have the
+        learning rate of the block, it is given the averaged weights.
+        """
+        batch_tasks = [
+            training_generator.next_batch_task() for _ in range(batch_count)
+        ]
+        training_generator.on_epoch_end()
+
+        checkpoint = (
+            None if self._workers_loaded else bytes(training_pass.checkpoint)
+        )
+        weights = model.get_weights()
+        worker_count = len(self.connections)
+        busy_connections = []
+        for i, connection in enumerate(self.connections):
+            shard = batch_tasks[slice(i, None, worker_count)]
+            if not shard:
+                continue
+            connection.send(
+                (
+                    checkpoint,
+                    weights,
+                    training_pass.training_parameter_json,
+                    float(model.optimizer.learning_rate),
+                    shard,
+                    training_generator.image_dimensions,
+                )
+            )
+            busy_connections.append(connection)
+
+        results = [connection.recv() for connection in busy_connections]
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        # Workers without a shard did not load the checkpoint
+        self._workers_loaded = len(busy_connections) == worker_count
+
+        counts = [result.batch_count for result in results]
+        model.set_weights(
+            average_weights([result.weights for result in results], counts)
+        )
+        return BlockResult(
+            loss=float(average([r.loss for r in results], weights=counts)),
+            accuracy=float(
+                average([r.accuracy for r in results], weights=counts)
+            ),
+            step_milliseconds=median(r.step_milliseconds for r in results),
+        )
+
+    def close(self):
+        """Stop the workers, terminating those not stopping in time."""
+        for connection in self.connections:
+            try:
+                connection.send(None)
+            except OSError:
+                # The worker is gone already
+                pass
+            connection.close()
+        for process in self.processes:
+            process.join(CLOSE_TIMEOUT_SECONDS)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,5 +1,6 @@
 """Runs one block of training for a few seconds."""
 from io import BytesIO
+from typing import TYPE_CHECKING, Optional
 from tensorflow.keras import models
 from django.db import transaction
 from schoolnn_app.settings import (
@@ -9,10 +10,28 @@ from .batch_generator import (
     BatchGeneratorTraining,
     BatchGeneratorValidation,
 )
+from .cancellation import CancellationCallback
+from .compile_options import (
+    StepTimeCallback,
+    apply_compile_options,
+    effective_precision,
+)
+from .profiling import tensorflow_trace
+from .progress import ProgressCallback, prune_progress, publish_progress
+from .telemetry import BlockPhase, BlockTelemetry
+from ..instrumentation import (
+    TRAINING_BLOCKS,
+    TRAINING_BLOCK_PHASE_SECONDS,
+    TRAINING_IMAGES,
+)
+from ..database import retry_when_locked
 from ..models import TrainingPass, TrainingStepMetrics
+from time import time
 import tempfile
 from os import path
-from json import dumps
+
+if TYPE_CHECKING:
+    from .data_parallel import DataParallelTrainer
 
 
 def keras_model_to_bytes(keras_model: models.Model) -> bytes:
@@ -42,14 +61,32 @@ def do_training_block(
     training_generator: BatchGeneratorTraining,
     validation_generator: BatchGeneratorValidation,
     verbose: bool = False,
-):
-    """Continue a training pass, train the model and save metrics."""
-    model = bytes_to_keras_model(training_pass_to_continue.model_weights)
+    trace_tensorflow: bool = False,
+    learning_rate: Optional[float] = None,
+    data_parallel: Optional["DataParallelTrainer"] = None,
+) -> dict:
+    """Continue a training pass, train the model and save metrics.
+
+    If trace_tensorflow is set and the training pass is profiled with
+    TensorFlow, a profiler trace of the fit step is recorded. A given
+    learning_rate replaces the one of the optimizer. With data_parallel
+    the training batches are trained by its worker processes. Returns the
+    metrics of the block.
+
+    A serially trained block ends after the current batch once the pass is
+    requested to pause or stop. Its checkpoint is saved without validation
+    and metrics, "cancelled" of the returned metrics is set.
+    """
+    telemetry = BlockTelemetry()
+    with telemetry.measure(BlockPhase.MODEL_LOAD):
+        model = bytes_to_keras_model(training_pass_to_continue.checkpoint)
+    training_parameter = training_pass_to_continue.training_parameter
+    apply_compile_options(model, training_parameter)
+    if learning_rate is not None:
+        model.optimizer.learning_rate = learning_rate
 
     # Get shape without batch size and rgb = 3
-    validation_split = (
-        training_pass_to_continue.training_parameter.validation_split
-    )
+    validation_split = training_parameter.validation_split
     validation_batch_count = (
         int(validation_split * TRAINING_BLOCK_BATCH_COUNT) + 1
     )
@@ -59,54 +96,166 @@ def do_training_block(
 
     progress_bar_printing = verbose * 1
     # Training
-    training_generator.reset_batch_count(training_batch_count)
-    training_metrics = model.fit(
-        training_generator,
-        verbose=progress_bar_printing,
+    fit_start = time()
+    cancelled = False
+    trained_batch_count = training_batch_count
+    if data_parallel is None:
+        training_generator.reset_batch_count(training_batch_count)
+        step_time_callback = StepTimeCallback()
+        cancellation_callback = CancellationCallback(
+            training_pass_to_continue.id
+        )
+        with tensorflow_trace(training_pass_to_continue, trace_tensorflow):
+            training_metrics = model.fit(
+                training_generator,
+                verbose=progress_bar_printing,
+                callbacks=[
+                    step_time_callback,
+                    cancellation_callback,
+                    ProgressCallback(
+                        training_pass_to_continue.id,
+                        training_parameter.batch_size,
+                    ),
+                ],
+            )
+        cancelled = cancellation_callback.cancelled
+        if cancelled:
+            trained_batch_count = cancellation_callback.trained_batch_count
+            training_generator.rewind(trained_batch_count)
+        training_loss = training_metrics.history["loss"][0]
+        training_accuracy = training_metrics.history["precision"][0]
+        step_milliseconds = step_time_callback.step_milliseconds
+        data_wait_seconds = training_generator.data_wait_seconds
+    else:
+        # Decoding happens in the workers, as part of their compute time
+        block_result = data_parallel.fit(
+            model,
+            training_pass_to_continue,
+            training_generator,
+            training_batch_count,
+        )
+        training_loss = block_result.loss
+        training_accuracy = block_result.accuracy
+        step_milliseconds = block_result.step_milliseconds
+        data_wait_seconds = 0.0
+    fit_seconds = time() - fit_start
+    data_wait_seconds = min(data_wait_seconds, fit_seconds)
+    telemetry.add(BlockPhase.DATA_WAIT, data_wait_seconds)
+    telemetry.add(BlockPhase.COMPUTE, fit_seconds - data_wait_seconds)
+    telemetry.images_trained = (
+        trained_batch_count * training_parameter.batch_size
     )
 
     # Validation
-    validation_generator.reset_batch_count(validation_batch_count)
-    validation_metrics = model.evaluate(
-        validation_generator,
-        verbose=progress_bar_printing,
-    )
+    validation_metrics = [None, None]
+    if not cancelled:
+        with telemetry.measure(BlockPhase.VALIDATION):
+            validation_generator.reset_batch_count(validation_batch_count)
+            validation_metrics = model.evaluate(
+                validation_generator,
+                verbose=progress_bar_printing,
+            )
+
+    with telemetry.measure(BlockPhase.CHECKPOINT_SERIALIZATION):
+        model_weights = keras_model_to_bytes(model)
 
     # Saving metrics
-    training_loss = training_metrics.history["loss"][0]
-    training_accuracy = training_metrics.history["precision"][0]
     validation_loss = validation_metrics[0]
     validation_accuray = validation_metrics[1]
 
-    metrics = {
-        "training": {
-            "loss": training_loss,
-            "accuracy": training_accuracy,
-        },
-        "validation": {
-            "loss": validation_loss,
-            "accuracy": validation_accuray,
-        },
-    }
-
-    with transaction.atomic():
-        # Saving new weights
-        training_pass_to_continue.model_weights = keras_model_to_bytes(model)
-        training_pass_to_continue.save(update_fields=["model_weights"])
-
-        TrainingStepMetrics.objects.create(
-            training_pass=training_pass_to_continue,
-            metrics_json=dumps(metrics),
+    def save_block() -> dict:
+        with transaction.atomic():
+            # Saving new weights
+            with telemetry.measure(BlockPhase.DATABASE_WRITE):
+                training_pass_to_continue.model_weights = model_weights
+                training_pass_to_continue.save(update_fields=["model_weights"])
+
+            metrics = {
+                "cancelled": cancelled,
+                "training": {
+                    "loss": training_loss,
+                    "accuracy": training_accuracy,
+                },
+                "validation": {
+                    "loss": validation_loss,
+                    "accuracy": validation_accuray,
+                },
+                "performance": {
+                    "step_milliseconds": step_milliseconds,
+                    "jit_compile": training_parameter.jit_compile,
+                    "data_parallel_workers": (
+                        len(data_parallel.processes) if data_parallel else 1
+                    ),
+                    "learning_rate": float(model.optimizer.learning_rate),
+                    "precision": effective_precision(
+                        training_parameter.precision
+                    ).value,
+                    **telemetry.to_dict(),
+                },
+            }
+
+            if cancelled:
+                # A partial block is no step of the metrics
+                return metrics
+            TrainingStepMetrics.objects.create(
+                training_pass=training_pass_to_continue,
+                epoche=training_pass_to_continue.epoche,
+                epoche_offset=training_pass_to_continue.epoche_offset,
+                training_loss=training_loss,
+                training_accuracy=training_accuracy,
+                validation_loss=validation_loss,
+                validation_accuracy=validation_accuray,
+                duration_milliseconds=round(
+                    1000 * sum(metrics["performance"]["seconds"].values())
+                ),
+                performance_json=metrics["performance"],
+            )
+
+        return metrics
+
+    # Repeated as a whole if the database stays locked
+    metrics = retry_when_locked(save_block)
+
+    if not cancelled:
+        # Blocks are numbered from zero as in the charts
+        block_index = (
+            training_pass_to_continue.trainingstepmetrics_set.count() - 1
+        )
+        publish_progress(
+            training_pass_to_continue.id,
+            "block",
+            {
+                "block": block_index,
+                "training": metrics["training"],
+                "validation": metrics["validation"],
+                "step_milliseconds": step_milliseconds,
+                "images_per_second": metrics["performance"][
+                    "images_per_second"
+                ],
+            },
         )
+        prune_progress(training_pass_to_continue.id)
+
+    for phase, seconds in metrics["performance"]["seconds"].items():
+        TRAINING_BLOCK_PHASE_SECONDS.observe(seconds, phase=phase)
+    TRAINING_IMAGES.inc(telemetry.images_trained)
+    TRAINING_BLOCKS.inc()
 
     if verbose:
         print(
             "Block done. Report:\n"
             "Training loss {}, accuracy {}\n"
-            "Validation loss {}, accuracy {}".format(
+            "Validation loss {}, accuracy {}\n"
+            "Step time {:.1f}ms, {:.1f} images/s\n"
+            "Seconds per phase {}".format(
                 training_loss,
                 training_accuracy,
                 validation_loss,
                 validation_accuray,
+                step_milliseconds,
+                metrics["performance"]["images_per_second"],
+                metrics["performance"]["seconds"],
             )
         )
+
+    return metrics
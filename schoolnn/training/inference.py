@@ -1,5 +1,5 @@
 """Infere with a (partially) trained model."""
-from typing import List
+from typing import Callable, List, Optional
 from io import BytesIO
 from numpy import array
 from base64 import b64encode
@@ -9,6 +9,12 @@ from .do_training_block import bytes_to_keras_model
 from .batch_generator import numpy_image_batch_to_x_batch, image_to_numpy_array
 from .one_hot_coding import get_one_hot_decoder
 from .grad_cam import get_submodels, grad_cam
+from .transfer import inference_model, input_dimensions
+from ..instrumentation import (
+    REGISTRY,
+    INFERENCE_IMAGES,
+    INFERENCE_STAGE_SECONDS,
+)
 
 
 class ClassificationResult:
@@ -20,7 +26,7 @@ class ClassificationResult:
         confidence: float,
         image_for_neural_net_bytes: bytes,
         image_bytes: bytes,
-        image_with_heatmap_bytes: bytes,
+        image_with_heatmap_bytes: Optional[bytes],
     ):
         """Create a classification result."""
         self.label = label
@@ -46,6 +52,8 @@ class ClassificationResult:
 
     @property
     def image_with_heatmap_b64(self):
+        if self.image_with_heatmap_bytes is None:
+            return ""
         return b64encode(self.image_with_heatmap_bytes).decode()
 
     @property
@@ -56,29 +64,67 @@ class ClassificationResult:
 def infere_images(
     training_pass,
     images: List[BytesIO],
+    with_heatmap: bool = True,
 ) -> List[ClassificationResult]:
-    """Classify images."""
-    model = bytes_to_keras_model(training_pass.model_weights)
+    """Classify images, optionally with a Grad-CAM heatmap."""
+    with INFERENCE_STAGE_SECONDS.time(stage="model_load"):
+        model = bytes_to_keras_model(training_pass.checkpoint)
+        if training_pass.training_parameter.transfer_learning:
+            model = inference_model(
+                model,
+                input_dimensions(training_pass.architecture.architecture_json),
+            )
+            # Grad-CAM needs the convolutions at the top level of the model
+            with_heatmap = False
     image_dimensions = model.input_shape[1:-1]
     hot_decoder = get_one_hot_decoder(dataset=training_pass.dataset_id)
 
-    image_batch = array(
-        [
-            image_to_numpy_array(image, target_dimensions=image_dimensions)
-            for image in images
-        ]
-    )
+    with INFERENCE_STAGE_SECONDS.time(stage="preprocessing"):
+        image_batch = array(
+            [
+                image_to_numpy_array(image, target_dimensions=image_dimensions)
+                for image in images
+            ]
+        )
 
-    x_batch = numpy_image_batch_to_x_batch(
-        numpy_image_batch=image_batch,
-        augmenter=None,
-    )
+        x_batch = numpy_image_batch_to_x_batch(
+            numpy_image_batch=image_batch,
+            augmenter=None,
+        )
 
     # Keep batch size small to not use much (GPU) RAM.
     # A training could be running.
-    predictions = model.predict(x=x_batch, batch_size=4, verbose=False)
+    with INFERENCE_STAGE_SECONDS.time(stage="prediction"):
+        predictions = model.predict(x=x_batch, batch_size=4, verbose=False)
+
+    with INFERENCE_STAGE_SECONDS.time(stage="grad_cam"):
+        result = _classification_results(
+            model=model,
+            images=images,
+            image_batch=image_batch,
+            x_batch=x_batch,
+            predictions=predictions,
+            hot_decoder=hot_decoder,
+            with_heatmap=with_heatmap,
+        )
+
+    INFERENCE_IMAGES.inc(len(result))
+    REGISTRY.flush()
+    return result
 
-    grad_cam_a, grad_cam_b = get_submodels(model)
+
+def _classification_results(
+    model,
+    images: List[BytesIO],
+    image_batch: array,
+    x_batch: array,
+    predictions: array,
+    hot_decoder: Callable,
+    with_heatmap: bool,
+) -> List[ClassificationResult]:
+    """Calculate heatmaps and wrap everything up."""
+    if with_heatmap:
+        grad_cam_a, grad_cam_b = get_submodels(model)
 
     result = []
     for i in range(len(predictions)):
@@ -91,17 +137,20 @@ def infere_images(
         image_as_seen_by_nn.save(bio)
         bio.seek(0)
 
-        heatmap = grad_cam(
-            last_conv_layer_model=grad_cam_a,
-            classifier_model=grad_cam_b,
-            image=x_batch[i],
-            original_image=image_batch[i],
-        )
-        heatmap_pillow = PillowImage.fromarray(heatmap)
-        bio2 = BytesIO()
-        bio2.name = "file_extension.jpeg"
-        heatmap_pillow.save(bio2)
-        bio2.seek(0)
+        image_with_heatmap_bytes = None
+        if with_heatmap:
+            heatmap = grad_cam(
+                last_conv_layer_model=grad_cam_a,
+                classifier_model=grad_cam_b,
+                image=x_batch[i],
+                original_image=image_batch[i],
+            )
+            heatmap_pillow = PillowImage.fromarray(heatmap)
+            bio2 = BytesIO()
+            bio2.name = "file_extension.jpeg"
+            heatmap_pillow.save(bio2)
+            bio2.seek(0)
+            image_with_heatmap_bytes = bio2.read()
 
         result.append(
             ClassificationResult(
@@ -109,7 +158,7 @@ def infere_images(
                 confidence=max(predictions[i]),
                 image_for_neural_net_bytes=bio.read(),
                 image_bytes=image_bytes,
-                image_with_heatmap_bytes=bio2.read(),
+                image_with_heatmap_bytes=image_with_heatmap_bytes,
             )
         )
 
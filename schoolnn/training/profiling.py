@@ -0,0 +1,129 @@
+"""Opt-in profiling of training blocks and batch workers.
+
+The profiles are stored in the profile dir of the training pass:
+block.prof holds the cProfile stats of all training blocks,
+batch-worker-<pid>.prof those of every batch worker process and
+tensorflow/ the TensorFlow profiler trace of the first fit of a run.
+"""
+import os
+from contextlib import contextmanager
+from cProfile import Profile
+from io import BytesIO, StringIO
+from pstats import Stats
+from typing import Optional
+from zipfile import ZipFile, ZIP_DEFLATED
+import tensorflow as tf
+from ..models import ProfilingMode, TrainingPass
+
+BLOCK_PROFILE_FILENAME = "block.prof"
+TENSORFLOW_TRACE_DIRNAME = "tensorflow"
+_SUMMARY_LINE_COUNT = 60
+
+# One profiler per batch worker process, accumulating all its tasks for
+# the profile dir of one pass
+_worker_profiler: Optional[Profile] = None
+_worker_profile_dir: Optional[str] = None
+
+
+def profile_dir_or_none(training_pass: TrainingPass) -> Optional[str]:
+    """Get the profile dir if profiling is enabled for a training pass."""
+    if training_pass.profiling_mode == ProfilingMode.OFF:
+        return None
+    return training_pass.profile_dir
+
+
+class BlockProfiler:
+    """Accumulate the cProfile stats of all blocks of a training run."""
+
+    def __init__(self):
+        """Create a profiler, nothing is measured until profile is used."""
+        self._profiler = Profile()
+
+    @contextmanager
+    def profile(self, training_pass: TrainingPass):
+        """Profile the context if profiling is enabled for the pass."""
+        profile_dir = profile_dir_or_none(training_pass)
+        if profile_dir is None:
+            yield
+            return
+
+        os.makedirs(profile_dir, exist_ok=True)
+        self._profiler.enable()
+        try:
+            yield
+        finally:
+            self._profiler.disable()
+            self._profiler.dump_stats(
+                os.path.join(profile_dir, BLOCK_PROFILE_FILENAME)
+            )
+
+
+@contextmanager
+def worker_profile(profile_dir: Optional[str]):
+    """Profile a batch task, the stats are dumped per worker process."""
+    global _worker_profiler, _worker_profile_dir
+    if profile_dir is None:
+        yield
+        return
+
+    # Workers of the shared pool decode for one pass after another
+    if _worker_profiler is None or _worker_profile_dir != profile_dir:
+        _worker_profiler = Profile()
+        _worker_profile_dir = profile_dir
+    _worker_profiler.enable()
+    try:
+        yield
+    finally:
+        _worker_profiler.disable()
+        os.makedirs(profile_dir, exist_ok=True)
+        _worker_profiler.dump_stats(
+            os.path.join(
+                profile_dir, "batch-worker-{}.prof".format(os.getpid())
+            )
+        )
+
+
+@contextmanager
+def tensorflow_trace(training_pass: TrainingPass, enabled: bool = True):
+    """Record a TensorFlow profiler trace if requested for the pass."""
+    if not enabled or training_pass.profiling_mode != ProfilingMode.TENSORFLOW:
+        yield
+        return
+
+    tf.profiler.experimental.start(
+        os.path.join(training_pass.profile_dir, TENSORFLOW_TRACE_DIRNAME)
+    )
+    try:
+        yield
+    finally:
+        tf.profiler.experimental.stop()
+
+
+def profile_summary(profile_path: str) -> str:
+    """Get the most expensive functions of a profile as text."""
+    summary = StringIO()
+    stats = Stats(profile_path, stream=summary)
+    stats.sort_stats("cumulative").print_stats(_SUMMARY_LINE_COUNT)
+    return summary.getvalue()
+
+
+def profile_zip(training_pass: TrainingPass) -> Optional[BytesIO]:
+    """Get all profiles of a training pass zipped, None if there are none."""
+    profile_dir = training_pass.profile_dir
+    if not os.path.isdir(profile_dir):
+        return None
+
+    zip_binary = BytesIO()
+    with ZipFile(zip_binary, "w", ZIP_DEFLATED) as zip_file:
+        for root, _, filenames in os.walk(profile_dir):
+            for filename in filenames:
+                path = os.path.join(root, filename)
+                arcname = os.path.relpath(path, profile_dir)
+                zip_file.write(path, arcname)
+                if filename.endswith(".prof"):
+                    zip_file.writestr(
+                        arcname[: -len(".prof")] + ".txt",
+                        profile_summary(path),
+                    )
+    zip_binary.seek(0)
+    return zip_binary
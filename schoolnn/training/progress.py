@@ -0,0 +1,92 @@
+"""Publish the live progress of a training for the browser.
+
+While a block is trained, the running loss and accuracy and the
+throughput are published at most every PROGRESS_INTERVAL_SECONDS as
+"batch" events, after the block its metrics as a "block" event. Events
+are rows of TrainingProgressEvent, streamed to the detail page by
+TrainingProgressView. Publishing is best effort: writes do not wait for
+the database lock, an event is dropped while another writer holds it
+instead of delaying the training.
+"""
+from time import time
+from typing import Optional
+from django.db.utils import DatabaseError
+from tensorflow.keras import callbacks
+from ..database import busy_timeout
+from ..models import TrainingProgressEvent
+
+PROGRESS_INTERVAL_SECONDS = 0.5
+# Events kept per pass, enough for readers reconnecting after a while
+PROGRESS_EVENTS_KEPT = 200
+
+
+def publish_progress(training_pass_id: int, kind: str, data: dict):
+    """Add an event to the progress of the pass, drop it on errors."""
+    try:
+        with busy_timeout(0):
+            TrainingProgressEvent.objects.create(
+                training_pass_id=training_pass_id, kind=kind, data_json=data
+            )
+    except DatabaseError:
+        pass
+
+
+def prune_progress(training_pass_id: int):
+    """Delete all but the latest PROGRESS_EVENTS_KEPT events of the pass."""
+    events = TrainingProgressEvent.objects.filter(
+        training_pass_id=training_pass_id
+    )
+    kept_ids = list(
+        events.order_by("-id").values_list("id", flat=True)[
+            :PROGRESS_EVENTS_KEPT
+        ]
+    )
+    if len(kept_ids) < PROGRESS_EVENTS_KEPT:
+        return
+    try:
+        with busy_timeout(0):
+            events.filter(id__lt=kept_ids[-1]).delete()
+    except DatabaseError:
+        pass
+
+
+class ProgressCallback(callbacks.Callback):
+    """Publish the running metrics of a block between its batches."""
+
+    def __init__(
+        self,
+        training_pass_id: int,
+        batch_size: int,
+        interval_seconds: float = PROGRESS_INTERVAL_SECONDS,
+    ):
+        """Create a callback publishing at most every interval_seconds."""
+        super().__init__()
+        self.training_pass_id = training_pass_id
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self._last_publish: Optional[float] = None
+        self._last_publish_batch = 0
+
+    def on_train_begin(self, logs=None):
+        self._last_publish = time()
+        self._last_publish_batch = 0
+
+    def on_train_batch_end(self, batch, logs=None):
+        now = time()
+        if now - self._last_publish < self.interval_seconds:
+            return
+        logs = logs or {}
+        images = self.batch_size * (batch + 1 - self._last_publish_batch)
+        publish_progress(
+            self.training_pass_id,
+            "batch",
+            {
+                "batch": batch + 1,
+                "batch_count": self.params.get("steps"),
+                "loss": float(logs.get("loss", 0.0)),
+                "accuracy": float(logs.get("precision", 0.0)),
+                "images_per_second": images / (now - self._last_publish),
+            },
+        )
+        self._last_publish = now
+        self._last_publish_batch = batch + 1
@@ -0,0 +1,166 @@
+"""Hyperparameter sweeps, groups of passes with varied training parameters.
+
+A search space maps some training parameters (SWEEP_KEYS) to the values
+to try, all other parameters are taken from the project. Grid search
+creates a pass for every combination, random search draws every value
+independently, the learning rate log-uniformly between the smallest and
+largest value given.
+
+Successive halving is synchronous: every pass pauses at the block limit
+of the current rung. The worker finishing the last pass of a rung stops
+the worse half of the passes, ranked by lowest validation loss, and
+queues the others again.
+"""
+from copy import deepcopy
+from itertools import product
+from math import exp, log
+from random import Random
+from typing import Dict, List, Optional
+from ..database import retry_when_locked
+from ..models import (
+    AugmentationOptions,
+    Sweep,
+    SweepStrategy,
+    TrainingPass,
+    TrainingPassState,
+)
+
+MAX_SWEEP_PASSES = 32
+SWEEP_KEYS = {
+    "batch_size": "Batchgröße",
+    "learning_rate": "Lernrate",
+    "optimizer": "Optimierer",
+    "learning_rate_schedule": "Lernraten-Anpassung",
+    "augmentation": "Augmentierung",
+}
+
+# A rung is not finished while any pass has one of these states
+_UNFINISHED_STATES = {
+    TrainingPassState.START_REQUESTED,
+    TrainingPassState.RUNNING,
+    TrainingPassState.RESUME_REQUESTED,
+    TrainingPassState.PAUSE_REQUESTED,
+    TrainingPassState.STOP_REQUESTED,
+}
+
+
+def _apply_values(base: dict, values: dict) -> dict:
+    parameter = deepcopy(base)
+    for key, value in values.items():
+        if key == "augmentation":
+            options = (
+                AugmentationOptions.all_activated()
+                if value
+                else AugmentationOptions()
+            )
+            parameter["augmentation_options"] = options.to_dict()
+        else:
+            parameter[key] = value
+    return parameter
+
+
+def _random_values(
+    search_space: Dict[str, list], keys: List[str], random: Random
+) -> dict:
+    values = {key: random.choice(search_space[key]) for key in keys}
+    learning_rates = search_space.get("learning_rate") or []
+    if len(learning_rates) > 1:
+        log_range = (log(min(learning_rates)), log(max(learning_rates)))
+        values["learning_rate"] = float(
+            "{:.3g}".format(exp(random.uniform(*log_range)))
+        )
+    return values
+
+
+def parameter_sets(
+    base: dict,
+    search_space: Dict[str, list],
+    strategy: SweepStrategy,
+    count: int = 0,
+    seed: Optional[int] = None,
+) -> List[dict]:
+    """Get the training parameter dictionaries of the passes of a sweep.
+
+    count is the number of passes of a random search.
+    """
+    keys = [key for key in SWEEP_KEYS if search_space.get(key)]
+    if strategy == SweepStrategy.RANDOM:
+        random = Random(seed)
+        value_sets = [
+            _random_values(search_space, keys, random) for _ in range(count)
+        ]
+    else:
+        value_sets = [
+            dict(zip(keys, combination))
+            for combination in product(*(search_space[key] for key in keys))
+        ]
+    return [_apply_values(base, values) for values in value_sets]
+
+
+def sweep_label(sweep: Sweep, training_parameter_json: dict) -> str:
+    """Describe the values a pass of the sweep was trained with."""
+    parts = []
+    for key, name in SWEEP_KEYS.items():
+        if not sweep.search_space_json.get(key):
+            continue
+        if key == "augmentation":
+            augmentation = training_parameter_json["augmentation_options"]
+            value = "an" if any(augmentation.values()) else "aus"
+        else:
+            value = training_parameter_json[key]
+        parts.append("{}: {}".format(name, value))
+    return ", ".join(parts)
+
+
+def advance_sweep(sweep: Sweep) -> List[TrainingPass]:
+    """Select the better half of the passes once all finished the rung.
+
+    Returns the passes to be queued again, none if the rung is not
+    finished yet or another worker already did the selection.
+    """
+    sweep.refresh_from_db()
+    block_limit = sweep.rung_block_limit
+    if block_limit is None:
+        return []
+    training_passes = list(
+        sweep.trainingpass_set.with_metrics_summary().defer("model_weights")
+    )
+    paused = []
+    contenders = []
+    for training_pass in training_passes:
+        status = TrainingPassState(training_pass.status)
+        if status in _UNFINISHED_STATES:
+            return []
+        if status == TrainingPassState.PAUSED:
+            # Paused by the user before reaching the rung
+            if training_pass.block_count < block_limit:
+                return []
+            paused.append(training_pass)
+        if status in (TrainingPassState.PAUSED, TrainingPassState.COMPLETED):
+            contenders.append(training_pass)
+    if not paused:
+        return []
+
+    # Only one of several workers finishing at once does the selection
+    if not Sweep.objects.filter(pk=sweep.pk, rung=sweep.rung).update(
+        rung=sweep.rung + 1
+    ):
+        return []
+
+    contenders.sort(
+        key=lambda training_pass: (
+            training_pass.lowest_validation_loss is None,
+            training_pass.lowest_validation_loss or 0.0,
+        )
+    )
+    keep_count = (len(contenders) + 1) // 2
+    promoted = {training_pass.id for training_pass in contenders[:keep_count]}
+    resumed = []
+    for training_pass in paused:
+        if training_pass.id in promoted:
+            training_pass.status = TrainingPassState.RESUME_REQUESTED.value
+            resumed.append(training_pass)
+        else:
+            training_pass.status = TrainingPassState.STOPPED.value
+        retry_when_locked(lambda: training_pass.save(update_fields=["status"]))
+    return resumed
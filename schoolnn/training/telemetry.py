@@ -0,0 +1,74 @@
+"""Measure where the time of a training block is spent."""
+from contextlib import contextmanager
+from resource import getrusage, RUSAGE_SELF
+from time import time
+from typing import Dict, List
+
+
+class BlockPhase:
+    """Names of the measured phases of a training block."""
+
+    MODEL_LOAD = "model_load"
+    DATA_WAIT = "data_wait"
+    COMPUTE = "compute"
+    VALIDATION = "validation"
+    CHECKPOINT_SERIALIZATION = "checkpoint_serialization"
+    DATABASE_WRITE = "database_write"
+
+    @classmethod
+    def to_array(cls) -> List[str]:
+        return [
+            cls.MODEL_LOAD,
+            cls.DATA_WAIT,
+            cls.COMPUTE,
+            cls.VALIDATION,
+            cls.CHECKPOINT_SERIALIZATION,
+            cls.DATABASE_WRITE,
+        ]
+
+
+def peak_rss_megabytes() -> float:
+    """Get the peak resident set size of this process."""
+    # ru_maxrss is given in kilobytes on Linux
+    return getrusage(RUSAGE_SELF).ru_maxrss / 1024
+
+
+class BlockTelemetry:
+    """Wall clock timings of the phases of one training block."""
+
+    def __init__(self):
+        """Start measuring a new block."""
+        self.seconds: Dict[str, float] = {
+            phase: 0.0 for phase in BlockPhase.to_array()
+        }
+        self.images_trained = 0
+        self._start = time()
+
+    @contextmanager
+    def measure(self, phase: str):
+        """Add the time spent inside this context to a phase."""
+        start = time()
+        try:
+            yield
+        finally:
+            self.seconds[phase] += time() - start
+
+    def add(self, phase: str, seconds: float):
+        """Add an externally measured duration to a phase."""
+        self.seconds[phase] += seconds
+
+    def to_dict(self) -> dict:
+        """Dump the measurements to a dictionary."""
+        training_seconds = (
+            self.seconds[BlockPhase.COMPUTE]
+            + self.seconds[BlockPhase.DATA_WAIT]
+        )
+        images_per_second = 0.0
+        if training_seconds > 0:
+            images_per_second = self.images_trained / training_seconds
+        return {
+            "seconds": dict(self.seconds),
+            "total_seconds": time() - self._start,
+            "images_per_second": images_per_second,
+            "peak_rss_megabytes": peak_rss_megabytes(),
+        }
@@ -1,26 +1,54 @@
 """Manages the executions of training jobs in the background."""
 from . import importsetup  # noqa:F401
-from typing import Optional
+from typing import Dict, List, Optional
+from ..database import retry_when_locked
 from ..models import (
+    ModelWeights,
+    ProfilingMode,
+    Sweep,
+    SweepStrategy,
     TerminationCondition,
     TrainingPassState,
     TrainingPass,
+    TrainingStepMetrics,
     Project,
 )
 from .do_training_block import (
     do_training_block,
     keras_model_to_bytes,
-    bytes_to_keras_model,
 )
 from .load_dataset import get_training_and_validation_images
 from .architecturewrapper import WrappedArchitecture
+from .compile_options import precision_policy
+from .cpu_budget import CpuBudget, apply_budget, configured_budgets
+from .data_parallel import MAX_DATA_PARALLEL_WORKERS, DataParallelTrainer
+from .transfer import feature_batch_generators, head_model, input_dimensions
+from .sweeps import advance_sweep, parameter_sets
+from .warm_start import warm_start
+from .profiling import BlockProfiler
 from .batch_generator import BatchGeneratorTraining, BatchGeneratorValidation
-from tensorflow.keras import metrics
-from schoolnn_app.settings import DEBUG
+from tensorflow.keras import metrics, optimizers
+from schoolnn_app.settings import (
+    DEBUG,
+    TRAINING_PROFILING,
+    TRAINING_WORKERS,
+)
+from contextlib import ExitStack
+import multiprocessing
 from multiprocessing import Process, Queue
 from time import time
-from io import BytesIO
+from django.db.models import Count
 from django.db.utils import DatabaseError
+from ..instrumentation import (
+    REGISTRY,
+    TRAINING_PASSES,
+    TRAINING_QUEUE_DEPTH,
+)
+
+
+# Workers are spawned, so TensorFlow starts in them with their CPU budget
+# instead of inheriting the thread pools of the web process
+_SPAWN = multiprocessing.get_context("spawn")
 
 
 def _terminate_nicely_in_case_of_training_pass_deletion(old_f):
@@ -38,118 +66,261 @@ def _terminate_nicely_in_case_of_training_pass_deletion(old_f):
 @_terminate_nicely_in_case_of_training_pass_deletion
 def run_job_until_done_or_terminated(
     training_pass: TrainingPass, verbose: bool = False
-):
-    """Run/continue a training pass until it is done or requested to stop."""
+) -> List[TrainingPass]:
+    """Run/continue a training pass until it is done or requested to stop.
+
+    Passes of a sweep with successive halving also pause at the block
+    limit of the sweep's rung. Returns the passes to be queued again.
+    """
     # Training preparation
     training_validation_images = get_training_and_validation_images(
         training_pass=training_pass
     )
 
-    termination_condition = (
-        training_pass.training_parameter.termination_condition
+    training_parameter = training_pass.training_parameter
+    termination_condition = training_parameter.termination_condition
+    # Early stopping and schedules look at the losses of all blocks so far
+    validation_losses = list(
+        TrainingStepMetrics.objects.filter(training_pass=training_pass)
+        .order_by("id")
+        .values_list("validation_loss", flat=True)
     )
-    training_pass.status = TrainingPassState.RUNNING.value
-    training_pass.save(update_fields=["status"])
-
-    model = bytes_to_keras_model(training_pass.model_weights)
-    image_dimensions = model.input_shape[1:-1]
-
-    # Generate generators
-    training_generator = BatchGeneratorTraining(
-        image_list=training_validation_images[0],
-        training_pass=training_pass,
-        image_dimensions=image_dimensions,
+    training_image_count = max(1, len(training_validation_images[0]))
+    rung_block_limit = (
+        training_pass.sweep.rung_block_limit
+        if training_pass.sweep_id is not None
+        else None
     )
-    validation_generator = BatchGeneratorValidation(
-        image_list=training_validation_images[1],
-        training_pass=training_pass,
-        image_dimensions=image_dimensions,
+    training_pass.status = TrainingPassState.RUNNING.value
+    retry_when_locked(lambda: training_pass.save(update_fields=["status"]))
+    if training_pass.initial_weights_id is None:
+        _compile_initial_weights(training_pass)
+
+    # Generate generators, the small feature batches are never sharded
+    data_parallel = None
+    data_parallel_workers = min(
+        training_parameter.data_parallel_workers, MAX_DATA_PARALLEL_WORKERS
     )
-
-    # Run
-    overhead_start = time()
-    while True:
-
-        training_pass.refresh_from_db()
-        training_pass_status = TrainingPassState(training_pass.status)
-        if training_pass_status == TrainingPassState.PAUSE_REQUESTED:
-            training_pass.status = TrainingPassState.PAUSED.value
-            training_pass.save()
-            break
-        if training_pass_status == TrainingPassState.STOP_REQUESTED:
-            training_pass.status = TrainingPassState.STOPPED.value
-            training_pass.save()
-            break
-        if training_pass_status == TrainingPassState.COMPLETED:
-            break
-
-        if termination_condition.termination_criteria_fulfilled(
-            running_for_seconds=training_pass.duration_seconds,
-            epoche=training_pass.epoche,
-        ):
-            training_pass.status = TrainingPassState.COMPLETED.value
-            training_pass.save()
-            break
-
-        training_start_timestamp = time()
-        do_training_block(
-            training_pass_to_continue=training_pass,
-            training_generator=training_generator,
-            validation_generator=validation_generator,
-            verbose=verbose,
-        )
-        duration_seconds_block = time() - training_start_timestamp
-        overhead_seconds = training_start_timestamp - overhead_start
+    with ExitStack() as stack:
+        if training_parameter.transfer_learning:
+            (
+                training_generator,
+                validation_generator,
+            ) = feature_batch_generators(
+                training_pass, *training_validation_images
+            )
+        else:
+            image_dimensions = input_dimensions(
+                training_pass.architecture.architecture_json
+            )
+            if data_parallel_workers > 1:
+                data_parallel = stack.enter_context(
+                    DataParallelTrainer(data_parallel_workers)
+                )
+            training_generator = BatchGeneratorTraining(
+                image_list=training_validation_images[0],
+                training_pass=training_pass,
+                image_dimensions=image_dimensions,
+            )
+            validation_generator = BatchGeneratorValidation(
+                image_list=training_validation_images[1],
+                training_pass=training_pass,
+                image_dimensions=image_dimensions,
+            )
+
+        # Closed however the run ends, unclosed they keep their batches
+        stack.enter_context(training_generator)
+        stack.enter_context(validation_generator)
+
+        # Run
+        block_profiler = BlockProfiler()
+        tensorflow_traced = False
         overhead_start = time()
-        training_pass.duration_milliseconds += 1000 * (
-            duration_seconds_block + overhead_seconds
-        )
-        training_pass.save(update_fields=["duration_milliseconds"])
+        while True:
+
+            training_pass.refresh_from_db()
+            training_pass_status = TrainingPassState(training_pass.status)
+            if training_pass_status == TrainingPassState.PAUSE_REQUESTED:
+                training_pass.status = TrainingPassState.PAUSED.value
+                retry_when_locked(training_pass.save)
+                break
+            if training_pass_status == TrainingPassState.STOP_REQUESTED:
+                training_pass.status = TrainingPassState.STOPPED.value
+                retry_when_locked(training_pass.save)
+                break
+            if training_pass_status == TrainingPassState.COMPLETED:
+                break
+
+            if termination_condition.termination_criteria_fulfilled(
+                running_for_seconds=training_pass.duration_seconds,
+                epoche=training_pass.epoche,
+                validation_losses=validation_losses,
+            ):
+                training_pass.status = TrainingPassState.COMPLETED.value
+                retry_when_locked(training_pass.save)
+                break
+            if (
+                rung_block_limit is not None
+                and len(validation_losses) >= rung_block_limit
+            ):
+                training_pass.status = TrainingPassState.PAUSED.value
+                retry_when_locked(training_pass.save)
+                break
+
+            # Traces are large, record only the first profiled fit of a run
+            trace_tensorflow = (
+                not tensorflow_traced
+                and training_pass.profiling_mode == ProfilingMode.TENSORFLOW
+            )
+            learning_rate = training_parameter.scheduled_learning_rate(
+                validation_losses,
+                termination_condition.progress(
+                    running_for_seconds=training_pass.duration_seconds,
+                    epoche=training_pass.epoche
+                    + training_pass.epoche_offset / training_image_count,
+                ),
+            )
+            training_start_timestamp = time()
+            with block_profiler.profile(training_pass):
+                metrics = do_training_block(
+                    training_pass_to_continue=training_pass,
+                    training_generator=training_generator,
+                    validation_generator=validation_generator,
+                    verbose=verbose,
+                    trace_tensorflow=trace_tensorflow,
+                    learning_rate=learning_rate,
+                    data_parallel=data_parallel,
+                )
+            if not metrics["cancelled"]:
+                validation_losses.append(metrics["validation"]["loss"])
+            tensorflow_traced = tensorflow_traced or trace_tensorflow
+            duration_seconds_block = time() - training_start_timestamp
+            overhead_seconds = training_start_timestamp - overhead_start
+            overhead_start = time()
+            training_pass.duration_milliseconds += 1000 * (
+                duration_seconds_block + overhead_seconds
+            )
+            retry_when_locked(
+                lambda: training_pass.save(
+                    update_fields=["duration_milliseconds"]
+                )
+            )
+            REGISTRY.flush()
+
+    if training_pass.sweep_id is None:
+        return []
+    return advance_sweep(training_pass.sweep)
+
+
+def _create_training_pass(
+    project: Project,
+    training_pass_name: str,
+    warm_start_from: Optional[TrainingPass] = None,
+    training_parameter_json: Optional[dict] = None,
+    sweep: Optional[Sweep] = None,
+) -> TrainingPass:
+    """Create a pass of the project without initial weights yet.
 
-    training_generator.close()
-    validation_generator.close()
+    The project's training parameters can be replaced by those given.
+    """
+    if training_parameter_json is None:
+        training_parameter_json = project.training_parameter_json
+    return TrainingPass.objects.create(
+        name=training_pass_name,
+        dataset_id=project.dataset,
+        training_parameter_json=training_parameter_json,
+        project=project,
+        architecture=project.architecture,
+        warm_started_from=warm_start_from,
+        sweep=sweep,
+        status=TrainingPassState.START_REQUESTED.value,
+        profiling=TRAINING_PROFILING,
+    )
 
 
-def _initialize_training_pass(
-    project: Project, training_pass_name: str
-) -> TrainingPass:
+def _compile_initial_weights(training_pass: TrainingPass):
+    """Store the weights of a freshly compiled model as initial weights.
+
+    A warm started pass gets the weights of the pass it starts from.
+    """
+    architecture_json = training_pass.architecture.architecture_json
     wrapped_architecture = WrappedArchitecture(
-        json_representation=project.architecture.architecture_json
+        json_representation=architecture_json
     )
 
-    output_dimension = project.dataset.label_set.count()
+    output_dimension = training_pass.dataset_id.label_set.count()
+    training_parameter = training_pass.training_parameter
 
-    keras_model = wrapped_architecture.to_keras_model(output_dimension)
+    # The dtype policy is stored per layer and survives (de)serialization
+    with precision_policy(training_parameter.precision):
+        if training_parameter.transfer_learning:
+            keras_model = head_model(architecture_json, output_dimension)
+        else:
+            keras_model = wrapped_architecture.to_keras_model(output_dimension)
     keras_model.compile(
-        optimizer=project.training_parameter.optimizer.value,
-        loss=project.training_parameter.loss_function.value,
+        optimizer=optimizers.get(
+            {
+                "class_name": training_parameter.optimizer.value,
+                "config": {"learning_rate": training_parameter.learning_rate},
+            }
+        ),
+        loss=training_parameter.loss_function.value,
         metrics=[metrics.Precision(name="precision")],
     )
 
-    weights_binary = BytesIO(keras_model_to_bytes(keras_model))
+    weights = None
+    if training_pass.warm_started_from is not None:
+        weights = warm_start(
+            keras_model, training_pass.warm_started_from, training_parameter
+        )
+    if weights is None:
+        weights = keras_model_to_bytes(keras_model)
 
-    return TrainingPass.objects.create(
-        name=training_pass_name,
-        dataset_id=project.dataset,
-        training_parameter_json=project.training_parameter_json,
+    training_pass.initial_weights = ModelWeights.store(weights)
+    retry_when_locked(
+        lambda: training_pass.save(update_fields=["initial_weights"])
+    )
+
+
+def _initialize_training_pass(
+    project: Project,
+    training_pass_name: str,
+    warm_start_from: Optional[TrainingPass] = None,
+    training_parameter_json: Optional[dict] = None,
+    sweep: Optional[Sweep] = None,
+) -> TrainingPass:
+    """Create a pass of the project with freshly compiled weights.
+
+    The project's training parameters can be replaced by those given.
+    """
+    training_pass = _create_training_pass(
         project=project,
-        architecture=project.architecture,
-        model_weights=weights_binary.read(),
-        status=TrainingPassState.START_REQUESTED.value,
+        training_pass_name=training_pass_name,
+        warm_start_from=warm_start_from,
+        training_parameter_json=training_parameter_json,
+        sweep=sweep,
     )
+    _compile_initial_weights(training_pass)
+    return training_pass
 
 
-def _worker(q: Queue):
+def _worker(q: Queue, budget: Optional[CpuBudget] = None):
+    # The samples of the parent process are still reported by the parent
+    REGISTRY.reset()
+    if budget is not None:
+        apply_budget(budget)
     while True:
         training_pass = q.get()
         if not isinstance(training_pass, TrainingPass):
             raise ValueError("Wrong type in queue, expected TrainingPass")
         if DEBUG:
             print("Running training pass", training_pass)
-        run_job_until_done_or_terminated(
+        requeued = run_job_until_done_or_terminated(
             training_pass=training_pass,
             verbose=DEBUG,
         )
+        for requeued_training_pass in requeued or []:
+            q.put(requeued_training_pass)
 
 
 # Warning, works only for usage within one Python process!
@@ -157,7 +328,7 @@ class TrainingManager:
     """Singleton to manage training."""
 
     _queue: Optional[Queue] = None
-    _process: Optional[Process] = None
+    _processes: List[Process] = []
 
     def __init__(self):
         """Initialize the TrainingManager singleton, or existing one."""
@@ -167,53 +338,128 @@ class TrainingManager:
         if DEBUG:
             print("Initialize training manager")
 
-        TrainingManager._queue: Queue = Queue()
-        TrainingManager._process = Process(
-            target=_worker, args=(TrainingManager._queue,)
-        )
-        TrainingManager._process.start()
+        TrainingManager._queue: Queue = _SPAWN.Queue()
+        TrainingManager._processes = [
+            _SPAWN.Process(
+                target=_worker, args=(TrainingManager._queue, budget)
+            )
+            for budget in configured_budgets(TRAINING_WORKERS)
+        ]
+        for process in TrainingManager._processes:
+            process.start()
         self._read_back_tasks_from_database()  # Restore tasks from last run
 
     def apply_job(
-        self, project: Project, training_pass_name: str
+        self,
+        project: Project,
+        training_pass_name: str,
+        warm_start_from: Optional[TrainingPass] = None,
     ) -> TrainingPass:
-        """Create TrainingPass from project and push it into work queue."""
+        """Create TrainingPass from project and push it into work queue.
+
+        If warm_start_from is given, the new pass starts with its weights.
+        """
         if TrainingManager._queue is None:
             raise ValueError("TrainingManager singleton not initialized!")
         training_pass = _initialize_training_pass(
             project=project,
             training_pass_name=training_pass_name,
+            warm_start_from=warm_start_from,
         )
         TrainingManager._queue.put(training_pass)
         return training_pass
 
+    def apply_sweep(
+        self,
+        project: Project,
+        name: str,
+        strategy: SweepStrategy,
+        search_space: Dict[str, list],
+        count: int = 0,
+        blocks_per_rung: Optional[int] = None,
+    ) -> Sweep:
+        """Create the passes of a sweep and push them into the work queue.
+
+        count is the number of passes of a random search. The passes get
+        their initial weights once a worker starts them.
+        """
+        if TrainingManager._queue is None:
+            raise ValueError("TrainingManager singleton not initialized!")
+        sweep = Sweep.objects.create(
+            name=name,
+            project=project,
+            strategy=strategy.value,
+            search_space_json=search_space,
+            blocks_per_rung=blocks_per_rung,
+        )
+        parameter_dicts = parameter_sets(
+            project.training_parameter_json, search_space, strategy, count
+        )
+        # Compiling the models takes long, the workers do it on start
+        for i, training_parameter_json in enumerate(parameter_dicts):
+            training_pass = _create_training_pass(
+                project=project,
+                training_pass_name="{} #{}".format(name[:10], i + 1),
+                training_parameter_json=training_parameter_json,
+                sweep=sweep,
+            )
+            TrainingManager._queue.put(training_pass)
+        return sweep
+
     def continue_training_pass(
         self,
         training_pass: TrainingPass,
-    ):
-        """Continue an already started training pass."""
+    ) -> bool:
+        """Continue an already started training pass.
+
+        The pass keeps its training parameters, only its termination
+        condition is extended by the project's one. Returns False without
+        queueing if the pass is queued or running already.
+        """
         fallback_continue_seconds = 600
         fallback_continue_epochs = 3
 
         if TrainingManager._queue is None:
             raise ValueError("TrainingManager singleton not initialized!")
-        training_pass.status = TrainingPassState.RESUME_REQUESTED.value
-        training_parameter = training_pass.project.training_parameter
+        project_termination_condition = (
+            training_pass.project.training_parameter.termination_condition
+        )
         seconds_to_continue = (
-            training_parameter.termination_condition.seconds
-            or fallback_continue_seconds
+            project_termination_condition.seconds or fallback_continue_seconds
         )
         epochs_to_continue = (
-            training_parameter.termination_condition.epochs
-            or fallback_continue_epochs
+            project_termination_condition.epochs or fallback_continue_epochs
         )
+        training_parameter = training_pass.training_parameter
+        termination_condition = training_parameter.termination_condition
+        # Early stopping restarts, an early stopped pass would stop at once
         training_parameter.termination_condition = TerminationCondition(
             seconds=training_pass.duration_seconds + seconds_to_continue,
             epochs=training_pass.epoche + epochs_to_continue,
+            patience=termination_condition.patience,
+            min_delta=termination_condition.min_delta,
+            patience_from_block=TrainingStepMetrics.objects.filter(
+                training_pass=training_pass
+            ).count(),
         )
         training_pass.training_parameter = training_parameter
-        training_pass.save(update_fields=["status", "training_parameter_json"])
+        training_pass.status = TrainingPassState.RESUME_REQUESTED.value
+        # Changed only if idle, of two concurrent requests one queues it
+        updated_count = TrainingPass.objects.filter(
+            pk=training_pass.pk,
+            status__in=[
+                TrainingPassState.PAUSED.value,
+                TrainingPassState.COMPLETED.value,
+                TrainingPassState.STOPPED.value,
+            ],
+        ).update(
+            status=training_pass.status,
+            training_parameter_json=training_pass.training_parameter_json,
+        )
+        if not updated_count:
+            return False
         TrainingManager._queue.put(training_pass)
+        return True
 
     def _read_back_tasks_from_database(self):
         training_passes = TrainingPass.objects.filter(
@@ -235,3 +481,25 @@ class TrainingManager:
             if DEBUG:
                 print("Requeue training pass", training_pass.id)
             TrainingManager._queue.put(training_pass)
+
+
+def _collect_training_metrics():
+    """Update the gauges about the training queue before an export."""
+    if TrainingManager._queue is not None:
+        try:
+            TRAINING_QUEUE_DEPTH.set(TrainingManager._queue.qsize())
+        except NotImplementedError:  # qsize is not available on macOS
+            pass
+
+    for state in TrainingPassState:
+        TRAINING_PASSES.set(0, status=state.value)
+    status_counts = TrainingPass.objects.values("status").annotate(
+        count=Count("id")
+    )
+    for status_count in status_counts:
+        TRAINING_PASSES.set(
+            status_count["count"], status=status_count["status"]
+        )
+
+
+REGISTRY.register_collector(_collect_training_metrics)
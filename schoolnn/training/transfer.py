@@ -0,0 +1,342 @@
+"""Transfer learning on the features of a frozen, pretrained backbone.
+
+Projects in transfer learning mode replace the convolutional part of
+their architecture, everything up to the last Flatten layer, by the
+backbone stored in the keras model file TRANSFER_BACKBONE. Only the dense
+head is trained and stored as checkpoint. Since the backbone is frozen,
+its output for an image never changes: the features of every image are
+computed once and cached per dataset on disk, so an epoch is a pass over
+a feature matrix instead of decoding and convolving every image again.
+"""
+import os
+from functools import lru_cache
+from hashlib import sha256
+from random import randint, seed, shuffle
+from typing import Dict, List, Tuple
+from numpy import array, eye, float32, load, ndarray, savez, stack
+from tensorflow.keras import layers, models, utils
+from schoolnn_app.settings import TRANSFER_BACKBONE
+from .architecturewrapper import WrappedArchitecture
+from .batch_generator import image_to_numpy_array, numpy_image_batch_to_x_batch
+from ..database import retry_when_locked
+from ..instrumentation import BATCHES
+from ..models import Dataset, Image, Label, TrainingPass
+from ..thumbnails import nearest_thumbnail_size
+
+FEATURE_BATCH_SIZE = 64
+
+
+def backbone_available() -> bool:
+    return bool(TRANSFER_BACKBONE) and os.path.isfile(TRANSFER_BACKBONE)
+
+
+@lru_cache(maxsize=None)
+def _backbone(path: str) -> models.Model:
+    backbone = models.load_model(path, compile=False)
+    backbone.trainable = False
+    return backbone
+
+
+@lru_cache(maxsize=None)
+def _backbone_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return sha256(f.read()).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _feature_extractor(
+    path: str, image_dimensions: Tuple[int, int]
+) -> models.Model:
+    inputs = layers.Input(shape=(*image_dimensions, 3))
+    features = _backbone(path)(inputs, training=False)
+    if len(features.shape) > 2:
+        features = layers.GlobalAveragePooling2D()(features)
+    return models.Model(inputs, features)
+
+
+def feature_extractor(image_dimensions: Tuple[int, int]) -> models.Model:
+    """Get the backbone taking images, giving a feature vector each."""
+    return _feature_extractor(TRANSFER_BACKBONE, tuple(image_dimensions))
+
+
+def input_dimensions(architecture_json: List[dict]) -> Tuple[int, int]:
+    """Get the image dimensions of the Input layer of an architecture."""
+    return tuple(architecture_json[0]["shape"][:2])
+
+
+def head_model(
+    architecture_json: List[dict], output_dimension: int
+) -> models.Model:
+    """Get the layers after the last Flatten layer on top of the features."""
+    extractor = feature_extractor(input_dimensions(architecture_json))
+    flatten_positions = [
+        i
+        for i, layer_dict in enumerate(architecture_json)
+        if layer_dict["type"] == "Flatten"
+    ]
+    head_start = (
+        flatten_positions[-1] + 1
+        if flatten_positions
+        else len(architecture_json)
+    )
+    head_json = [
+        {"type": "Input", "shape": [extractor.output_shape[-1]]}
+    ] + architecture_json[slice(head_start, None)]
+    return WrappedArchitecture(json_representation=head_json).to_keras_model(
+        output_dimension
+    )
+
+
+def inference_model(
+    head: models.Model, image_dimensions: Tuple[int, int]
+) -> models.Model:
+    """Get backbone and trained head as one model taking images."""
+    inputs = layers.Input(shape=(*image_dimensions, 3))
+    return models.Model(
+        inputs, head(feature_extractor(image_dimensions)(inputs))
+    )
+
+
+def _feature_cache_path(
+    dataset: Dataset, image_dimensions: Tuple[int, int]
+) -> str:
+    return os.path.join(
+        dataset.dir,
+        "features",
+        "{}-{}x{}.npz".format(
+            _backbone_digest(TRANSFER_BACKBONE)[:16], *image_dimensions
+        ),
+    )
+
+
+def image_features(
+    dataset: Dataset, images: List[Image], image_dimensions: Tuple[int, int]
+) -> ndarray:
+    """Get the backbone features of the images, one row per image.
+
+    Only images missing in the cache are run through the backbone. The
+    cache is rewritten with the features of exactly these images, which
+    drops the features of deleted images.
+    """
+    path = _feature_cache_path(dataset, image_dimensions)
+    cached: Dict[int, ndarray] = {}
+    if os.path.exists(path):
+        with load(path) as cache:
+            cached = dict(zip(cache["image_ids"].tolist(), cache["features"]))
+
+    image_ids = [image.id for image in images]
+    missing = [image for image in images if image.id not in cached]
+    if missing:
+        extractor = feature_extractor(image_dimensions)
+        source_size = nearest_thumbnail_size(max(image_dimensions))
+        for start in range(0, len(missing), FEATURE_BATCH_SIZE):
+            batch = missing[slice(start, start + FEATURE_BATCH_SIZE)]
+            x_batch = numpy_image_batch_to_x_batch(
+                array(
+                    [
+                        image_to_numpy_array(
+                            image.get_source(dataset, source_size),
+                            target_dimensions=image_dimensions,
+                        )
+                        for image in batch
+                    ]
+                )
+            )
+            features = extractor.predict(x_batch, verbose=False)
+            for image, image_features_row in zip(batch, features):
+                cached[image.id] = image_features_row
+
+    features = stack([cached[image_id] for image_id in image_ids])
+    if missing or len(cached) != len(image_ids):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(temporary_path, "wb") as f:
+            savez(f, image_ids=array(image_ids), features=features)
+        os.replace(temporary_path, path)
+    return features
+
+
+def _one_hot_labels(dataset: Dataset, images: List[Image]) -> ndarray:
+    label_ids = Label.objects.filter(dataset_id=dataset.id).order_by("id")
+    positions = {
+        label_id: i
+        for i, label_id in enumerate(label_ids.values_list("id", flat=True))
+    }
+    return eye(len(positions), dtype=float32)[
+        [positions[image.label_id] for image in images]
+    ]
+
+
+class FeatureBatchGenerator(utils.Sequence):
+    """Batches of cached features and one hot encoded labels.
+
+    Has the interface of MultiprocessingBatchGenerator, batches are cut
+    from the feature matrix in the main process.
+    """
+
+    metrics_name = "generic"
+
+    def __init__(
+        self,
+        features: ndarray,
+        labels_hotencoded: ndarray,
+        training_pass: TrainingPass,
+    ):
+        """Initialize batch generator."""
+        self.features = features
+        self.labels_hotencoded = labels_hotencoded
+        self.training_pass = training_pass
+        self.batch_size = training_pass.training_parameter.batch_size
+        self.batch_count = 0
+        # Batches are never waited for
+        self.data_wait_seconds = 0.0
+        # Keras asks sometimes for the same batch twice
+        self.deduplication_dict: Dict[int, Tuple[ndarray, ndarray]] = {}
+
+    def __len__(self) -> int:
+        return self.batch_count
+
+    def pop_index(self) -> int:
+        raise NotImplementedError()
+
+    def __getitem__(self, index):
+        """Get one batch. Used by keras."""
+        if index not in self.deduplication_dict:
+            indices = [self.pop_index() for _ in range(self.batch_size)]
+            self.deduplication_dict[index] = (
+                self.features[indices],
+                self.labels_hotencoded[indices],
+            )
+            BATCHES.inc(generator=self.metrics_name)
+        return self.deduplication_dict[index]
+
+    def reset_batch_count(self, batch_count: int):
+        self.batch_count = batch_count
+        self.deduplication_dict = {}
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class FeatureBatchGeneratorTraining(FeatureBatchGenerator):
+    """Generate batches for model fitting, epochs as BatchGeneratorTraining."""
+
+    metrics_name = "training"
+
+    def __init__(
+        self,
+        features: ndarray,
+        labels_hotencoded: ndarray,
+        training_pass: TrainingPass,
+    ):
+        """Get a generator for batches of features and labels."""
+        super().__init__(features, labels_hotencoded, training_pass)
+        self.order = self._shuffled_order()
+        # Epoche and offset before each batch of the block
+        self.batch_positions: List[Tuple[int, int]] = []
+
+    def _shuffled_order(self) -> List[int]:
+        order = list(range(len(self.features)))
+        seed(self.training_pass.id + self.training_pass.epoche)
+        shuffle(order)
+        return order
+
+    def pop_index(self) -> int:
+        """Get an index and increase internal counter."""
+        if self.training_pass.epoche_offset >= len(self.order):
+            self.training_pass.epoche += 1
+            self.training_pass.epoche_offset = 0
+            self.order = self._shuffled_order()
+
+        index = self.order[self.training_pass.epoche_offset]
+        self.training_pass.epoche_offset += 1
+        return index
+
+    def __getitem__(self, index):
+        """Get one batch. Used by keras."""
+        if index not in self.deduplication_dict:
+            self.batch_positions.append(
+                (self.training_pass.epoche, self.training_pass.epoche_offset)
+            )
+        return super().__getitem__(index)
+
+    def reset_batch_count(self, batch_count: int):
+        super().reset_batch_count(batch_count)
+        self.batch_positions = []
+
+    def rewind(self, trained_batch_count: int):
+        """Continue after the first trained_batch_count batches of the block.
+
+        As BatchGeneratorTraining.rewind, the position is saved.
+        """
+        if trained_batch_count < len(self.batch_positions):
+            epoche, epoche_offset = self.batch_positions[trained_batch_count]
+            if epoche != self.training_pass.epoche:
+                self.training_pass.epoche = epoche
+                self.order = self._shuffled_order()
+            self.training_pass.epoche_offset = epoche_offset
+            self.batch_positions = []
+        self.on_epoch_end()
+
+    def on_epoch_end(self):
+        """Callback for keras."""
+        retry_when_locked(
+            lambda: self.training_pass.save(
+                update_fields=["epoche", "epoche_offset"]
+            )
+        )
+
+
+class FeatureBatchGeneratorValidation(FeatureBatchGenerator):
+    metrics_name = "validation"
+
+    def __init__(
+        self,
+        features: ndarray,
+        labels_hotencoded: ndarray,
+        training_pass: TrainingPass,
+    ):
+        """Get a generator for batches of features and labels."""
+        super().__init__(features, labels_hotencoded, training_pass)
+        self.offset = randint(0, len(features))  # nosec
+
+    def pop_index(self) -> int:
+        index = self.offset % len(self.features)
+        self.offset += 1
+        return index
+
+
+def feature_batch_generators(
+    training_pass: TrainingPass,
+    training_images: List[Image],
+    validation_images: List[Image],
+) -> Tuple[FeatureBatchGeneratorTraining, FeatureBatchGeneratorValidation]:
+    """Get training and validation generators of a transfer learning pass."""
+    dataset = training_pass.dataset_id
+    training_images = [i for i in training_images if i.label_id is not None]
+    validation_images = [
+        i for i in validation_images if i.label_id is not None
+    ]
+    images = training_images + validation_images
+    features = image_features(
+        dataset,
+        images,
+        input_dimensions(training_pass.architecture.architecture_json),
+    )
+    labels_hotencoded = _one_hot_labels(dataset, images)
+
+    split = len(training_images)
+    return (
+        FeatureBatchGeneratorTraining(
+            features[:split], labels_hotencoded[:split], training_pass
+        ),
+        FeatureBatchGeneratorValidation(
+            features[split:], labels_hotencoded[split:], training_pass
+        ),
+    )
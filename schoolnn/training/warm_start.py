@@ -0,0 +1,94 @@
+"""Start training passes from the checkpoint of an earlier pass.
+
+Students often train the same architecture again with other parameters.
+Instead of random weights a new pass can take over the weights of an
+earlier pass. Layers are paired by position and copied if their weights
+have the same shapes, so with another number of labels only the output
+layer starts from random weights. If every layer matches and the model is
+compiled the same way, the checkpoint itself becomes the initial weights
+of the new pass and is stored only once for all passes started from it.
+"""
+from typing import Optional
+from django.db.models import QuerySet
+from tensorflow.keras import models
+from ..models import (
+    Project,
+    TrainingParameter,
+    TrainingPass,
+    TrainingStepMetrics,
+)
+from .do_training_block import bytes_to_keras_model
+
+
+class WarmStartError(ValueError):
+    """The checkpoint does not fit the model of the new pass."""
+
+
+def warm_start_candidates(project: Project) -> QuerySet:
+    """Get trained passes of the user with the project's architecture."""
+    return (
+        TrainingPass.objects.filter(
+            project__user=project.user,
+            architecture=project.architecture,
+            id__in=TrainingStepMetrics.objects.values("training_pass"),
+        )
+        .select_related("project")
+        .defer("model_weights")
+        .order_by("-id")
+    )
+
+
+def copy_layer_weights(source: models.Model, target: models.Model) -> int:
+    """Copy the weights of layers with equal shapes from source to target.
+
+    Returns the number of layers copied.
+    """
+    if len(source.layers) != len(target.layers):
+        raise WarmStartError(
+            "Die Architektur des Checkpoints hat eine andere Anzahl Schichten."
+        )
+    copied = 0
+    for source_layer, target_layer in zip(source.layers, target.layers):
+        source_weights = source_layer.get_weights()
+        target_weights = target_layer.get_weights()
+        if not target_weights:
+            continue
+        if [w.shape for w in source_weights] != [
+            w.shape for w in target_weights
+        ]:
+            continue
+        target_layer.set_weights(source_weights)
+        copied += 1
+    return copied
+
+
+def _compiled_alike(a: TrainingParameter, b: TrainingParameter) -> bool:
+    return (a.optimizer, a.loss_function, a.precision) == (
+        b.optimizer,
+        b.loss_function,
+        b.precision,
+    )
+
+
+def warm_start(
+    keras_model: models.Model,
+    source: TrainingPass,
+    training_parameter: TrainingParameter,
+) -> Optional[bytes]:
+    """Initialize the freshly compiled keras_model from the source pass.
+
+    Returns the checkpoint of source if it can be used unchanged as the
+    initial weights. Otherwise None is returned and the weights of all
+    matching layers are copied into keras_model.
+    """
+    source_model = bytes_to_keras_model(source.checkpoint)
+    copied = copy_layer_weights(source_model, keras_model)
+    if copied == 0:
+        raise WarmStartError("Keine Schicht passt zum Checkpoint.")
+
+    weighted_layers = [layer for layer in keras_model.layers if layer.weights]
+    if copied == len(weighted_layers) and _compiled_alike(
+        source.training_parameter, training_parameter
+    ):
+        return bytes(source.checkpoint)
+    return None
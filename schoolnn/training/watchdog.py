@@ -0,0 +1,35 @@
+"""End worker processes together with the process owning them.
+
+Decode workers of the shared pool and data parallel workers wait for the
+tasks of their parent. If the parent dies without stopping them, e.g.
+killed by the OOM killer or a server restart, they would wait forever.
+Their watchdog thread ends them once they are orphaned.
+"""
+import os
+from threading import Thread
+from time import sleep
+
+WATCHDOG_INTERVAL_SECONDS = 5.0
+
+
+def _watch(parent_pid: int, interval_seconds: float):
+    while True:
+        sleep(interval_seconds)
+        if os.getppid() != parent_pid:
+            os._exit(0)
+
+
+def exit_with_parent(
+    parent_pid: int, interval_seconds: float = WATCHDOG_INTERVAL_SECONDS
+):
+    """Start a thread ending this process once parent_pid is gone.
+
+    parent_pid is given by the parent, it may have died already when the
+    worker starts.
+    """
+    Thread(
+        target=_watch,
+        args=(parent_pid, interval_seconds),
+        daemon=True,
+        name="watchdog",
+    ).start()
@@ -0,0 +1,97 @@
+"""Load the metrics of training passes for charts.
+
+The metrics of all requested passes are fetched with one query. Long
+trainings have thousands of blocks, so every series is downsampled with
+Largest-Triangle-Three-Buckets (LTTB) to at most CHART_POINTS points,
+which keeps peaks and the overall shape visible.
+"""
+from typing import Dict, Iterable, List
+from numpy import arange, argmax, array, ndarray
+from .models import TrainingStepMetrics
+
+CHART_POINTS = 300
+SERIES_NAMES = (
+    "training_loss",
+    "training_accuracy",
+    "validation_loss",
+    "validation_accuracy",
+)
+
+
+def load_series(training_pass_ids: Iterable[int]) -> Dict[int, dict]:
+    """Get every series of every pass as array, indexed by block."""
+    values: Dict[int, Dict[str, list]] = {
+        training_pass_id: {name: [] for name in SERIES_NAMES}
+        for training_pass_id in training_pass_ids
+    }
+    rows = (
+        TrainingStepMetrics.objects.filter(training_pass_id__in=values)
+        .order_by("training_pass_id", "id")
+        .values_list("training_pass_id", *SERIES_NAMES)
+    )
+    for training_pass_id, *row in rows:
+        series = values[training_pass_id]
+        for name, value in zip(SERIES_NAMES, row):
+            series[name].append(value)
+
+    return {
+        training_pass_id: {
+            name: array(series_values, dtype=float)
+            for name, series_values in series.items()
+        }
+        for training_pass_id, series in values.items()
+    }
+
+
+def lttb_indices(y_values: ndarray, point_count: int) -> ndarray:
+    """Get the indices of the points kept by LTTB downsampling.
+
+    The x values are the indices themselves. First and last point are
+    always kept, from every bucket in between the point spanning the
+    largest triangle with the previously kept point and the average of
+    the next bucket.
+    """
+    length = len(y_values)
+    if point_count >= length or point_count < 3:
+        return arange(length)
+
+    x_values = arange(length, dtype=float)
+    bucket_width = (length - 2) / (point_count - 2)
+    indices = [0]
+    previous = 0
+    for bucket in range(point_count - 2):
+        start = int(bucket * bucket_width) + 1
+        end = int((bucket + 1) * bucket_width) + 1
+        next_end = min(int((bucket + 2) * bucket_width) + 1, length)
+        average_x = x_values[end:next_end].mean()
+        average_y = y_values[end:next_end].mean()
+
+        areas = abs(
+            (x_values[previous] - average_x)
+            * (y_values[start:end] - y_values[previous])
+            - (x_values[previous] - x_values[start:end])
+            * (average_y - y_values[previous])
+        )
+        previous = start + int(argmax(areas))
+        indices.append(previous)
+    indices.append(length - 1)
+    return array(indices)
+
+
+def chart_points(y_values: ndarray, point_count: int) -> List[list]:
+    """Get the downsampled series as pairs of block number and value."""
+    indices = lttb_indices(y_values, point_count)
+    return [[int(i), float(y)] for i, y in zip(indices, y_values[indices])]
+
+
+def chart_series(
+    training_pass_ids: Iterable[int], point_count: int = CHART_POINTS
+) -> Dict[int, Dict[str, List[list]]]:
+    """Get the downsampled series of every pass for the charts."""
+    return {
+        training_pass_id: {
+            name: chart_points(y_values, point_count)
+            for name, y_values in series.items()
+        }
+        for training_pass_id, series in load_series(training_pass_ids).items()
+    }
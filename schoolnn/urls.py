@@ -17,6 +17,10 @@ from .views.training import (
     TrainingStopView,
     TrainingContinueView,
     TrainingCompareView,
+    TrainingTelemetryView,
+    TrainingProgressView,
+    TrainingProfileDownloadView,
+    TrainingSweepCreateView,
 )
 from .views.auth import AuthLoginView
 from .views.datasets import DatasetCreate, DatasetList
@@ -26,7 +30,7 @@ from .views.datasets import (
     DatasetDelete,
     DatasetClassify,
 )
-from .views.images import ImageView
+from .views.images import ContactSheetMapView, ContactSheetView, ImageView
 from .views.home_view import HomeView
 from .views.labels import (
     LabelDetailView,
@@ -37,6 +41,7 @@ from .views.labels import (
 )
 
 from .views.inference import InferenceView
+from .views.metrics import MetricsView
 from .views.projects import (
     ProjectCreateView,
     ProjectListView,
@@ -98,6 +103,16 @@ urlpatterns = [
         name="dataset-label-delete",
     ),
     path("images/<int:pk>", ImageView.as_view(), name="image-show"),
+    path(
+        "dataset/<int:pk>/contactsheet/<str:selection>",
+        ContactSheetMapView.as_view(),
+        name="dataset-contactsheet-map",
+    ),
+    path(
+        "dataset/<int:pk>/contactsheet/<str:selection>/<int:page>",
+        ContactSheetView.as_view(),
+        name="dataset-contactsheet",
+    ),
     path(
         "architectures/",
         ArchitectureListView.as_view(),
@@ -133,11 +148,31 @@ urlpatterns = [
         TrainingCreateView.as_view(),
         name="create-training",
     ),
+    path(
+        "project/<int:project_pk>/training/sweep",
+        TrainingSweepCreateView.as_view(),
+        name="create-sweep",
+    ),
     path(
         "project/<int:project_pk>/training/<int:training_pk>",
         TrainingDetailView.as_view(),
         name="show-training",
     ),
+    path(
+        "project/<int:project_pk>/training/<int:training_pk>/telemetry",
+        TrainingTelemetryView.as_view(),
+        name="training-telemetry",
+    ),
+    path(
+        "project/<int:project_pk>/training/<int:training_pk>/progress",
+        TrainingProgressView.as_view(),
+        name="training-progress",
+    ),
+    path(
+        "project/<int:project_pk>/training/<int:training_pk>/profile",
+        TrainingProfileDownloadView.as_view(),
+        name="training-profile",
+    ),
     path(
         "project/<int:project_pk>/training/compare",
         TrainingCompareView.as_view(),
@@ -174,6 +209,7 @@ urlpatterns = [
         name="auth-login",
     ),
     path("logout/", LogoutView.as_view(), name="auth-logout"),
+    path("metrics", MetricsView.as_view(), name="metrics"),
     path(
         "users/",
         UserListView.as_view(),
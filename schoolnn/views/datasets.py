@@ -18,8 +18,11 @@ from django.views.generic.edit import (
 )
 from django.contrib.messages.views import SuccessMessageMixin
 from django.views.generic import ListView, DetailView
+from schoolnn import labelling, shards
+from schoolnn.contact_sheet import UNLABELED
 from schoolnn.dataset import zip_to_full_dataset
 from schoolnn.models import Dataset, Label, Image
+from schoolnn.views.images import image_tiles
 from schoolnn.views.mixins import (
     LoginRequiredMixin,
     AuthenticatedQuerysetMixin,
@@ -57,21 +60,6 @@ class DatasetList(AuthenticatedQuerysetMixin, ListView):
     context_object_name = "datasets"
     template_name = "datasets/dataset_overview.html"
 
-    def get_label_of_datasets(self, dataset):
-        """ Extract labels of a dataset. """
-
-        return Label.objects.filter(dataset=dataset).order_by("name")
-
-    def get_images_of_label(self, label, dataset):
-        """ Extract images of a given label. """
-
-        return [
-            i[0]
-            for i in Image.objects.filter(
-                label=label, dataset=dataset
-            ).values_list("id")
-        ]
-
     def get_queryset(self):
         """ Create queryset for dataset list. """
 
@@ -84,8 +72,10 @@ class DatasetList(AuthenticatedQuerysetMixin, ListView):
 
         # check url location
         if listing_type == "own" or listing_type == "":
-            datasets = Dataset.objects.filter(user=self.request.user).order_by(
-                "-created_at"
+            datasets = (
+                Dataset.objects.filter(user=self.request.user)
+                .with_counts()
+                .order_by("-created_at")
             )
         elif listing_type == "shared":
             datasets = []  # TODO: add shared functionality
@@ -93,14 +83,14 @@ class DatasetList(AuthenticatedQuerysetMixin, ListView):
             raise Http404
 
         for dataset in datasets:
-            unlabeled_count = Image.objects.filter(
-                dataset=dataset, label__isnull=True
-            ).count()
+            unlabeled_count = dataset.unlabeled_count
 
             # save dataset specific details to dataset object
             dataset_dict = {}
             dataset_dict["name"] = dataset.name
             dataset_dict["id"] = dataset.id
+            dataset_dict["image_count"] = dataset.image_count
+            dataset_dict["label_count"] = dataset.label_count
             dataset_dict["status"] = {
                 "is_completely_labeled": unlabeled_count,
                 # TODO: add locale
@@ -156,7 +146,6 @@ class DatasetDetail(AuthenticatedQuerysetMixin, DetailView):
         context = super().get_context_data(**kwargs)
 
         context["unlabeled_count"] = self.get_unlabeled_count()
-        context["unlabeled_images"] = self.get_unlabeled_images()
 
         return context
 
@@ -214,24 +203,18 @@ class DatasetClassify(FormView):
     template_name = "datasets/dataset_label_unlabelled.html"
     model = Image
 
-    def set_label(self, image_id, label_id):
-        """ Classifiy an image with an specific label. """
-
-        Image.objects.filter(pk=image_id).update(label=label_id)
-
     def form_valid(self, form):
         """Handling request of valid form.
         Occurs if the user want to label images.
         """
 
         image_ids = form.data.getlist("image_id_list")
-        label_id = form.data["label"]
-
-        for image in image_ids:
-            self.set_label(image, label_id)
+        label = Label.objects.get(
+            id=form.data["label"], dataset=self.kwargs["pk"]
+        )
 
-        count = len(image_ids)
-        label_name = Label.objects.get(id=label_id).name
+        count = labelling.set_label(label.dataset, image_ids, label)
+        label_name = label.name
         image_word = "Bild" if count == 1 else "Bilder"
 
         messages.success(
@@ -268,9 +251,12 @@ class DatasetClassify(FormView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        context["unlabeled_images"] = self.get_unlabeled_images()
         context["unlabeled_count"] = self.get_unlabeled_count()
         context["dataset"] = Dataset.objects.get(id=self.kwargs["pk"])
+        context["unlabeled_images"] = self.get_unlabeled_images()
+        context["unlabeled_tiles"] = image_tiles(
+            context["dataset"], UNLABELED, context["unlabeled_images"]
+        )
         context["labels"] = Label.objects.filter(dataset=self.kwargs["pk"])
 
         return context
@@ -285,6 +271,7 @@ class DatasetDelete(AuthenticatedQuerysetMixin, DeleteView):
 
     def delete(self, request, *args, **kwargs):
         dataset = self.get_object()
+        shards.forget(dataset.dir)
         shutil.rmtree(dataset.dir)
 
         messages.success(self.request, "Datensatz erfolgreich gelöscht.")
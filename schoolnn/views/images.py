@@ -1,20 +1,208 @@
 """All views having to to with images."""
-from django.http import HttpResponse
+import os
+from typing import List
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    JsonResponse,
+)
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 from django.views import View
 
-from schoolnn.models import Image
+from schoolnn_app.settings import (
+    IMAGE_ACCEL_REDIRECT_PREFIX,
+    IMAGE_CACHE_SECONDS,
+    IMAGE_SENDFILE,
+    STORAGE,
+)
+from schoolnn import contact_sheet
+from schoolnn.models import Dataset, Image, Label
+from schoolnn.shards import ShardPointer, read_pointer
+from schoolnn.thumbnails import nearest_thumbnail_size
 from schoolnn.views.mixins import LoginRequiredMixin
 
+CONTENT_TYPE = "image/jpeg"
+
 
 class ImageView(LoginRequiredMixin, View):
-    """Get a raw jpeg image."""
+    """Get a raw jpeg image.
+
+    With ?size=<pixels> the smallest thumbnail at least that large is
+    returned, or the original if there is none. Responses carry an ETag
+    and Last-Modified, so browsers can revalidate with conditional GETs.
+    """
+
+    cache_seconds = IMAGE_CACHE_SECONDS
+    sendfile = IMAGE_SENDFILE
+    accel_redirect_prefix = IMAGE_ACCEL_REDIRECT_PREFIX
+
+    def get(self, request, *args, **kwargs):
+        """Respond to the HTTP get request."""
+        try:
+            requested_size = int(request.GET.get("size") or 0)
+        except ValueError:
+            return HttpResponseBadRequest("size must be a number")
+
+        image = (
+            Image.objects.select_related("dataset")
+            .filter(dataset__user=request.user)
+            .get(**kwargs)
+        )
+
+        size = None
+        if requested_size > 0:
+            size = nearest_thumbnail_size(requested_size)
+        source = image.get_source(image.dataset, size)
+
+        if isinstance(source, ShardPointer):
+            # Records never change, their position identifies the content
+            last_modified = os.stat(source.shard_path).st_mtime
+            version = "{}-{}".format(
+                os.path.basename(source.shard_path), source.offset
+            )
+        else:
+            stat = os.stat(source)
+            last_modified = stat.st_mtime
+            version = stat.st_mtime_ns
+        etag = quote_etag("{}-{}-{}".format(image.id, size or 0, version))
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=int(last_modified)
+        )
+        if response is None:
+            response = self._image_response(source)
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        patch_cache_control(response, private=True, max_age=self.cache_seconds)
+        return response
+
+    def _image_response(self, source) -> HttpResponse:
+        if isinstance(source, ShardPointer):
+            return HttpResponse(read_pointer(source), CONTENT_TYPE)
+
+        if self.sendfile == "x-sendfile":
+            response = HttpResponse(content_type=CONTENT_TYPE)
+            response["X-Sendfile"] = os.path.abspath(source)
+            return response
+        if self.sendfile == "x-accel-redirect":
+            response = HttpResponse(content_type=CONTENT_TYPE)
+            response["X-Accel-Redirect"] = self.accel_redirect_prefix + (
+                os.path.relpath(source, STORAGE)
+            )
+            return response
+
+        return FileResponse(open(source, "rb"), content_type=CONTENT_TYPE)
 
-    def get(self, *args, **kwargs):
+
+def _selection_image_ids(dataset: Dataset, selection: str) -> List[int]:
+    try:
+        return contact_sheet.selection_image_ids(dataset, selection)
+    except (Label.DoesNotExist, ValueError):
+        raise Http404("Unknown selection.")
+
+
+def contact_sheet_url(dataset: Dataset, selection: str, page: int, key: str):
+    """Get the URL of a sheet, the key busts the browser cache."""
+    return "{}?v={}".format(
+        reverse(
+            "dataset-contactsheet",
+            kwargs={"pk": dataset.id, "selection": selection, "page": page},
+        ),
+        key,
+    )
+
+
+def image_tiles(dataset: Dataset, selection: str, images) -> List[dict]:
+    """Get sheet URL and position of every image for an image grid."""
+    image_ids = _selection_image_ids(dataset, selection)
+    tiles = contact_sheet.tiles(image_ids)
+    urls = [
+        contact_sheet_url(
+            dataset,
+            selection,
+            page,
+            contact_sheet.sheet_key(
+                contact_sheet.page_image_ids(image_ids, page)
+            ),
+        )
+        for page in range(contact_sheet.page_count(image_ids))
+    ]
+    return [
+        {
+            "image": image,
+            "sheet_url": urls[tiles[image.id].page],
+            "x": tiles[image.id].x,
+            "y": tiles[image.id].y,
+        }
+        for image in images
+        if image.id in tiles
+    ]
+
+
+class ContactSheetMapView(LoginRequiredMixin, View):
+    """Get the sheets and tile coordinates of a label or unlabeled images."""
+
+    def get(self, request, pk: int, selection: str):
         """Respond to the HTTP get request."""
-        image = Image.objects.filter(dataset__user=self.request.user).get(
-            **kwargs
+        dataset = get_object_or_404(Dataset, pk=pk, user=request.user)
+        image_ids = _selection_image_ids(dataset, selection)
+        tiles = contact_sheet.tiles(image_ids)
+        sheets = []
+        for page in range(contact_sheet.page_count(image_ids)):
+            page_image_ids = contact_sheet.page_image_ids(image_ids, page)
+            sheets.append(
+                {
+                    "url": contact_sheet_url(
+                        dataset,
+                        selection,
+                        page,
+                        contact_sheet.sheet_key(page_image_ids),
+                    ),
+                    "tiles": [
+                        {
+                            "image_id": image_id,
+                            "x": tiles[image_id].x,
+                            "y": tiles[image_id].y,
+                        }
+                        for image_id in page_image_ids
+                    ],
+                }
+            )
+        return JsonResponse(
+            {
+                "tile_size": contact_sheet.TILE_SIZE,
+                "columns": contact_sheet.SHEET_COLUMNS,
+                "sheets": sheets,
+            }
         )
 
-        image_data = open(image.path, "rb").read()
 
-        return HttpResponse(image_data, "image/jpg")
+class ContactSheetView(LoginRequiredMixin, View):
+    """Get one contact sheet as JPEG."""
+
+    cache_seconds = IMAGE_CACHE_SECONDS
+
+    def get(self, request, pk: int, selection: str, page: int):
+        """Respond to the HTTP get request."""
+        dataset = get_object_or_404(Dataset, pk=pk, user=request.user)
+        image_ids = contact_sheet.page_image_ids(
+            _selection_image_ids(dataset, selection), page
+        )
+        if not image_ids:
+            raise Http404("No images on this page.")
+
+        etag = quote_etag(contact_sheet.sheet_key(image_ids))
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            path = contact_sheet.get_sheet(dataset, image_ids)
+            response = FileResponse(
+                open(path, "rb"), content_type=CONTENT_TYPE
+            )
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, max_age=self.cache_seconds)
+        return response
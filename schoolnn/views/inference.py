@@ -75,6 +75,14 @@ class InferenceView(View):
 
         if form.is_valid():
             training_pass = TrainingPass.objects.get(pk=training_pk)
+            # Passes of sweeps get their weights when they are started
+            if training_pass.initial_weights_id is None:
+                messages.error(
+                    request, "Das Training hat noch nicht begonnen."
+                )
+                return redirect(
+                    "inference", project_pk=project_pk, training_pk=training_pk
+                )
             try:
                 image_predictions = self._handle_valid_form(
                     form,
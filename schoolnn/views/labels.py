@@ -9,7 +9,9 @@ from django.views.generic.edit import (
     DeleteView,
 )
 from django.contrib.messages.views import SuccessMessageMixin
+from schoolnn import labelling
 from schoolnn.models import Dataset, Label, Image
+from schoolnn.views.images import image_tiles
 from django.urls import reverse, reverse_lazy
 from django.contrib import messages
 from io import BytesIO
@@ -81,10 +83,15 @@ class LabelDetailView(UpdateView):
         kwargs.update(self.kwargs)
         return kwargs
 
-    def remove_label(self, image_id):
-        """ Removes a label of a given image. """
+    def get_context_data(self, **kwargs):
+        """ Retrieve the contact sheet tiles of the label's images. """
+        context = super().get_context_data(**kwargs)
+        label = self.object
+        context["tiles"] = image_tiles(
+            label.dataset, str(label.id), label.image_set.all()
+        )
 
-        Image.objects.filter(pk=image_id).update(label=None)
+        return context
 
     def form_valid(self, form):
         """
@@ -92,11 +99,7 @@ class LabelDetailView(UpdateView):
         """
 
         image_ids = form.data.getlist("image_id_list")
-
-        for image in image_ids:
-            self.remove_label(image)
-
-        count = len(image_ids)
+        count = labelling.remove_label(self.object, image_ids)
         image_word = "Bild" if count == 1 else "Bilder"
 
         messages.success(
@@ -160,8 +163,8 @@ class LabelCreateImageView(FormView):
 
         return context
 
-    def copy_file(self, image_binary, path):
-        """Copy uploaded image to specified folder."""
+    def copy_file(self, image_binary, image: Image):
+        """Copy uploaded image to the storage of the dataset."""
         image_bio = BytesIO()
         for chunk in image_binary.chunks():
             image_bio.write(chunk)
@@ -172,7 +175,7 @@ class LabelCreateImageView(FormView):
         image_pillow = ImageOps.fit(
             image_pillow, (target_size, target_size), ImagePillow.ANTIALIAS
         )
-        image_pillow.save(path)
+        image.store_pillow(image_pillow)
 
     def create_image_entry(self, label, dataset):
         """ Insert an Image object into the database """
@@ -205,7 +208,7 @@ class LabelCreateImageView(FormView):
         label = Label.objects.get(pk=form.data["label"])
         dataset = Dataset.objects.get(pk=form.data["dataset"])
         image = self.create_image_entry(label, dataset)
-        self.copy_file(self.request.FILES["file"], image.path)
+        self.copy_file(self.request.FILES["file"], image)
 
         messages.success(self.request, "Bild erfolgreich hochgeladen.")
 
@@ -0,0 +1,23 @@
+"""Export of the in-process metrics for Prometheus."""
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views import View
+from schoolnn_app.settings import METRICS_TOKEN
+from schoolnn.instrumentation import REGISTRY
+
+# Importing registers the collectors of the training queue
+import schoolnn.training.training_management  # noqa: F401
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsView(View):
+    """Get all metrics in the Prometheus text format."""
+
+    def get(self, request):
+        """Respond to the HTTP get request."""
+        if METRICS_TOKEN:
+            authorization = request.headers.get("Authorization", "")
+            if authorization != "Bearer {}".format(METRICS_TOKEN):
+                return HttpResponseForbidden()
+
+        return HttpResponse(REGISTRY.render_text(), content_type=CONTENT_TYPE)
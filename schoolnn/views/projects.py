@@ -17,6 +17,8 @@ from schoolnn.models import (
     TrainingParameter,
     LossFunction,
     Optimizer,
+    Precision,
+    LearningRateSchedule,
     AugmentationOptions,
     TerminationCondition,
 )
@@ -24,6 +26,8 @@ from schoolnn.resources.static.default_training_parameters import (
     default_training_parameters,
 )
 from schoolnn.resources.static.layer_list import provided_layer
+from schoolnn.training.data_parallel import MAX_DATA_PARALLEL_WORKERS
+from schoolnn.training.transfer import backbone_available
 from schoolnn.views.mixins import (
     LoginRequiredMixin,
     AuthenticatedQuerysetMixin,
@@ -195,8 +199,11 @@ class ProjectEditView(LoginRequiredMixin, View):
                     initial={
                         "validation_split": parameters.validation_split,
                         "learning_rate": parameters.learning_rate,
+                        "learning_rate_schedule": parameters.learning_rate_schedule.value,  # noqa: E501
                         "termination_condition_seconds": parameters.termination_condition.seconds,  # noqa: E501
                         "termination_condition_epochs": parameters.termination_condition.epochs,  # noqa: E501
+                        "termination_condition_patience": parameters.termination_condition.patience,  # noqa: E501
+                        "termination_condition_min_delta": parameters.termination_condition.min_delta,  # noqa: E501
                         "batch_size": parameters.batch_size,
                         "loss_function": parameters.loss_function.value,
                         "optimizer": parameters.optimizer.value,
@@ -211,6 +218,10 @@ class ProjectEditView(LoginRequiredMixin, View):
                         "augmentation_rotate": parameters.augmentation_options.rotate,  # noqa: E501
                         "augmentation_scale_and_translate": parameters.augmentation_options.scale_and_translate,  # noqa: E501
                         "augmentation_color": parameters.augmentation_options.color,  # noqa: E501
+                        "jit_compile": parameters.jit_compile,
+                        "precision": parameters.precision.value,
+                        "transfer_learning": parameters.transfer_learning,
+                        "data_parallel_workers": parameters.data_parallel_workers,  # noqa: E501
                     }
                 ),
             }
@@ -334,6 +345,13 @@ class ProjectEditView(LoginRequiredMixin, View):
             {
                 "seconds": form.cleaned_data["termination_condition_seconds"],
                 "epochs": form.cleaned_data["termination_condition_epochs"],
+                "patience": form.cleaned_data[
+                    "termination_condition_patience"
+                ],
+                "min_delta": form.cleaned_data[
+                    "termination_condition_min_delta"
+                ]
+                or 0.0,
             }
         )
         loss_function = LossFunction(form.cleaned_data["loss_function"])
@@ -371,11 +389,18 @@ class ProjectEditView(LoginRequiredMixin, View):
         new_parameters = TrainingParameter(
             validation_split=form.cleaned_data["validation_split"],
             learning_rate=form.cleaned_data["learning_rate"],
+            learning_rate_schedule=LearningRateSchedule(
+                form.cleaned_data["learning_rate_schedule"]
+            ),
             termination_condition=termination_condition,
             batch_size=form.cleaned_data["batch_size"],
             loss_function=loss_function,
             optimizer=optimizer,
             augmentation_options=augmentation_options,
+            jit_compile=form.cleaned_data["jit_compile"],
+            precision=Precision(form.cleaned_data["precision"]),
+            transfer_learning=form.cleaned_data["transfer_learning"],
+            data_parallel_workers=form.cleaned_data["data_parallel_workers"],
         )
 
         self.project.training_parameter_json = new_parameters.to_dict()
@@ -412,6 +437,7 @@ class TrainingParameterForm(forms.Form):
             "fields": [
                 "validation_split",
                 "learning_rate",
+                "learning_rate_schedule",
                 "batch_size",
                 "loss_function",
                 "optimizer",
@@ -423,6 +449,8 @@ class TrainingParameterForm(forms.Form):
             "fields": [
                 "termination_condition_seconds",
                 "termination_condition_epochs",
+                "termination_condition_patience",
+                "termination_condition_min_delta",
             ],
             "id": "termination_settings",
         },
@@ -443,6 +471,16 @@ class TrainingParameterForm(forms.Form):
             ],
             "id": "augmentation_settings",
         },
+        {
+            "headline": "Rechen-Einstellungen",
+            "fields": [
+                "jit_compile",
+                "precision",
+                "transfer_learning",
+                "data_parallel_workers",
+            ],
+            "id": "compute_settings",
+        },
     ]
 
     validation_split = forms.FloatField(
@@ -459,6 +497,14 @@ class TrainingParameterForm(forms.Form):
         label="Lernrate", min_value=0.001, max_value=0.2
     )
 
+    learning_rate_schedule = forms.ChoiceField(
+        label="Anpassung der Lernrate",
+        choices=[
+            (schedule.value, schedule.human_readable)
+            for schedule in LearningRateSchedule
+        ],
+    )
+
     termination_condition_seconds = forms.IntegerField(
         label="Vergangene Sekunden seit Trainingsbeginn",
         min_value=1,
@@ -469,6 +515,19 @@ class TrainingParameterForm(forms.Form):
         label="Anzahl der Epochen", min_value=1, max_value=128
     )
 
+    termination_condition_patience = forms.IntegerField(
+        label="Blöcke ohne Verbesserung des Validierungs-Loss (leer: aus)",
+        min_value=1,
+        max_value=1000,
+        required=False,
+    )
+
+    termination_condition_min_delta = forms.FloatField(
+        label="Mindestverbesserung des Validierungs-Loss",
+        min_value=0.0,
+        required=False,
+    )
+
     batch_size = forms.IntegerField(
         label="Batchgröße", min_value=1, max_value=128
     )
@@ -532,6 +591,36 @@ class TrainingParameterForm(forms.Form):
 
     augmentation_color = forms.BooleanField(label="Farbe", required=False)
 
+    jit_compile = forms.BooleanField(label="XLA-Kompilierung", required=False)
+
+    precision = forms.ChoiceField(
+        label="Rechengenauigkeit",
+        choices=[
+            ("float32", "float32"),
+            ("mixed_bfloat16", "bfloat16 gemischt (falls CPU unterstützt)"),
+        ],
+    )
+
+    transfer_learning = forms.BooleanField(
+        label="Transfer-Learning (nur Dense-Schichten trainieren)",
+        required=False,
+    )
+
+    data_parallel_workers = forms.IntegerField(
+        label="Trainingsprozesse pro Durchlauf",
+        min_value=1,
+        max_value=MAX_DATA_PARALLEL_WORKERS,
+        initial=1,
+    )
+
+    def clean_transfer_learning(self) -> bool:
+        transfer_learning = self.cleaned_data["transfer_learning"]
+        if transfer_learning and not backbone_available():
+            raise forms.ValidationError(
+                "Für Transfer-Learning ist kein Backbone konfiguriert."
+            )
+        return transfer_learning
+
 
 class ProjectDeleteView(AuthenticatedQuerysetMixin, DeleteView):
     """Responsible for deleting all the data of a project."""
@@ -1,9 +1,13 @@
 """All views having to do with training."""
 
 from .create import TrainingCreateView  # noqa:F401
+from .sweep import TrainingSweepCreateView  # noqa:F401
 from .detail import TrainingDetailView  # noqa:F401
 from .delete import TrainingDeleteView  # noqa:F401
 from .stop import TrainingStopView  # noqa:F401
 from .list_view import TrainingListView  # noqa:F401
 from .compare import TrainingCompareView  # noqa:F401
 from .continue_ import TrainingContinueView  # noqa:F401
+from .telemetry import TrainingTelemetryView  # noqa:F401
+from .progress import TrainingProgressView  # noqa:F401
+from .profile import TrainingProfileDownloadView  # noqa:F401
@@ -1,19 +1,24 @@
 from collections import namedtuple
-from typing import List
+from typing import Dict, List, Optional
+from django.db.models import F
+from django.http import HttpResponseBadRequest
 from django.views import View
 from django.shortcuts import render
 from schoolnn.models import (
     Project,
+    Sweep,
     TrainingPass,
-    TrainingStepMetrics,
 )
+from schoolnn.training.sweeps import sweep_label
+from schoolnn.training_metrics import chart_series
 from schoolnn.views.mixins import UserIsProjectOwnerMixin
 
 TrainingPassGraphDetails = namedtuple(
     "TrainingPassGraphDetails",
     [
         "training_pass",
-        "x_values",
+        "parameters",
+        "block_count",
         "y_values_training_loss",
         "y_values_training_accuracy",
         "y_values_validation_loss",
@@ -31,31 +36,30 @@ _COLORLIST = [
 ]
 
 
+_ORDERINGS = {
+    "id": F("id").asc(),
+    "accuracy": F("best_validation_accuracy").desc(nulls_last=True),
+    "loss": F("lowest_validation_loss").asc(nulls_last=True),
+}
+
+
 def _training_pass_to_training_pass_graph_details(
     training_pass: TrainingPass,
+    series: Dict[str, List[list]],
+    sweep: Optional[Sweep],
 ) -> TrainingPassGraphDetails:
-    training_metrics = TrainingStepMetrics.objects.filter(
-        training_pass=training_pass
-    )
-    y_values_training_loss = []
-    y_values_training_accuracy = []
-    y_values_validation_loss = []
-    y_values_validation_accuracy = []
-
-    for metrics_item in training_metrics:
-        metrics = metrics_item.metrics_dict
-        y_values_training_loss.append(metrics["training"]["loss"])
-        y_values_validation_loss.append(metrics["validation"]["loss"])
-        y_values_training_accuracy.append(metrics["training"]["accuracy"])
-        y_values_validation_accuracy.append(metrics["validation"]["accuracy"])
-
     return TrainingPassGraphDetails(
         training_pass=training_pass,
-        x_values=list(range(len(y_values_training_loss))),
-        y_values_training_loss=y_values_training_loss,
-        y_values_validation_loss=y_values_validation_loss,
-        y_values_training_accuracy=y_values_training_accuracy,
-        y_values_validation_accuracy=y_values_validation_accuracy,
+        parameters=(
+            sweep_label(sweep, training_pass.training_parameter_json)
+            if sweep is not None
+            else ""
+        ),
+        block_count=training_pass.block_count,
+        y_values_training_loss=series["training_loss"],
+        y_values_validation_loss=series["validation_loss"],
+        y_values_training_accuracy=series["training_accuracy"],
+        y_values_validation_accuracy=series["validation_accuracy"],
     )
 
 
@@ -63,18 +67,55 @@ class TrainingCompareView(UserIsProjectOwnerMixin, View):
     """Get a comparison over all trainings passed."""
 
     def get(self, request, project_pk: int):
-        """Get HTTP."""
-        training_passes = TrainingPass.objects.filter(project_id=project_pk)
+        """Get HTTP.
+
+        The passes are sorted by ?order= (see _ORDERINGS) and filtered by
+        their best validation accuracy with ?min_accuracy=. With ?sweep=
+        only the passes of the sweep are shown, with the values they were
+        trained with.
+        """
+        order = request.GET.get("order", "id")
+        if order not in _ORDERINGS:
+            return HttpResponseBadRequest("Unknown order.")
+        training_passes = (
+            TrainingPass.objects.filter(project_id=project_pk)
+            .with_metrics_summary()
+            .defer("model_weights")
+            .order_by(_ORDERINGS[order], "id")
+        )
+        min_accuracy = request.GET.get("min_accuracy") or None
+        if min_accuracy is not None:
+            try:
+                training_passes = training_passes.filter(
+                    best_validation_accuracy__gte=float(min_accuracy)
+                )
+            except ValueError:
+                return HttpResponseBadRequest("Invalid accuracy.")
+        sweep = None
+        sweep_id = request.GET.get("sweep") or None
+        if sweep_id is not None:
+            try:
+                sweep = Sweep.objects.get(
+                    pk=int(sweep_id), project_id=project_pk
+                )
+            except (ValueError, Sweep.DoesNotExist):
+                return HttpResponseBadRequest("Unknown sweep.")
+            training_passes = training_passes.filter(sweep=sweep)
+
+        training_passes = list(training_passes)
+        series = chart_series([tp.id for tp in training_passes])
 
         training_pass_graph_details = [
-            _training_pass_to_training_pass_graph_details(training_pass)
+            _training_pass_to_training_pass_graph_details(
+                training_pass, series[training_pass.id], sweep
+            )
             for training_pass in training_passes
         ]
 
-        longest_x_values: List[int] = []
-        for graph_details in training_pass_graph_details:
-            if len(graph_details.x_values) > len(longest_x_values):
-                longest_x_values = graph_details.x_values
+        block_count = max(
+            (details.block_count for details in training_pass_graph_details),
+            default=0,
+        )
 
         training_pass_details_and_colors = []
         for i in range(len(training_pass_graph_details)):
@@ -89,7 +130,11 @@ class TrainingCompareView(UserIsProjectOwnerMixin, View):
             "request": request,
             "project": Project.objects.get(id=project_pk),
             "training_pass_details_and_colors": training_pass_details_and_colors,  # noqa: E501
-            "x_values": longest_x_values,
+            "block_count": block_count,
+            "order": order,
+            "min_accuracy": min_accuracy or "",
+            "sweep": sweep,
+            "sweeps": Sweep.objects.filter(project_id=project_pk),
         }
 
         return render(
@@ -1,3 +1,4 @@
+from django.contrib import messages
 from django.views import View
 from django.shortcuts import render
 from django.http import HttpResponseRedirect
@@ -28,5 +29,8 @@ class TrainingContinueView(UserIsProjectOwnerMixin, View):
         """Continue training pass."""
         training_pass = TrainingPass.objects.get(pk=training_pk)
         training_manager = TrainingManager()
-        training_manager.continue_training_pass(training_pass)
+        if not training_manager.continue_training_pass(training_pass):
+            messages.error(
+                request, "Das Training läuft bereits oder wartet darauf."
+            )
         return HttpResponseRedirect("../{}".format(training_pass.id))
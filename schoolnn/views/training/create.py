@@ -7,6 +7,10 @@ from django.contrib import messages
 from schoolnn.training import (
     TrainingManager,
 )
+from schoolnn.training.warm_start import (
+    WarmStartError,
+    warm_start_candidates,
+)
 from schoolnn.models import (
     Project,
     TrainingPass,
@@ -30,10 +34,28 @@ _OPTIMIZER_CHOICES = [
 ]
 
 
+class _TrainingPassChoiceField(forms.ModelChoiceField):
+    def label_from_instance(self, training_pass: TrainingPass) -> str:
+        return "{} – {}".format(training_pass.project.name, training_pass.name)
+
+
 class TrainingStartForm(forms.Form):
     """Dataset form that contains an additional file field."""
 
     name = forms.CharField()
+    warm_start_from = _TrainingPassChoiceField(
+        queryset=TrainingPass.objects.none(),
+        required=False,
+        label="Gewichte übernehmen von",
+        empty_label="Keinem (zufällige Gewichte)",
+    )
+
+    def __init__(self, *args, project: Project, **kwargs):
+        """Offer the trained passes with the project's architecture."""
+        super().__init__(*args, **kwargs)
+        self.fields["warm_start_from"].queryset = warm_start_candidates(
+            project
+        )
 
 
 class TrainingCreateView(UserIsProjectOwnerMixin, View):
@@ -50,6 +72,7 @@ class TrainingCreateView(UserIsProjectOwnerMixin, View):
         training_pass = training_manager.apply_job(
             project,
             form.cleaned_data["name"],
+            warm_start_from=form.cleaned_data["warm_start_from"],
         )
         return training_pass
 
@@ -75,17 +98,19 @@ class TrainingCreateView(UserIsProjectOwnerMixin, View):
 
         context = {
             "project": project,
-            "form": TrainingStartForm(initial={"name": default_name}),
+            "form": TrainingStartForm(
+                initial={"name": default_name}, project=project
+            ),
         }
         return render(request, self.template_name, context)
 
     def post(self, request, project_pk: int = 0):
         """Handle committed dataset create form."""
-        form = TrainingStartForm(request.POST)
+        project = Project.objects.get(pk=project_pk)
+        form = TrainingStartForm(request.POST, project=project)
         if form is None:
             raise ValueError("Failed to parse the dataset create form")
 
-        project = Project.objects.get(pk=project_pk)
         validation_error_message = get_error_message(
             project.architecture.architecture_json,
             arch_name=project.architecture.name,
@@ -96,8 +121,13 @@ class TrainingCreateView(UserIsProjectOwnerMixin, View):
             return redirect("show-trainings", project_pk=project_pk)
 
         if form.is_valid():
-            project = Project.objects.get(pk=project_pk)
-            training_pass = self._valid_form_to_training_pass(form, project)
+            try:
+                training_pass = self._valid_form_to_training_pass(
+                    form, project
+                )
+            except WarmStartError as error:
+                messages.error(self.request, str(error))
+                return redirect("create-training", project_pk=project_pk)
 
             return redirect(
                 "show-training",
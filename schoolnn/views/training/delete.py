@@ -1,3 +1,5 @@
+import os
+import shutil
 from django.views import View
 from django.shortcuts import render
 from django.http import HttpResponseRedirect
@@ -23,5 +25,9 @@ class TrainingDeleteView(UserIsProjectOwnerMixin, View):
 
     def post(self, request, training_pk: int = 0, **_kwargs):
         """Delete training pass."""
-        TrainingPass.objects.get(pk=training_pk).delete()
+        training_pass = TrainingPass.objects.get(pk=training_pk)
+        training_pass_dir = training_pass.dir
+        training_pass.delete()
+        if os.path.isdir(training_pass_dir):
+            shutil.rmtree(training_pass_dir)
         return HttpResponseRedirect("../create")
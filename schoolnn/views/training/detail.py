@@ -1,12 +1,37 @@
+import os
+from typing import List, Tuple
 from django.views import View
 from django.shortcuts import render
 from schoolnn.models import (
     Project,
     TrainingPass,
-    TrainingStepMetrics,
+    TrainingProgressEvent,
 )
+from schoolnn.training_metrics import chart_series
 from schoolnn.views.mixins import UserIsProjectOwnerMixin
 
+_PHASE_NAMES = [
+    ("model_load", "Modell laden"),
+    ("data_wait", "Warten auf Daten"),
+    ("compute", "Training (Vorwärts/Rückwärts)"),
+    ("validation", "Validierung"),
+    ("checkpoint_serialization", "Modell serialisieren"),
+    ("database_write", "Datenbank schreiben"),
+]
+
+
+def _performance_phases(performance: dict) -> List[Tuple[str, float, float]]:
+    """Get name, seconds and percentage of every phase of a block."""
+    seconds = performance.get("seconds", {})
+    seconds_sum = sum(seconds.values())
+    if seconds_sum <= 0:
+        return []
+    return [
+        (name, seconds[key], 100 * seconds[key] / seconds_sum)
+        for key, name in _PHASE_NAMES
+        if key in seconds
+    ]
+
 
 class TrainingDetailView(UserIsProjectOwnerMixin, View):
     """Get an overview over a training."""
@@ -18,30 +43,28 @@ class TrainingDetailView(UserIsProjectOwnerMixin, View):
         project = Project.objects.get(id=project_pk)
         training_pass = TrainingPass.objects.get(id=training_pk)
 
-        y_values_loss_training = []
-        y_values_loss_validation = []
-        y_values_accuracy_training = []
-        y_values_accuracy_validation = []
-        traing_step_metrics = TrainingStepMetrics.objects.filter(
-            training_pass=training_pass
-        )
-        for traing_step_metric in traing_step_metrics:
-            metrics = traing_step_metric.metrics_dict
-            y_values_loss_training.append(metrics["training"]["loss"])
-            y_values_loss_validation.append(metrics["validation"]["loss"])
-            y_values_accuracy_training.append(metrics["training"]["accuracy"])
-            y_values_accuracy_validation.append(
-                metrics["validation"]["accuracy"]
-            )
-        x_values = list(range(len(y_values_loss_training)))
+        series = chart_series([training_pass.id])[training_pass.id]
+
+        latest_metrics = training_pass.latest_training_step_metrics
+        performance = latest_metrics.performance_dict if latest_metrics else {}
+        # The page shows everything up to here, the stream only what follows
+        progress_cursor = (
+            TrainingProgressEvent.objects.filter(training_pass=training_pass)
+            .order_by("-id")
+            .values_list("id", flat=True)
+            .first()
+        ) or 0
 
         context = {
             "project": project,
             "training_pass": training_pass,
-            "x_values": x_values,
-            "y_values_loss_training": y_values_loss_training,
-            "y_values_loss_validation": y_values_loss_validation,
-            "y_values_accuracy_training": y_values_accuracy_training,
-            "y_values_accuracy_validation": y_values_accuracy_validation,
+            "y_values_loss_training": series["training_loss"],
+            "y_values_loss_validation": series["validation_loss"],
+            "y_values_accuracy_training": series["training_accuracy"],
+            "y_values_accuracy_validation": series["validation_accuracy"],
+            "performance": performance,
+            "performance_phases": _performance_phases(performance),
+            "profile_available": os.path.isdir(training_pass.profile_dir),
+            "progress_cursor": progress_cursor,
         }
         return render(request, self.template_name, context)
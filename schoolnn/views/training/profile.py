@@ -0,0 +1,22 @@
+from django.views import View
+from django.http import FileResponse, Http404
+from schoolnn.models import TrainingPass
+from schoolnn.training.profiling import profile_zip
+from schoolnn.views.mixins import UserIsProjectOwnerMixin
+
+
+class TrainingProfileDownloadView(UserIsProjectOwnerMixin, View):
+    """Download the profiling output of a training as zip file."""
+
+    def get(self, request, project_pk: int = 0, training_pk: int = 0):
+        """Get HTTP."""
+        training_pass = TrainingPass.objects.get(pk=training_pk)
+        zip_binary = profile_zip(training_pass)
+        if zip_binary is None:
+            raise Http404("No profile recorded for this training.")
+        return FileResponse(
+            zip_binary,
+            as_attachment=True,
+            filename="training-{}-profile.zip".format(training_pass.id),
+            content_type="application/zip",
+        )
@@ -0,0 +1,119 @@
+import json
+from time import sleep, time
+from typing import Iterator, Optional
+from django.views import View
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from schoolnn.models import (
+    TrainingPass,
+    TrainingPassState,
+    TrainingProgressEvent,
+)
+from schoolnn.views.mixins import UserIsProjectOwnerMixin
+
+POLL_SECONDS = 0.5
+# The poll interval doubles up to this while nothing new arrives
+MAX_POLL_SECONDS = 5
+KEEP_ALIVE_SECONDS = 15
+# A stream holds a server thread, browsers reconnect after it ended
+STREAM_SECONDS = 60
+RECONNECT_MILLISECONDS = 1000
+# Passes in these states publish nothing until they are resumed
+IDLE_STATES = (
+    TrainingPassState.PAUSED.value,
+    TrainingPassState.COMPLETED.value,
+    TrainingPassState.STOPPED.value,
+)
+
+
+def _event(kind: str, data: dict, event_id: Optional[int] = None) -> str:
+    lines = ["event: {}".format(kind), "data: {}".format(json.dumps(data))]
+    if event_id is not None:
+        lines.insert(0, "id: {}".format(event_id))
+    return "\n".join(lines) + "\n\n"
+
+
+def progress_stream(
+    training_pass_id: int,
+    cursor: int,
+    stream_seconds: float = STREAM_SECONDS,
+) -> Iterator[str]:
+    """Stream the progress events after cursor as server-sent events.
+
+    The status of the pass is sent first and whenever it changes. The
+    stream ends after stream_seconds, when the pass is idle (paused,
+    completed or stopped) or deleted. The database is polled less often
+    while nothing new arrives.
+    """
+    yield "retry: {}\n\n".format(RECONNECT_MILLISECONDS)
+    status = None
+    end = time() + stream_seconds
+    last_sent = time()
+    poll_seconds = POLL_SECONDS
+    while True:
+        sent_count = 0
+        events = TrainingProgressEvent.objects.filter(
+            training_pass_id=training_pass_id, id__gt=cursor
+        ).order_by("id")
+        for event in events:
+            cursor = event.id
+            sent_count += 1
+            yield _event(event.kind, event.data_json, event.id)
+
+        current_status = (
+            TrainingPass.objects.filter(pk=training_pass_id)
+            .values_list("status", flat=True)
+            .first()
+        )
+        if current_status is None:
+            return
+        if current_status != status:
+            status = current_status
+            sent_count += 1
+            yield _event(
+                "status",
+                {
+                    "status": status,
+                    "status_human_readable": TrainingPassState(
+                        status
+                    ).human_readable,
+                },
+            )
+        if status in IDLE_STATES or time() >= end:
+            return
+
+        if sent_count:
+            last_sent = time()
+            poll_seconds = POLL_SECONDS
+        else:
+            poll_seconds = min(2 * poll_seconds, MAX_POLL_SECONDS)
+        if time() - last_sent >= KEEP_ALIVE_SECONDS:
+            last_sent = time()
+            yield ": keep-alive\n\n"
+        sleep(max(0.0, min(poll_seconds, end - time())))
+
+
+class TrainingProgressView(UserIsProjectOwnerMixin, View):
+    """Stream the live progress of a training as server-sent events.
+
+    Only events after the Last-Event-ID header, sent by reconnecting
+    browsers, or the cursor parameter are streamed.
+    """
+
+    def get(self, request, project_pk: int = 0, training_pk: int = 0):
+        """Get HTTP."""
+        training_pass = TrainingPass.objects.get(pk=training_pk)
+        try:
+            cursor = int(
+                request.headers.get("Last-Event-ID")
+                or request.GET.get("cursor", "0")
+            )
+        except ValueError:
+            return HttpResponseBadRequest("Invalid cursor.")
+        response = StreamingHttpResponse(
+            progress_stream(training_pass.id, cursor, STREAM_SECONDS),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        # Keeps reverse proxies like nginx from buffering the stream
+        response["X-Accel-Buffering"] = "no"
+        return response
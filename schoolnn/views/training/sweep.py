@@ -0,0 +1,179 @@
+"""Start a hyperparameter sweep, a group of training passes."""
+from math import prod
+from django import forms
+from django.contrib import messages
+from django.shortcuts import redirect, render
+from django.urls import reverse
+from django.views import View
+from schoolnn.models import LearningRateSchedule, Project, Sweep, SweepStrategy
+from schoolnn.training import TrainingManager
+from schoolnn.training.sweeps import MAX_SWEEP_PASSES
+from schoolnn.views.mixins import UserIsProjectOwnerMixin
+from ..architectureview import get_error_message
+from .create import _OPTIMIZER_CHOICES
+
+
+def _split(value: str) -> list:
+    return [part for part in value.replace(",", " ").split() if part]
+
+
+class SweepForm(forms.Form):
+    """Search space and strategy of a sweep."""
+
+    name = forms.CharField(max_length=15)
+    strategy = forms.ChoiceField(
+        label="Strategie",
+        choices=[(s.value, s.human_readable) for s in SweepStrategy],
+    )
+    count = forms.IntegerField(
+        label="Anzahl Durchläufe bei zufälliger Auswahl",
+        min_value=2,
+        max_value=MAX_SWEEP_PASSES,
+        initial=8,
+        required=False,
+    )
+    batch_sizes = forms.CharField(
+        label="Batchgrößen (durch Kommas getrennt)", required=False
+    )
+    learning_rates = forms.CharField(
+        label="Lernraten (durch Kommas getrennt)", required=False
+    )
+    optimizers = forms.MultipleChoiceField(
+        label="Optimierer",
+        choices=_OPTIMIZER_CHOICES,
+        widget=forms.CheckboxSelectMultiple,
+        required=False,
+    )
+    learning_rate_schedules = forms.MultipleChoiceField(
+        label="Anpassung der Lernrate",
+        choices=[(s.value, s.human_readable) for s in LearningRateSchedule],
+        widget=forms.CheckboxSelectMultiple,
+        required=False,
+    )
+    vary_augmentation = forms.BooleanField(
+        label="Mit und ohne Augmentierung", required=False
+    )
+    blocks_per_rung = forms.IntegerField(
+        label="Successive Halving: Blöcke bis zur ersten Auswahl (leer: aus)",
+        min_value=1,
+        max_value=1000,
+        required=False,
+    )
+
+    def clean_batch_sizes(self) -> list:
+        try:
+            batch_sizes = [
+                int(v) for v in _split(self.cleaned_data["batch_sizes"])
+            ]
+        except ValueError:
+            raise forms.ValidationError("Batchgrößen müssen Zahlen sein.")
+        if any(not 1 <= batch_size <= 128 for batch_size in batch_sizes):
+            raise forms.ValidationError("Batchgrößen gehen von 1 bis 128.")
+        return batch_sizes
+
+    def clean_learning_rates(self) -> list:
+        try:
+            learning_rates = [
+                float(v) for v in _split(self.cleaned_data["learning_rates"])
+            ]
+        except ValueError:
+            raise forms.ValidationError("Lernraten müssen Zahlen sein.")
+        if any(not 0.001 <= rate <= 0.2 for rate in learning_rates):
+            raise forms.ValidationError("Lernraten gehen von 0.001 bis 0.2.")
+        return learning_rates
+
+    def clean(self):
+        cleaned_data = super().clean()
+        search_space = {
+            "batch_size": cleaned_data.get("batch_sizes"),
+            "learning_rate": cleaned_data.get("learning_rates"),
+            "optimizer": cleaned_data.get("optimizers"),
+            "learning_rate_schedule": cleaned_data.get(
+                "learning_rate_schedules"
+            ),
+            "augmentation": (
+                [True, False] if cleaned_data.get("vary_augmentation") else []
+            ),
+        }
+        if cleaned_data.get("strategy") == SweepStrategy.RANDOM.value:
+            # Drawn from single values, all passes would be the same
+            if not any(len(v) > 1 for v in search_space.values()):
+                raise forms.ValidationError(
+                    "Eine zufällige Auswahl braucht einen Parameter mit "
+                    "mindestens zwei Werten."
+                )
+            pass_count = cleaned_data.get("count") or 0
+        else:
+            pass_count = prod(len(v) or 1 for v in search_space.values())
+        if pass_count < 2:
+            raise forms.ValidationError(
+                "Eine Suche braucht mindestens zwei Durchläufe."
+            )
+        if pass_count > MAX_SWEEP_PASSES:
+            raise forms.ValidationError(
+                "Eine Suche darf höchstens {} Durchläufe haben.".format(
+                    MAX_SWEEP_PASSES
+                )
+            )
+        cleaned_data["search_space"] = search_space
+        return cleaned_data
+
+
+class TrainingSweepCreateView(UserIsProjectOwnerMixin, View):
+    """Handle creation of sweeps."""
+
+    template_name = "training/create_sweep.html"
+
+    def _project_or_redirect(self, project_pk: int):
+        project = Project.objects.get(pk=project_pk)
+        if project.training_parameter is None:
+            return project, redirect("project-edit-parameters", pk=project.id)
+        validation_error_message = get_error_message(
+            project.architecture.architecture_json,
+            arch_name=project.architecture.name,
+        )
+        if validation_error_message:
+            messages.error(self.request, validation_error_message)
+            return project, redirect("show-trainings", project_pk=project_pk)
+        return project, None
+
+    def get(self, request, project_pk: int = 0):
+        """Get site to start a new sweep."""
+        project, response = self._project_or_redirect(project_pk)
+        if response is not None:
+            return response
+
+        sweep_count = Sweep.objects.filter(project=project).count()
+        form = SweepForm(
+            initial={
+                "name": "Suche {}".format(sweep_count + 1),
+                "strategy": SweepStrategy.GRID.value,
+            }
+        )
+        context = {"project": project, "form": form}
+        return render(request, self.template_name, context)
+
+    def post(self, request, project_pk: int = 0):
+        """Create the passes of the sweep and queue them."""
+        project, response = self._project_or_redirect(project_pk)
+        if response is not None:
+            return response
+
+        form = SweepForm(request.POST)
+        if not form.is_valid():
+            context = {"project": project, "form": form}
+            return render(request, self.template_name, context)
+
+        sweep = TrainingManager().apply_sweep(
+            project,
+            form.cleaned_data["name"],
+            strategy=SweepStrategy(form.cleaned_data["strategy"]),
+            search_space=form.cleaned_data["search_space"],
+            count=form.cleaned_data["count"] or 0,
+            blocks_per_rung=form.cleaned_data["blocks_per_rung"],
+        )
+        return redirect(
+            "{}?sweep={}".format(
+                reverse("compare-training", args=[project_pk]), sweep.id
+            )
+        )
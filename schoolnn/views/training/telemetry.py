@@ -0,0 +1,32 @@
+from django.views import View
+from django.http import JsonResponse
+from schoolnn.models import (
+    TrainingPass,
+    TrainingStepMetrics,
+)
+from schoolnn.views.mixins import UserIsProjectOwnerMixin
+
+
+class TrainingTelemetryView(UserIsProjectOwnerMixin, View):
+    """Get the performance telemetry of all blocks of a training as JSON."""
+
+    def get(self, request, project_pk: int = 0, training_pk: int = 0):
+        """Get HTTP."""
+        training_pass = TrainingPass.objects.get(pk=training_pk)
+        training_step_metrics = TrainingStepMetrics.objects.filter(
+            training_pass=training_pass
+        ).order_by("id")
+
+        blocks = []
+        for block_index, step_metrics in enumerate(training_step_metrics):
+            blocks.append(
+                {"block": block_index, **step_metrics.performance_dict}
+            )
+
+        return JsonResponse(
+            {
+                "training_pass": training_pass.id,
+                "duration_milliseconds": training_pass.duration_milliseconds,
+                "blocks": blocks,
+            }
+        )
@@ -45,7 +45,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
-    "schoolnn",
+    "schoolnn.apps.SchoolnnConfig",
 ]
 
 MIDDLEWARE = [
@@ -82,15 +82,48 @@ WSGI_APPLICATION = "schoolnn_app.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "timeout": 80,
-        "NAME": os.environ.get(
-            "DATABASE", os.path.join(BASE_DIR, "db.sqlite3")
-        ),
+# SQLite by default. Deployments running the web server and training
+# workers in several processes should use DATABASE_ENGINE=postgresql.
+DATABASE_ENGINE = os.environ.get("DATABASE_ENGINE", "sqlite").lower()
+if DATABASE_ENGINE == "postgresql":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get("DATABASE_NAME", "schoolnn"),
+            "USER": os.environ.get("DATABASE_USER", "schoolnn"),
+            "PASSWORD": os.environ.get("DATABASE_PASSWORD", ""),
+            "HOST": os.environ.get("DATABASE_HOST", "localhost"),
+            "PORT": os.environ.get("DATABASE_PORT", "5432"),
+            # Seconds a connection is reused, 0 closes it after each request
+            "CONN_MAX_AGE": int(os.environ.get("DATABASE_CONN_MAX_AGE", "60")),
+            # Set DATABASE_POOLER=pgbouncer behind a transaction pooler,
+            # server side cursors do not survive its connection switching
+            "DISABLE_SERVER_SIDE_CURSORS": bool(
+                os.environ.get("DATABASE_POOLER")
+            ),
+            "OPTIONS": {"connect_timeout": 10},
+        }
     }
-}
+elif DATABASE_ENGINE == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            # Seconds a write waits for another writer, readers never wait
+            # in WAL mode. Training writes are retried afterwards.
+            "timeout": int(os.environ.get("SQLITE_TIMEOUT_SECONDS", "20")),
+            "NAME": os.environ.get(
+                "DATABASE", os.path.join(BASE_DIR, "db.sqlite3")
+            ),
+        }
+    }
+else:
+    print("DATABASE_ENGINE must be sqlite or postgresql.")
+    exit(1)
+# Page cache per SQLite connection and size of memory mapped reads
+SQLITE_CACHE_KIB = int(os.environ.get("SQLITE_CACHE_KIB", str(64 * 1024)))
+SQLITE_MMAP_BYTES = int(
+    os.environ.get("SQLITE_MMAP_BYTES", str(256 * 1024 * 1024))
+)
 
 
 # Password validation
@@ -142,3 +175,42 @@ if not STORAGE:
 os.makedirs(STORAGE, exist_ok=True)
 
 TRAINING_BLOCK_BATCH_COUNT = 16
+# Processes running training passes at the same time
+TRAINING_WORKERS = int(os.environ.get("TRAINING_WORKERS", "1"))
+# CPUs the training processes share, e.g. "0-15,32-47", empty for all
+TRAINING_CPUS = os.environ.get("TRAINING_CPUS", "")
+# CPUs of each training process decoding images, 0 disables the pinning
+TRAINING_DECODE_CPUS = int(os.environ.get("TRAINING_DECODE_CPUS", "0"))
+
+# Snapshots of the metrics of every process, merged by /metrics
+METRICS_DIR = os.path.join(STORAGE, "metrics")
+# If set, /metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+# Profiling mode of new training passes, can be changed per training
+# pass in the admin. The modes are those of schoolnn.models.ProfilingMode.
+TRAINING_PROFILING_MODES = ("off", "python", "tensorflow")
+TRAINING_PROFILING = os.environ.get("TRAINING_PROFILING", "off").lower()
+if TRAINING_PROFILING not in TRAINING_PROFILING_MODES:
+    print(
+        "TRAINING_PROFILING must be one of: {}.".format(
+            ", ".join(TRAINING_PROFILING_MODES)
+        )
+    )
+    exit(1)
+
+# Keras model file of the frozen, pretrained backbone used by projects in
+# transfer learning mode, transfer learning is unavailable if unset
+TRANSFER_BACKBONE = os.environ.get("TRANSFER_BACKBONE", "")
+
+# Seconds browsers may reuse an image without asking the server again
+IMAGE_CACHE_SECONDS = int(
+    os.environ.get("IMAGE_CACHE_SECONDS", str(30 * 24 * 3600))
+)
+# Let the front proxy send image files: "x-sendfile" (Apache, lighttpd) or
+# "x-accel-redirect" (nginx, STORAGE has to be an internal location at
+# IMAGE_ACCEL_REDIRECT_PREFIX). Images in shards are always sent by Django.
+IMAGE_SENDFILE = os.environ.get("IMAGE_SENDFILE", "").lower()
+IMAGE_ACCEL_REDIRECT_PREFIX = os.environ.get(
+    "IMAGE_ACCEL_REDIRECT_PREFIX", "/storage/"
+)
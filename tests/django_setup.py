@@ -2,7 +2,7 @@
 import shutil
 import django
 from dotenv import load_dotenv
-from os import environ, remove, makedirs
+from os import environ, path, remove, makedirs
 from uuid import uuid4
 from django.core.management import call_command
 
@@ -13,14 +13,31 @@ environ.setdefault("STORAGE", TEST_STORAGE)
 environ.setdefault("DATABASE", TEST_DATABASE)
 load_dotenv()
 import schoolnn_app.settings  # noqa: 402
+from django.db import connection  # noqa: 402
+
+# Name of the configured PostgreSQL database, None for SQLite
+_postgresql_database_name = None
 
 
 def setup():
+    global _postgresql_database_name
     django.setup()
-    call_command("migrate")
+    if connection.vendor == "postgresql":
+        # Tests run in a throwaway test_<DATABASE_NAME> database
+        _postgresql_database_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+    else:
+        call_command("migrate")
     makedirs(TEST_STORAGE, exist_ok=True)
 
 
 def teardown():
-    remove(TEST_DATABASE)
+    if _postgresql_database_name is not None:
+        connection.creation.destroy_test_db(
+            _postgresql_database_name, verbosity=0
+        )
+    elif path.exists(TEST_DATABASE):
+        remove(TEST_DATABASE)
     shutil.rmtree(TEST_STORAGE)
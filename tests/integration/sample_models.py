@@ -40,7 +40,7 @@ def _generate_random_images(image_list: List[Image]) -> array:
         arr *= 255
         arr = arr.astype("uint8")
         pil_img = PillowImage.fromarray(arr)
-        pil_img.save(img.path)
+        img.store_pillow(pil_img)
 
 
 def get_sample_model() -> Model:
@@ -61,7 +61,9 @@ def get_sample_model() -> Model:
 _wrapped_arch = WrappedArchitecture.from_keras_model(get_sample_model())
 
 
-def get_test_project(make_images_existing=False) -> Project:
+def get_test_project(
+    make_images_existing=False, packed=False, thumbnails=False
+) -> Project:
     user = User.objects.create(
         username=uuid4().hex,
     )
@@ -72,7 +74,9 @@ def get_test_project(make_images_existing=False) -> Project:
         user=user,
     )
 
-    dataset = Dataset.objects.create(name=uuid4().hex)
+    dataset = Dataset.objects.create(
+        name=uuid4().hex, packed=packed, thumbnails=thumbnails
+    )
     label0 = Label.objects.create(dataset=dataset, name=LABEL_0_NAME)
     label1 = Label.objects.create(dataset=dataset, name=LABEL_1_NAME)
     label2 = Label.objects.create(dataset=dataset, name=LABEL_2_NAME)
@@ -95,9 +99,15 @@ def get_test_project(make_images_existing=False) -> Project:
     return project
 
 
-def get_test_training_pass(make_images_existing=False) -> TrainingPass:
+def get_test_training_pass(
+    make_images_existing=False, packed=False, thumbnails=False
+) -> TrainingPass:
 
-    project = get_test_project(make_images_existing=make_images_existing)
+    project = get_test_project(
+        make_images_existing=make_images_existing,
+        packed=packed,
+        thumbnails=thumbnails,
+    )
 
     training_parameter = TrainingParameter(
         validation_split=VALIDATION_SPLIT,
@@ -0,0 +1,104 @@
+"""Contains tests for the contact sheets of image grids."""
+import os
+from io import BytesIO
+from django.test import Client, override_settings
+from PIL import Image as ImagePillow
+from schoolnn.contact_sheet import (
+    SHEET_COLUMNS,
+    TILE_SIZE,
+    UNLABELED,
+    get_sheet,
+    page_count,
+    page_image_ids,
+    prune_sheets,
+    selection_image_ids,
+    sheet_path,
+)
+from schoolnn.labelling import remove_label
+from schoolnn.models import Dataset, Image, Label
+from .sample_models import get_test_project
+
+
+def _get_dataset(packed: bool) -> Dataset:
+    project = get_test_project(
+        make_images_existing=True, packed=packed, thumbnails=True
+    )
+    # The sample dataset belongs to nobody
+    project.dataset.user = project.user
+    project.dataset.save()
+    return project.dataset
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+def test_contact_sheet():
+    for packed in [False, True]:
+        dataset = _get_dataset(packed=packed)
+        label = Label.objects.filter(dataset=dataset).first()
+        image_count = label.image_set.count()
+        client = Client()
+        client.force_login(dataset.user)
+
+        response = client.get(
+            "/dataset/{}/contactsheet/{}".format(dataset.id, label.id)
+        )
+        assert response.status_code == 200
+        sheet_map = response.json()
+        assert sheet_map["tile_size"] == TILE_SIZE
+        assert len(sheet_map["sheets"]) == page_count([0] * image_count)
+        assert image_count == sum(
+            len(sheet["tiles"]) for sheet in sheet_map["sheets"]
+        )
+        sheet = sheet_map["sheets"][0]
+
+        response = client.get(sheet["url"])
+        assert response.status_code == 200
+        sheet_pil = ImagePillow.open(BytesIO(b"".join(response)))
+        tile_count = len(sheet["tiles"])
+        rows = (tile_count + SHEET_COLUMNS - 1) // SHEET_COLUMNS
+        assert sheet_pil.size == (SHEET_COLUMNS * TILE_SIZE, rows * TILE_SIZE)
+        etag = response["ETag"]
+        assert os.path.exists(sheet_path(dataset, etag.strip('"')))
+
+        response = client.get(sheet["url"], HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+        # Changing the label's images changes the sheet
+        Image.objects.filter(pk=sheet["tiles"][0]["image_id"]).update(
+            label=None
+        )
+        response = client.get(
+            "/dataset/{}/contactsheet/{}".format(dataset.id, label.id)
+        )
+        assert response.json()["sheets"][0]["url"] != sheet["url"]
+        response = client.get(
+            "/dataset/{}/contactsheet/{}".format(dataset.id, UNLABELED)
+        )
+        assert len(response.json()["sheets"][0]["tiles"]) == 1
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+def test_contact_sheet_unknown_selection():
+    dataset = _get_dataset(packed=False)
+    client = Client()
+    client.force_login(dataset.user)
+
+    for selection in ["nothing", "0"]:
+        response = client.get(
+            "/dataset/{}/contactsheet/{}".format(dataset.id, selection)
+        )
+        assert response.status_code == 404
+
+
+def test_relabelling_prunes_outdated_sheets():
+    dataset = _get_dataset(packed=False)
+    label = Label.objects.filter(dataset=dataset, image__isnull=False)[0]
+    image_ids = selection_image_ids(dataset, str(label.id))
+    outdated_sheet = get_sheet(dataset, page_image_ids(image_ids, 0))
+
+    remove_label(label, image_ids[:1])
+    assert not os.path.exists(outdated_sheet)
+
+    # Sheets of current pages stay cached
+    current_sheet = get_sheet(dataset, page_image_ids(image_ids[1:], 0))
+    prune_sheets(dataset)
+    assert os.path.exists(current_sheet)
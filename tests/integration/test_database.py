@@ -0,0 +1,46 @@
+"""Contains tests for the SQLite tuning and retries of locked writes."""
+import pytest
+from django.db import OperationalError, connection
+from schoolnn.database import retry_when_locked
+
+
+@pytest.mark.skipif(connection.vendor != "sqlite", reason="SQLite only")
+def test_sqlite_connection_uses_wal():
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA journal_mode")
+        assert cursor.fetchone()[0] == "wal"
+        cursor.execute("PRAGMA synchronous")
+        assert cursor.fetchone()[0] == 1  # NORMAL
+
+
+def test_retry_when_locked():
+    calls = []
+
+    def write():
+        calls.append(None)
+        if len(calls) < 3:
+            raise OperationalError("database is locked")
+        return "saved"
+
+    assert retry_when_locked(write, backoff_seconds=0) == "saved"
+    assert len(calls) == 3
+
+
+def test_retry_when_locked_gives_up():
+    calls = []
+
+    def locked():
+        calls.append(None)
+        raise OperationalError("database is locked")
+
+    def broken():
+        calls.append(None)
+        raise OperationalError("no such table: schoolnn_image")
+
+    with pytest.raises(OperationalError):
+        retry_when_locked(locked, attempts=2, backoff_seconds=0)
+    assert len(calls) == 2
+
+    with pytest.raises(OperationalError):
+        retry_when_locked(broken, backoff_seconds=0)
+    assert len(calls) == 3
@@ -0,0 +1,63 @@
+"""Contains tests for importing datasets from zip files."""
+from io import BytesIO
+from os import listdir
+from uuid import uuid4
+from zipfile import ZipFile
+from django.test import Client, override_settings
+from PIL import Image as ImagePillow
+from schoolnn.dataset import zip_to_full_dataset
+from schoolnn.models import Dataset, Image, User
+
+
+def _get_zip(image_count: int) -> BytesIO:
+    zip_binary = BytesIO()
+    with ZipFile(zip_binary, "w") as zip_file:
+        for i in range(image_count):
+            image_jpeg = BytesIO()
+            ImagePillow.new("RGB", (300, 200)).save(image_jpeg, "JPEG")
+            zip_file.writestr(
+                "label{}/{}.jpg".format(i % 2, i), image_jpeg.getvalue()
+            )
+        zip_file.writestr("label0/notes.txt", "no image")
+    zip_binary.seek(0)
+    return zip_binary
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+def test_zip_to_packed_dataset_with_thumbnails():
+    user = User.objects.create(username=uuid4().hex)
+    dataset = Dataset.objects.create(name="import", user=user)
+
+    zip_to_full_dataset(_get_zip(6), dataset)
+
+    dataset.refresh_from_db()
+    assert dataset.packed
+    assert dataset.thumbnails
+    assert sorted(listdir(dataset.dir)) == [
+        "index.bin",
+        "shard-0000.bin",
+        "thumbnails-128",
+        "thumbnails-256",
+        "thumbnails-64",
+    ]
+    images = list(Image.objects.filter(dataset=dataset))
+    assert len(images) == 6
+    assert dataset.label_set.count() == 2
+
+    client = Client()
+    client.force_login(user)
+    for requested_size, expected_size in [
+        ("", 200),
+        ("50", 64),
+        ("128", 128),
+        ("1000", 200),
+    ]:
+        response = client.get(
+            "/images/{}?size={}".format(images[0].id, requested_size)
+        )
+        assert response.status_code == 200
+        image_pil = ImagePillow.open(BytesIO(response.content))
+        assert image_pil.size == (expected_size, expected_size)
+
+    response = client.get("/images/{}?size=big".format(images[0].id))
+    assert response.status_code == 400
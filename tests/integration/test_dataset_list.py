@@ -0,0 +1,50 @@
+"""Contains tests for the dataset list."""
+from uuid import uuid4
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from schoolnn.models import Dataset, Image, Label, User
+
+
+def _create_datasets(user: User, count: int):
+    for i in range(count):
+        dataset = Dataset.objects.create(name="list{}".format(i), user=user)
+        label = Label.objects.create(dataset=dataset, name="label")
+        Label.objects.create(dataset=dataset, name="other")
+        Image.objects.create(dataset=dataset, label=label)
+        if i % 2:
+            Image.objects.create(dataset=dataset)
+
+
+def _get_list_query_count(client: Client) -> int:
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get("/dataset/")
+    assert response.status_code == 200
+    return len(queries)
+
+
+def test_with_counts():
+    user = User.objects.create(username=uuid4().hex)
+    _create_datasets(user, 2)
+
+    datasets = Dataset.objects.filter(user=user).with_counts().order_by("id")
+    counts = [
+        (d.image_count, d.unlabeled_count, d.label_count) for d in datasets
+    ]
+    assert counts == [(1, 0, 2), (2, 1, 2)]
+
+    empty = Dataset.objects.create(name="empty", user=user)
+    empty = Dataset.objects.with_counts().get(pk=empty.pk)
+    assert (empty.image_count, empty.unlabeled_count) == (0, 0)
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+def test_dataset_list_query_count():
+    user = User.objects.create(username=uuid4().hex)
+    client = Client()
+    client.force_login(user)
+    _create_datasets(user, 1)
+    query_count = _get_list_query_count(client)
+
+    _create_datasets(user, 20)
+    assert _get_list_query_count(client) == query_count
@@ -0,0 +1,67 @@
+"""Contains tests for serving images."""
+from django.test import Client, RequestFactory, override_settings
+from schoolnn.models import Image
+from schoolnn.views.images import ImageView
+from .sample_models import get_test_project
+
+
+def _get_image(packed: bool) -> Image:
+    project = get_test_project(make_images_existing=True, packed=packed)
+    # The sample dataset belongs to nobody
+    project.dataset.user = project.user
+    project.dataset.save()
+    return Image.objects.filter(dataset=project.dataset).first()
+
+
+def _get_client(image: Image) -> Client:
+    client = Client()
+    client.force_login(image.dataset.user)
+    return client
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+def test_conditional_get():
+    for packed in [False, True]:
+        image = _get_image(packed=packed)
+        client = _get_client(image)
+        url = "/images/{}".format(image.id)
+
+        response = client.get(url)
+        assert response.status_code == 200
+        assert b"".join(response) == image.read_bytes()
+        assert response["Content-Type"] == "image/jpeg"
+        assert "private" in response["Cache-Control"]
+        assert "max-age=" in response["Cache-Control"]
+        etag = response["ETag"]
+        assert etag.startswith('"{}-'.format(image.id))
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert response["ETag"] == etag
+
+        response = client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+        assert response.status_code == 304
+
+        response = client.get(url, HTTP_IF_NONE_MATCH='"other"')
+        assert response.status_code == 200
+
+
+def test_sendfile_modes():
+    image = _get_image(packed=False)
+    request = RequestFactory().get("/images/{}".format(image.id))
+    request.user = image.dataset.user
+
+    view = ImageView.as_view(sendfile="x-sendfile")
+    response = view(request, pk=image.id)
+    assert response["X-Sendfile"] == image.path
+    assert response.content == b""
+
+    view = ImageView.as_view(
+        sendfile="x-accel-redirect", accel_redirect_prefix="/protected/"
+    )
+    response = view(request, pk=image.id)
+    assert response["X-Accel-Redirect"] == "/protected/dataset-{}/{}".format(
+        image.dataset.id, image.filename
+    )
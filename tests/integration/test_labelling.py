@@ -0,0 +1,55 @@
+"""Contains tests for assigning and removing labels of many images."""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from schoolnn import labelling
+from schoolnn.models import Image, Label
+from .sample_models import get_test_project
+
+
+def test_set_and_remove_label(monkeypatch):
+    monkeypatch.setattr(labelling, "LABELLING_CHUNK_SIZE", 100)
+    dataset = get_test_project().dataset
+    label, other_label = Label.objects.filter(dataset=dataset)[:2]
+    image_ids = list(
+        Image.objects.filter(dataset=dataset)
+        .exclude(label=other_label)
+        .values_list("id", flat=True)
+    )
+    assert len(image_ids) > labelling.LABELLING_CHUNK_SIZE
+    chunk_count = (
+        len(image_ids) + labelling.LABELLING_CHUNK_SIZE - 1
+    ) // labelling.LABELLING_CHUNK_SIZE
+
+    notifications = []
+
+    def receiver(sender, dataset_id, image_ids, label_id, **kwargs):
+        notifications.append((dataset_id, len(image_ids), label_id))
+
+    labelling.images_relabeled.connect(receiver)
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            count = labelling.set_label(dataset, image_ids, other_label)
+        assert count == len(image_ids)
+        # Select and update per chunk, independent of the image count
+        assert len(queries) <= 2 * chunk_count + 4
+        assert len(notifications) == chunk_count
+        assert notifications[0][0] == dataset.id
+        assert notifications[0][2] == other_label.id
+        assert not Image.objects.filter(dataset=dataset, label=label).exists()
+
+        notifications.clear()
+        count = labelling.remove_label(label, image_ids)
+        assert count == 0
+        assert notifications == []
+
+        count = labelling.remove_label(other_label, image_ids[:3])
+        assert count == 3
+        assert notifications == [(dataset.id, 3, None)]
+        assert (
+            Image.objects.filter(
+                pk__in=image_ids[:3], label__isnull=True
+            ).count()
+            == 3
+        )
+    finally:
+        labelling.images_relabeled.disconnect(receiver)
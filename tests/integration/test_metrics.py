@@ -0,0 +1,28 @@
+"""Contains tests for the metrics endpoint."""
+from django.test import Client, override_settings
+from schoolnn.instrumentation import DATASET_IMPORT_IMAGES
+from schoolnn.models import TrainingPassState
+from .sample_models import get_test_training_pass
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+def test_metrics_endpoint():
+    get_test_training_pass()
+    DATASET_IMPORT_IMAGES.inc(3)
+
+    response = Client().get("/metrics")
+
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain")
+    text = response.content.decode()
+    assert "# TYPE schoolnn_training_passes gauge" in text
+    assert "# TYPE schoolnn_dataset_import_images_total counter" in text
+    assert "# TYPE schoolnn_inference_stage_seconds histogram" in text
+    # Training pass without status is listed as well
+    assert 'schoolnn_training_passes{status=""}' in text
+    assert (
+        'schoolnn_training_passes{{status="{}"}}'.format(
+            TrainingPassState.RUNNING.value
+        )
+        in text
+    )
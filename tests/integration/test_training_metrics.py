@@ -0,0 +1,118 @@
+"""Contains tests for loading the metrics of training passes."""
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from schoolnn.models import (
+    TrainingPass,
+    TrainingPassState,
+    TrainingStepMetrics,
+)
+from schoolnn.training_metrics import chart_series
+from .sample_models import get_test_training_pass
+
+
+def _add_metrics(training_pass, block_count: int):
+    TrainingStepMetrics.objects.bulk_create(
+        TrainingStepMetrics(
+            training_pass=training_pass,
+            training_loss=1 / (i + 1),
+            training_accuracy=0.5,
+            validation_loss=2 / (i + 1),
+            validation_accuracy=i / block_count,
+        )
+        for i in range(block_count)
+    )
+
+
+def test_chart_series():
+    training_pass = get_test_training_pass()
+    other_training_pass = get_test_training_pass()
+    empty_training_pass = get_test_training_pass()
+    _add_metrics(training_pass, 1000)
+    _add_metrics(other_training_pass, 10)
+    ids = [training_pass.id, other_training_pass.id, empty_training_pass.id]
+
+    with CaptureQueriesContext(connection) as queries:
+        series = chart_series(ids, point_count=100)
+    assert len(queries) == 1
+
+    assert len(series[training_pass.id]["training_loss"]) == 100
+    assert series[training_pass.id]["validation_loss"][0] == [0, 2.0]
+    assert series[training_pass.id]["validation_loss"][-1][0] == 999
+    assert len(series[other_training_pass.id]["training_accuracy"]) == 10
+    assert series[empty_training_pass.id]["validation_accuracy"] == []
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+def test_training_chart_views():
+    training_pass = get_test_training_pass()
+    training_pass.status = TrainingPassState.STOPPED.value
+    training_pass.save()
+    _add_metrics(training_pass, 20)
+    project = training_pass.project
+    client = Client()
+    client.force_login(project.user)
+
+    response = client.get(
+        "/project/{}/training/{}".format(project.id, training_pass.id)
+    )
+    assert response.status_code == 200
+    assert b"chartPoints([[0, 1.0], [1, 0.5], " in response.content
+
+    response = client.get("/project/{}/training/compare".format(project.id))
+    assert response.status_code == 200
+    assert b"suggestedMax: 20" in response.content
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+def test_compare_order_and_filter():
+    training_pass = get_test_training_pass()
+    project = training_pass.project
+    better_training_pass = get_test_training_pass()
+    better_training_pass.project = project
+    better_training_pass.save()
+    _add_metrics(training_pass, 5)
+    _add_metrics(better_training_pass, 50)
+    client = Client()
+    client.force_login(project.user)
+    url = "/project/{}/training/compare".format(project.id)
+
+    passes = list(
+        project.trainingpass_set.with_metrics_summary().order_by("id")
+    )
+    assert [p.block_count for p in passes] == [5, 50]
+    assert [p.best_validation_accuracy for p in passes] == [0.8, 0.98]
+
+    content = client.get(url, {"order": "accuracy"}).content.decode()
+    assert content.index("#{}".format(better_training_pass.id)) < (
+        content.index("#{}".format(training_pass.id))
+    )
+
+    content = client.get(url, {"min_accuracy": "0.9"}).content.decode()
+    assert "#{}<".format(better_training_pass.id) in content
+    assert "#{}<".format(training_pass.id) not in content
+
+    assert client.get(url, {"order": "name"}).status_code == 400
+    assert client.get(url, {"min_accuracy": "x"}).status_code == 400
+
+
+def test_metrics_summary_does_not_group_by_checkpoint():
+    training_pass = get_test_training_pass()
+    empty_training_pass = get_test_training_pass()
+    _add_metrics(training_pass, 4)
+
+    training_passes = TrainingPass.objects.filter(
+        id__in=[training_pass.id, empty_training_pass.id]
+    ).with_metrics_summary()
+    assert "GROUP BY" not in str(training_passes.query).split("FROM")[-1]
+
+    summaries = {
+        tp.id: (
+            tp.block_count,
+            tp.best_validation_accuracy,
+            tp.lowest_validation_loss,
+        )
+        for tp in training_passes
+    }
+    assert summaries[training_pass.id] == (4, 0.75, 0.5)
+    assert summaries[empty_training_pass.id] == (0, None, None)
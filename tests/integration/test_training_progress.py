@@ -0,0 +1,105 @@
+"""Contains tests for streaming the live progress of a training."""
+from django.test import Client, override_settings
+from schoolnn.models import TrainingPassState
+from schoolnn.training.progress import publish_progress
+from schoolnn.views.training import progress
+from .sample_models import get_test_training_pass
+
+
+def _stream(client, url, **headers) -> str:
+    response = client.get(url, **headers)
+    assert response.status_code == 200
+    assert response["Content-Type"] == "text/event-stream"
+    return b"".join(response.streaming_content).decode()
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+def test_progress_streams_events_after_cursor(monkeypatch):
+    monkeypatch.setattr(progress, "STREAM_SECONDS", 0)
+    training_pass = get_test_training_pass()
+    training_pass.status = TrainingPassState.RUNNING.value
+    training_pass.save()
+    for batch in range(3):
+        publish_progress(training_pass.id, "batch", {"batch": batch})
+    events = training_pass.trainingprogressevent_set.order_by("id")
+    first_id, second_id, third_id = events.values_list("id", flat=True)
+    project = training_pass.project
+    client = Client()
+    client.force_login(project.user)
+    url = "/project/{}/training/{}/progress".format(
+        project.id, training_pass.id
+    )
+
+    stream = _stream(client, "{}?cursor={}".format(url, first_id))
+    assert "id: {}\n".format(first_id) not in stream
+    assert (
+        'id: {}\nevent: batch\ndata: {{"batch": 1}}\n\n'.format(second_id)
+        in stream
+    )
+    assert "id: {}\n".format(third_id) in stream
+    assert "event: status\n" in stream
+    assert '"status": "running"' in stream
+
+    # Reconnecting browsers continue after the last event they got
+    stream = _stream(client, url, HTTP_LAST_EVENT_ID=str(second_id))
+    assert "id: {}\n".format(second_id) not in stream
+    assert "id: {}\n".format(third_id) in stream
+
+    response = client.get("{}?cursor=x".format(url))
+    assert response.status_code == 400
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+def test_detail_page_streams_from_latest_event():
+    training_pass = get_test_training_pass()
+    training_pass.status = TrainingPassState.RUNNING.value
+    training_pass.save()
+    publish_progress(training_pass.id, "batch", {"batch": 0})
+    latest_id = training_pass.trainingprogressevent_set.get().id
+    project = training_pass.project
+    client = Client()
+    client.force_login(project.user)
+
+    response = client.get(
+        "/project/{}/training/{}".format(project.id, training_pass.id)
+    )
+    assert response.status_code == 200
+    assert "progress?cursor={}".format(latest_id) in response.content.decode()
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+def test_progress_stream_of_paused_pass_ends():
+    training_pass = get_test_training_pass()
+    training_pass.status = TrainingPassState.PAUSED.value
+    training_pass.save()
+    project = training_pass.project
+    client = Client()
+    client.force_login(project.user)
+
+    stream = _stream(
+        client,
+        "/project/{}/training/{}/progress".format(
+            project.id, training_pass.id
+        ),
+    )
+    assert '"status": "paused"' in stream
+
+
+def test_progress_stream_polls_less_often_without_events(monkeypatch):
+    clock = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        clock[0] += seconds
+
+    monkeypatch.setattr(progress, "time", lambda: clock[0])
+    monkeypatch.setattr(progress, "sleep", sleep)
+    training_pass = get_test_training_pass()
+    training_pass.status = TrainingPassState.RUNNING.value
+    training_pass.save()
+
+    stream = list(progress.progress_stream(training_pass.id, 0, 20))
+    assert sleeps[:5] == [0.5, 1.0, 2.0, 4.0, 5.0]
+    assert sum(sleeps) == 20
+    assert ": keep-alive\n\n" in stream
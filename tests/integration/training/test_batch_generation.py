@@ -89,3 +89,54 @@ class BatchGenerationTestCase(TestCase):
 
         assert actual_batch_count == expected_batch_count
         assert generator_validation.batches_in_queue_not_fetched == 0
+
+    def test_generators_share_decode_pool(self):
+        imgs_training, imgs_validation = get_training_and_validation_images(
+            self.training_pass
+        )
+        generators = [
+            generator_class(
+                image_list=images,
+                training_pass=self.training_pass,
+                image_dimensions=(44, 44),
+                processes_count=2,
+                precalculate_batches_count=4,
+            )
+            for generator_class, images in [
+                (BatchGeneratorTraining, imgs_training),
+                (BatchGeneratorValidation, imgs_validation),
+            ]
+        ]
+        assert generators[0].pool is generators[1].pool
+
+        # Closing a generator drops its batches and keeps the pool running
+        generators[0].reset_batch_count(4)
+        generators[0].close()
+        assert generators[0].batches_in_queue_not_fetched == 0
+        generators[1].reset_batch_count(2)
+        assert len([batch for batch in generators[1]]) == 2
+        generators[1].close()
+
+
+class PackedBatchGenerationTestCase(TestCase):
+    """Test batch generation reading thumbnails from shards."""
+
+    def test_batch_generation_packed(self):
+        training_pass = get_test_training_pass(
+            make_images_existing=True, packed=True, thumbnails=True
+        )
+        imgs_training, _ = get_training_and_validation_images(training_pass)
+
+        generator_training = BatchGeneratorTraining(
+            image_list=imgs_training,
+            training_pass=training_pass,
+            image_dimensions=(44, 44),
+            processes_count=2,
+            precalculate_batches_count=4,
+        )
+        assert generator_training.source_size == 64
+        generator_training.reset_batch_count(4)
+        for x, y in generator_training:
+            assert x.shape == (BATCH_SIZE, 44, 44, 3)
+            assert y.shape == (BATCH_SIZE, LABEL_COUNT)
+        generator_training.close()
@@ -0,0 +1,81 @@
+"""Test cancelling a training block on pause and stop requests."""
+from schoolnn.models import TrainingPassState
+from schoolnn.training.batch_generator import (
+    BatchGeneratorTraining,
+    BatchGeneratorValidation,
+)
+from schoolnn.training.cancellation import cancellation_requested
+from schoolnn.training.do_training_block import do_training_block
+from schoolnn.training.load_dataset import get_training_and_validation_images
+from .test_training_management import _get_training_pass_existing_in_db
+
+
+def _generators(training_pass):
+    training_images, validation_images = get_training_and_validation_images(
+        training_pass
+    )
+    return (
+        BatchGeneratorTraining(
+            image_list=training_images,
+            training_pass=training_pass,
+            image_dimensions=(16, 16),
+        ),
+        BatchGeneratorValidation(
+            image_list=validation_images,
+            training_pass=training_pass,
+            image_dimensions=(16, 16),
+        ),
+    )
+
+
+def test_cancellation_requested():
+    training_pass = _get_training_pass_existing_in_db()
+    assert not cancellation_requested(training_pass.id)
+    training_pass.status = TrainingPassState.STOP_REQUESTED.value
+    training_pass.save()
+    assert cancellation_requested(training_pass.id)
+    training_pass.delete()
+    assert cancellation_requested(training_pass.id)
+
+
+def test_block_ends_after_first_batch_when_pause_requested():
+    training_pass = _get_training_pass_existing_in_db()
+    initial_checkpoint = bytes(training_pass.checkpoint)
+    training_pass.status = TrainingPassState.PAUSE_REQUESTED.value
+    training_pass.save()
+
+    training_generator, validation_generator = _generators(training_pass)
+    with training_generator, validation_generator:
+        metrics = do_training_block(
+            training_pass_to_continue=training_pass,
+            training_generator=training_generator,
+            validation_generator=validation_generator,
+        )
+
+    assert metrics["cancelled"]
+    assert metrics["validation"]["loss"] is None
+    training_pass.refresh_from_db()
+    # Only the images of the trained batch are used up
+    assert training_pass.epoche == 0
+    assert training_pass.epoche_offset == 4
+    assert training_pass.trainingstepmetrics_set.count() == 0
+    assert bytes(training_pass.checkpoint) != initial_checkpoint
+
+
+def test_rewind_across_epoche_end():
+    training_pass = _get_training_pass_existing_in_db()
+    training_generator, _ = _generators(training_pass)
+    image_count = len(training_generator.image_list)
+    training_pass.epoche_offset = image_count - 2
+    with training_generator:
+        training_generator.reset_batch_count(3)
+        training_generator[0]
+        second_batch_x, _ = training_generator[1]
+        training_generator.rewind(1)
+        training_pass.refresh_from_db()
+        assert training_pass.epoche == 1
+        assert training_pass.epoche_offset == 2
+
+        # The second batch is decoded again from the same images
+        training_generator.reset_batch_count(1)
+        assert (training_generator[0][0] == second_batch_x).all()
@@ -0,0 +1,79 @@
+"""Test schoolnn.training.data_parallel."""
+from numpy import array, float32
+from schoolnn.training.batch_generator import (
+    BatchGeneratorTraining,
+    BatchGeneratorValidation,
+)
+from schoolnn.training.data_parallel import (
+    DataParallelTrainer,
+    average_weights,
+)
+from schoolnn.training.do_training_block import (
+    bytes_to_keras_model,
+    do_training_block,
+)
+from schoolnn.training.load_dataset import get_training_and_validation_images
+from .test_training_management import _get_training_pass_existing_in_db
+
+
+def test_average_weights():
+    averaged = average_weights(
+        [
+            [array([1.0, 2.0], dtype=float32), array([0.0], dtype=float32)],
+            [array([3.0, 6.0], dtype=float32), array([4.0], dtype=float32)],
+        ],
+        counts=[3, 1],
+    )
+    assert averaged[0].tolist() == [1.5, 3.0]
+    assert averaged[1].tolist() == [1.0]
+    assert averaged[0].dtype == float32
+
+
+def test_data_parallel_block_keeps_epoche_offset():
+    training_pass = _get_training_pass_existing_in_db()
+    initial_weights = bytes_to_keras_model(
+        training_pass.checkpoint
+    ).get_weights()
+    training_images, validation_images = get_training_and_validation_images(
+        training_pass
+    )
+    image_dimensions = (16, 16)
+    training_generator = BatchGeneratorTraining(
+        image_list=training_images,
+        training_pass=training_pass,
+        image_dimensions=image_dimensions,
+    )
+    validation_generator = BatchGeneratorValidation(
+        image_list=validation_images,
+        training_pass=training_pass,
+        image_dimensions=image_dimensions,
+    )
+    data_parallel = DataParallelTrainer(2)
+    try:
+        for _ in range(2):
+            metrics = do_training_block(
+                training_pass_to_continue=training_pass,
+                training_generator=training_generator,
+                validation_generator=validation_generator,
+                data_parallel=data_parallel,
+            )
+    finally:
+        data_parallel.close()
+        training_generator.close()
+        validation_generator.close()
+
+    assert metrics["performance"]["data_parallel_workers"] == 2
+    assert metrics["training"]["loss"] > 0
+    # Same images per block as serial training: 15 batches of 4
+    training_pass.refresh_from_db()
+    assert training_pass.epoche == 0
+    assert training_pass.epoche_offset == 2 * 15 * 4
+    assert training_pass.trainingstepmetrics_set.count() == 2
+
+    trained_weights = bytes_to_keras_model(
+        training_pass.checkpoint
+    ).get_weights()
+    assert any(
+        (initial != trained).any()
+        for initial, trained in zip(initial_weights, trained_weights)
+    )
@@ -1,6 +1,7 @@
 """Contains tests for schoolnn.trining.inference.py."""
 from io import BytesIO
 from random import shuffle
+import pytest
 from schoolnn.models import (
     Image,
     Label,
@@ -10,8 +11,9 @@ from schoolnn.training.training_management import _initialize_training_pass
 from ..sample_models import get_test_project
 
 
-def test_infere_images():
-    project = get_test_project(make_images_existing=True)
+@pytest.mark.parametrize("packed", [False, True])
+def test_infere_images(packed):
+    project = get_test_project(make_images_existing=True, packed=packed)
     training_pass = _initialize_training_pass(
         project=project,
         training_pass_name="",
@@ -22,9 +24,7 @@ def test_infere_images():
     shuffle(images)
     random_chosen_images = images[:100]
 
-    images_binary = [
-        BytesIO(open(f.path, "rb").read()) for f in random_chosen_images
-    ]
+    images_binary = [BytesIO(f.read_bytes()) for f in random_chosen_images]
 
     inference_result = infere_images(
         training_pass=training_pass,
@@ -0,0 +1,117 @@
+"""Test publishing the live progress of a training."""
+import sqlite3
+from time import time
+import pytest
+from django.db import connection
+from schoolnn.models import TrainingProgressEvent
+from schoolnn.training import progress
+from schoolnn.training.batch_generator import (
+    BatchGeneratorTraining,
+    BatchGeneratorValidation,
+)
+from schoolnn.training.do_training_block import do_training_block
+from schoolnn.training.load_dataset import get_training_and_validation_images
+from schoolnn.training.progress import (
+    ProgressCallback,
+    prune_progress,
+    publish_progress,
+)
+from .test_training_management import _get_training_pass_existing_in_db
+
+
+def test_progress_callback_publishes_batches():
+    training_pass = _get_training_pass_existing_in_db()
+    callback = ProgressCallback(
+        training_pass.id, batch_size=4, interval_seconds=0
+    )
+    callback.set_params({"steps": 3})
+    callback.on_train_begin()
+    callback.on_train_batch_end(0, {"loss": 2.0, "precision": 0.25})
+    callback.on_train_batch_end(1, {"loss": 1.5, "precision": 0.5})
+
+    events = TrainingProgressEvent.objects.filter(
+        training_pass=training_pass
+    ).order_by("id")
+    assert [event.kind for event in events] == ["batch", "batch"]
+    data = events.last().data_json
+    assert data["batch"] == 2
+    assert data["batch_count"] == 3
+    assert data["loss"] == 1.5
+    assert data["accuracy"] == 0.5
+    assert data["images_per_second"] > 0
+
+
+def test_block_is_published_and_old_events_pruned(monkeypatch):
+    monkeypatch.setattr(progress, "PROGRESS_EVENTS_KEPT", 3)
+    training_pass = _get_training_pass_existing_in_db()
+    for batch in range(5):
+        publish_progress(training_pass.id, "batch", {"batch": batch})
+    training_images, validation_images = get_training_and_validation_images(
+        training_pass
+    )
+    training_generator = BatchGeneratorTraining(
+        image_list=training_images,
+        training_pass=training_pass,
+        image_dimensions=(16, 16),
+    )
+    validation_generator = BatchGeneratorValidation(
+        image_list=validation_images,
+        training_pass=training_pass,
+        image_dimensions=(16, 16),
+    )
+    with training_generator, validation_generator:
+        metrics = do_training_block(
+            training_pass_to_continue=training_pass,
+            training_generator=training_generator,
+            validation_generator=validation_generator,
+        )
+
+    events = TrainingProgressEvent.objects.filter(
+        training_pass=training_pass
+    ).order_by("id")
+    assert len(events) == 3
+    block_event = events.last()
+    assert block_event.kind == "block"
+    assert block_event.data_json["block"] == 0
+    assert block_event.data_json["validation"] == metrics["validation"]
+
+
+def test_prune_keeps_events_of_other_passes(monkeypatch):
+    monkeypatch.setattr(progress, "PROGRESS_EVENTS_KEPT", 2)
+    training_pass = _get_training_pass_existing_in_db()
+    other_training_pass = _get_training_pass_existing_in_db()
+    for batch in range(4):
+        publish_progress(training_pass.id, "batch", {"batch": batch})
+        publish_progress(other_training_pass.id, "batch", {"batch": batch})
+    prune_progress(training_pass.id)
+
+    assert [
+        event.data_json["batch"]
+        for event in training_pass.trainingprogressevent_set.order_by("id")
+    ] == [2, 3]
+    assert other_training_pass.trainingprogressevent_set.count() == 4
+
+
+@pytest.mark.skipif(connection.vendor != "sqlite", reason="SQLite only")
+def test_publishing_does_not_wait_for_the_lock():
+    training_pass = _get_training_pass_existing_in_db()
+    other_connection = sqlite3.connect(
+        connection.settings_dict["NAME"], isolation_level=None
+    )
+    other_connection.execute("BEGIN IMMEDIATE")
+    try:
+        publish_start = time()
+        publish_progress(training_pass.id, "batch", {"batch": 0})
+        prune_progress(training_pass.id)
+        assert time() - publish_start < 1
+    finally:
+        other_connection.execute("ROLLBACK")
+        other_connection.close()
+    assert training_pass.trainingprogressevent_set.count() == 0
+
+    # The busy timeout of the connection is restored
+    publish_progress(training_pass.id, "batch", {"batch": 1})
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA busy_timeout")
+        assert cursor.fetchone()[0] > 0
+    assert training_pass.trainingprogressevent_set.count() == 1
@@ -0,0 +1,79 @@
+"""Test successive halving of sweeps."""
+from schoolnn.models import (
+    Sweep,
+    SweepStrategy,
+    TrainingPass,
+    TrainingPassState,
+    TrainingStepMetrics,
+)
+from schoolnn.training.sweeps import advance_sweep
+from schoolnn.training.training_management import _initialize_training_pass
+from schoolnn.views.training.sweep import SweepForm
+from ..sample_models import get_test_project
+
+
+def _paused_sweep(validation_losses, blocks_per_rung: int = 2) -> Sweep:
+    project = get_test_project()
+    sweep = Sweep.objects.create(
+        name="Suche",
+        project=project,
+        strategy=SweepStrategy.GRID.value,
+        search_space_json={"batch_size": [8, 16]},
+        blocks_per_rung=blocks_per_rung,
+    )
+    for i, validation_loss in enumerate(validation_losses):
+        training_pass = _initialize_training_pass(
+            project, "Suche #{}".format(i + 1), sweep=sweep
+        )
+        training_pass.status = TrainingPassState.PAUSED.value
+        training_pass.save()
+        for _ in range(blocks_per_rung):
+            TrainingStepMetrics.objects.create(
+                training_pass=training_pass, validation_loss=validation_loss
+            )
+    return sweep
+
+
+def _statuses(sweep: Sweep) -> list:
+    return [
+        TrainingPassState(training_pass.status)
+        for training_pass in TrainingPass.objects.filter(sweep=sweep)
+        .defer("model_weights")
+        .order_by("id")
+    ]
+
+
+def test_advance_sweep_keeps_better_half():
+    sweep = _paused_sweep([0.9, 0.2, 0.5, 0.4])
+
+    resumed = advance_sweep(sweep)
+    assert sorted(tp.name for tp in resumed) == ["Suche #2", "Suche #4"]
+    assert _statuses(sweep) == [
+        TrainingPassState.STOPPED,
+        TrainingPassState.RESUME_REQUESTED,
+        TrainingPassState.STOPPED,
+        TrainingPassState.RESUME_REQUESTED,
+    ]
+    sweep.refresh_from_db()
+    assert sweep.rung == 1
+    assert sweep.rung_block_limit == 4
+
+    # A second worker must not select again
+    assert advance_sweep(sweep) == []
+
+
+def test_advance_sweep_waits_for_running_passes():
+    sweep = _paused_sweep([0.9, 0.2])
+    training_pass = sweep.trainingpass_set.first()
+    training_pass.status = TrainingPassState.RUNNING.value
+    training_pass.save()
+
+    assert advance_sweep(sweep) == []
+    sweep.refresh_from_db()
+    assert sweep.rung == 0
+
+
+def test_random_search_needs_a_varied_parameter():
+    data = {"name": "Suche", "strategy": "random", "count": 4}
+    assert not SweepForm(dict(data, learning_rates="0.01")).is_valid()
+    assert SweepForm(dict(data, learning_rates="0.01, 0.1")).is_valid()
@@ -6,16 +6,31 @@ from schoolnn.models import (
     TerminationCondition,
     LossFunction,
     Optimizer,
+    LearningRateSchedule,
+    Precision,
+    ProfilingMode,
+    SweepStrategy,
     AugmentationOptions,
+    TrainingPassState,
+    TrainingStepMetrics,
 )
 from ..sample_models import (
     get_test_project,
 )
 
 from schoolnn.training.training_management import (
+    TrainingManager,
     _initialize_training_pass,
     run_job_until_done_or_terminated,
 )
+from schoolnn.training.compile_options import effective_precision
+from schoolnn.training.do_training_block import bytes_to_keras_model
+from schoolnn.training.profiling import profile_zip
+from os import listdir, path
+from queue import Queue
+from pytest import approx
+from schoolnn_app.settings import TRAINING_PROFILING_MODES
+from zipfile import ZipFile
 
 MINIMAL_ARCH = [
     {"type": "Input", "shape": [16, 16, 3]},
@@ -35,7 +50,13 @@ MINIMAL_ARCH = [
 ]
 
 
-def _get_training_pass_existing_in_db() -> TrainingPass:
+def _get_training_pass_existing_in_db(
+    jit_compile: bool = False,
+    precision: Precision = Precision.FLOAT32,
+    learning_rate_schedule: LearningRateSchedule = (
+        LearningRateSchedule.CONSTANT
+    ),
+) -> TrainingPass:
     project = get_test_project(make_images_existing=True)
     project.training_parameter = TrainingParameter(
         validation_split=0.1,
@@ -45,6 +66,9 @@ def _get_training_pass_existing_in_db() -> TrainingPass:
         loss_function=LossFunction.CATEGORICAL_CROSSENTROPY,
         optimizer=Optimizer.SGD,
         augmentation_options=AugmentationOptions.all_activated(),
+        jit_compile=jit_compile,
+        precision=precision,
+        learning_rate_schedule=learning_rate_schedule,
     )
     project.architecture = Architecture.objects.create(
         name="Arch1",
@@ -67,3 +91,127 @@ def test_run_job_until_done_or_terminated():
         training_pass=training_pass,
         verbose=True,
     )
+
+
+def test_run_job_with_compile_options():
+    training_pass = _get_training_pass_existing_in_db(
+        jit_compile=True,
+        precision=Precision.MIXED_BFLOAT16,
+    )
+    run_job_until_done_or_terminated(training_pass=training_pass)
+
+    step_metrics = training_pass.latest_training_step_metrics
+    assert step_metrics.validation_loss is not None
+    assert step_metrics.duration_milliseconds > 0
+    metrics = step_metrics.metrics_dict
+    expected_precision = effective_precision(Precision.MIXED_BFLOAT16).value
+    assert metrics["performance"]["jit_compile"] is True
+    assert metrics["performance"]["precision"] == expected_precision
+    assert metrics["performance"]["step_milliseconds"] > 0
+    assert metrics["performance"]["images_per_second"] > 0
+    assert metrics["performance"]["seconds"]["compute"] > 0
+    assert metrics["performance"]["seconds"]["database_write"] > 0
+
+
+def test_profiling_modes_of_settings():
+    assert TRAINING_PROFILING_MODES == tuple(ProfilingMode.to_array())
+
+
+def test_run_job_with_profiling():
+    training_pass = _get_training_pass_existing_in_db()
+    assert profile_zip(training_pass) is None
+
+    training_pass.profiling = ProfilingMode.TENSORFLOW.value
+    training_pass.save()
+    run_job_until_done_or_terminated(training_pass=training_pass)
+
+    profile_files = listdir(training_pass.profile_dir)
+    assert "block.prof" in profile_files
+    assert any(f.startswith("batch-worker-") for f in profile_files)
+    assert path.isdir(path.join(training_pass.profile_dir, "tensorflow"))
+
+    with ZipFile(profile_zip(training_pass)) as zip_file:
+        names = zip_file.namelist()
+        assert "block.txt" in names
+        assert "do_training_block" in zip_file.read("block.txt").decode()
+
+
+def test_run_job_with_learning_rate_schedule():
+    training_pass = _get_training_pass_existing_in_db(
+        learning_rate_schedule=LearningRateSchedule.COSINE
+    )
+    model = bytes_to_keras_model(training_pass.checkpoint)
+    assert float(model.optimizer.learning_rate) == approx(0.1)
+
+    run_job_until_done_or_terminated(training_pass=training_pass)
+    learning_rates = [
+        step_metrics.performance_dict["learning_rate"]
+        for step_metrics in training_pass.trainingstepmetrics_set.order_by(
+            "id"
+        )
+    ]
+    assert learning_rates[0] == approx(0.1)
+    assert learning_rates[-1] < learning_rates[0]
+    assert learning_rates == sorted(learning_rates, reverse=True)
+
+
+def test_continue_training_pass_keeps_parameters(monkeypatch):
+    monkeypatch.setattr(TrainingManager, "_queue", Queue())
+    training_pass = _get_training_pass_existing_in_db()
+    # As the parameters of a sweep pass, which differ from the project's
+    training_parameter = training_pass.training_parameter
+    training_parameter.batch_size = 8
+    training_parameter.optimizer = Optimizer.ADAM
+    training_parameter.termination_condition.patience = 2
+    training_parameter.termination_condition.min_delta = 0.1
+    training_pass.training_parameter = training_parameter
+    training_pass.status = TrainingPassState.STOPPED.value
+    training_pass.epoche = 2
+    training_pass.save()
+    # Stopped early, the loss did not improve for the last two blocks
+    for validation_loss in (1.0, 1.0, 1.0):
+        TrainingStepMetrics.objects.create(
+            training_pass=training_pass, validation_loss=validation_loss
+        )
+
+    assert TrainingManager().continue_training_pass(training_pass)
+    training_pass.refresh_from_db()
+    assert training_pass.status == TrainingPassState.RESUME_REQUESTED.value
+    continued_parameter = training_pass.training_parameter
+    assert continued_parameter.batch_size == 8
+    assert continued_parameter.optimizer == Optimizer.ADAM
+    continued_condition = continued_parameter.termination_condition
+    assert continued_condition.epochs == 2 + 3
+    assert continued_condition.patience == 2
+    assert continued_condition.min_delta == 0.1
+    # Only the blocks trained after continuing count for early stopping
+    assert not continued_condition.termination_criteria_fulfilled(
+        0, 2, [1.0, 1.0, 1.0, 1.0]
+    )
+    assert continued_condition.termination_criteria_fulfilled(
+        0, 2, [1.0, 1.0, 1.0, 1.0, 1.0, 1.0]
+    )
+
+    # A queued pass is not queued twice
+    assert not TrainingManager().continue_training_pass(training_pass)
+    assert TrainingManager._queue.qsize() == 1
+
+
+def test_sweep_passes_are_compiled_when_started(monkeypatch):
+    monkeypatch.setattr(TrainingManager, "_queue", Queue())
+    project = _get_training_pass_existing_in_db().project
+    sweep = TrainingManager().apply_sweep(
+        project, "Suche", SweepStrategy.GRID, {"batch_size": [4, 8]}
+    )
+    # No model is compiled while the sweep is created
+    assert [
+        training_pass.initial_weights_id
+        for training_pass in sweep.trainingpass_set.all()
+    ] == [None, None]
+    assert TrainingManager._queue.qsize() == 2
+
+    training_pass = TrainingManager._queue.get()
+    run_job_until_done_or_terminated(training_pass=training_pass)
+    training_pass.refresh_from_db()
+    assert training_pass.initial_weights_id is not None
+    assert training_pass.trainingstepmetrics_set.exists()
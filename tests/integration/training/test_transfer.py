@@ -0,0 +1,109 @@
+"""Test schoolnn.training.transfer."""
+from io import BytesIO
+from os import listdir, path
+from tempfile import TemporaryDirectory
+import pytest
+from tensorflow.keras import Sequential, layers
+from schoolnn.models import (
+    Architecture,
+    AugmentationOptions,
+    Image,
+    LossFunction,
+    Optimizer,
+    TerminationCondition,
+    TrainingParameter,
+)
+from schoolnn.training import transfer
+from schoolnn.training.do_training_block import bytes_to_keras_model
+from schoolnn.training.inference import infere_images
+from schoolnn.training.training_management import (
+    _initialize_training_pass,
+    run_job_until_done_or_terminated,
+)
+from ..sample_models import get_test_project
+
+MINIMAL_ARCH = [
+    {"type": "Input", "shape": [16, 16, 3]},
+    {
+        "type": "Conv2D",
+        "activation": "relu",
+        "filters": 256,
+        "strides": [1, 1],
+        "kernel_size": [2, 2],
+        "padding": "valid",
+    },
+    {"type": "Flatten"},
+    {"type": "Dense", "activation": "relu", "units": 16},
+]
+
+
+@pytest.fixture
+def backbone(monkeypatch):
+    """Store a small convolutional backbone as keras model file."""
+    with TemporaryDirectory() as tmp:
+        backbone_path = path.join(tmp, "backbone.keras")
+        Sequential(
+            [
+                layers.Input(shape=(None, None, 3)),
+                layers.Conv2D(filters=8, kernel_size=(3, 3)),
+            ]
+        ).save(backbone_path)
+        monkeypatch.setattr(transfer, "TRANSFER_BACKBONE", backbone_path)
+        yield backbone_path
+
+
+def _get_transfer_learning_project():
+    project = get_test_project(make_images_existing=True)
+    project.training_parameter = TrainingParameter(
+        validation_split=0.1,
+        learning_rate=0.1,
+        termination_condition=TerminationCondition(seconds=5),
+        batch_size=4,
+        loss_function=LossFunction.CATEGORICAL_CROSSENTROPY,
+        optimizer=Optimizer.SGD,
+        augmentation_options=AugmentationOptions.all_activated(),
+        transfer_learning=True,
+    )
+    project.architecture = Architecture.objects.create(
+        name="Arch1",
+        custom="True",
+        architecture_json=MINIMAL_ARCH,
+        user=project.user,
+    )
+    project.save()
+    return project
+
+
+def test_train_head_on_cached_features(backbone, monkeypatch):
+    assert transfer.backbone_available()
+    project = _get_transfer_learning_project()
+    training_pass = _initialize_training_pass(project, "Transfer")
+
+    # Only the head after the Flatten layer is stored
+    head = bytes_to_keras_model(training_pass.checkpoint)
+    assert head.input_shape == (None, 8)
+    assert [layer.units for layer in head.layers] == [16, 3]
+
+    run_job_until_done_or_terminated(training_pass)
+    training_pass.refresh_from_db()
+    assert training_pass.model_weights
+    assert training_pass.latest_training_step_metrics.validation_loss >= 0
+
+    feature_dir = path.join(project.dataset.dir, "features")
+    assert len(listdir(feature_dir)) == 1
+
+    # Cached features are not computed again
+    def fail(image_dimensions):
+        raise AssertionError("Features computed again")
+
+    monkeypatch.setattr(transfer, "feature_extractor", fail)
+    images = list(Image.objects.filter(dataset=project.dataset)[:10])
+    features = transfer.image_features(project.dataset, images, (16, 16))
+    assert features.shape == (10, 8)
+
+    images_binary = [BytesIO(image.read_bytes()) for image in images]
+    monkeypatch.undo()
+    monkeypatch.setattr(transfer, "TRANSFER_BACKBONE", backbone)
+    results = infere_images(training_pass, images_binary)
+    assert len(results) == len(images_binary)
+    assert all(0.0 < result.confidence < 1.0 for result in results)
@@ -0,0 +1,82 @@
+"""Test schoolnn.training.warm_start."""
+from numpy import ones_like
+from schoolnn.models import (
+    Architecture,
+    Label,
+    ModelWeights,
+    TrainingPass,
+    TrainingStepMetrics,
+)
+from schoolnn.training.do_training_block import (
+    bytes_to_keras_model,
+    keras_model_to_bytes,
+)
+from schoolnn.training.training_management import _initialize_training_pass
+from schoolnn.training.warm_start import warm_start_candidates
+from ..sample_models import get_test_project
+
+MINIMAL_ARCH = [
+    {"type": "Input", "shape": [16, 16, 3]},
+    {
+        "type": "Conv2D",
+        "activation": "relu",
+        "filters": 8,
+        "strides": [1, 1],
+        "kernel_size": [2, 2],
+        "padding": "valid",
+    },
+    {"type": "Flatten"},
+    {"type": "Dense", "activation": "relu", "units": 16},
+]
+
+
+def _get_trained_training_pass() -> TrainingPass:
+    """Get a pass with a checkpoint of all weights set to one."""
+    project = get_test_project()
+    project.architecture = Architecture.objects.create(
+        name="Arch1",
+        custom="True",
+        architecture_json=MINIMAL_ARCH,
+        user=project.user,
+    )
+    project.save()
+    training_pass = _initialize_training_pass(project, "Source")
+    model = bytes_to_keras_model(training_pass.checkpoint)
+    for layer in model.layers:
+        layer.set_weights([ones_like(w) for w in layer.get_weights()])
+    training_pass.model_weights = keras_model_to_bytes(model)
+    training_pass.save()
+    TrainingStepMetrics.objects.create(training_pass=training_pass)
+    return training_pass
+
+
+def test_warm_start_shares_checkpoint():
+    source = _get_trained_training_pass()
+    project = source.project
+    assert list(warm_start_candidates(project)) == [source]
+
+    first = _initialize_training_pass(project, "First", source)
+    second = _initialize_training_pass(project, "Second", source)
+    assert first.warm_started_from == source
+    assert first.initial_weights_id == second.initial_weights_id
+    assert bytes(first.checkpoint) == bytes(source.model_weights)
+
+    weights_count = ModelWeights.objects.count()
+    first.delete()
+    assert ModelWeights.objects.count() == weights_count
+    second.delete()
+    assert ModelWeights.objects.count() == weights_count - 1
+
+
+def test_warm_start_with_other_label_count():
+    source = _get_trained_training_pass()
+    project = source.project
+    Label.objects.create(dataset=project.dataset, name="Additional")
+
+    training_pass = _initialize_training_pass(project, "Labels", source)
+    assert training_pass.initial_weights.weights != source.model_weights
+    model = bytes_to_keras_model(training_pass.checkpoint)
+    *hidden_layers, output_layer = model.layers
+    for layer in hidden_layers:
+        assert all((w == 1).all() for w in layer.get_weights())
+    assert not (output_layer.get_weights()[0] == 1).all()
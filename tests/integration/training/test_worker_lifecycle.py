@@ -0,0 +1,118 @@
+"""Test that training runs leave no worker processes behind."""
+import os
+from multiprocessing import get_context
+from time import sleep, time
+from typing import Set
+from django.db.utils import DatabaseError
+from schoolnn.models import TrainingPass, TrainingPassState
+from schoolnn.training import training_management
+from schoolnn.training.do_training_block import do_training_block
+from schoolnn.training.watchdog import exit_with_parent
+from .test_training_management import _get_training_pass_existing_in_db
+
+CYCLES = 100
+# TensorFlow's memory grows during the first real blocks, then stays
+WARM_UP_CYCLES = 40
+
+
+def _process_state(pid: int) -> str:
+    """Get the state letter of a process, "" if it is gone."""
+    try:
+        with open("/proc/{}/stat".format(pid)) as f:
+            return f.read().rsplit(")", 1)[1].split()[0]
+    except OSError:
+        return ""
+
+
+def _child_pids() -> Set[int]:
+    children = set()
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open("/proc/{}/stat".format(entry)) as f:
+                state, ppid = f.read().rsplit(")", 1)[1].split()[:2]
+        except OSError:
+            continue
+        if int(ppid) == os.getpid() and state != "Z":
+            children.add(int(entry))
+    return children
+
+
+def _rss_megabytes() -> float:
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+def _block_pausing_or_failing(
+    training_pass_to_continue, training_generator, **kwargs
+):
+    if training_pass_to_continue.epoche_offset % 2:
+        # Leave an ordered batch behind like a block interrupted in its fit
+        training_generator.reset_batch_count(2)
+        training_generator[0]
+        raise DatabaseError("Save with update_fields did not affect any rows")
+    # A real block, which ends after its first batch as pause is requested
+    TrainingPass.objects.filter(pk=training_pass_to_continue.pk).update(
+        status=TrainingPassState.PAUSE_REQUESTED.value
+    )
+    return do_training_block(
+        training_pass_to_continue=training_pass_to_continue,
+        training_generator=training_generator,
+        **kwargs,
+    )
+
+
+def test_pause_resume_cycles_keep_processes_and_memory(monkeypatch):
+    monkeypatch.setattr(
+        training_management, "do_training_block", _block_pausing_or_failing
+    )
+    training_pass = _get_training_pass_existing_in_db()
+
+    rss_megabytes = []
+    for cycle in range(CYCLES):
+        training_pass.status = TrainingPassState.RESUME_REQUESTED.value
+        # Odd offsets let every other block fail
+        training_pass.epoche_offset = cycle
+        training_pass.save()
+        training_management.run_job_until_done_or_terminated(training_pass)
+        if cycle == WARM_UP_CYCLES - 1:
+            children = _child_pids()
+        if cycle >= WARM_UP_CYCLES - 1:
+            rss_megabytes.append(_rss_megabytes())
+
+    assert _child_pids() == children
+    assert rss_megabytes[-1] - rss_megabytes[0] < 20
+    # Memory must not keep growing, the last half grows less than 5 MB
+    half = len(rss_megabytes) // 2
+    assert rss_megabytes[-1] - rss_megabytes[half] < 5
+
+
+def _start_orphan(pid_queue):
+    process = get_context("fork").Process(target=_orphan, args=(os.getpid(),))
+    process.start()
+    pid_queue.put(process.pid)
+    pid_queue.close()
+    pid_queue.join_thread()
+    # Die without stopping the child
+    os._exit(0)
+
+
+def _orphan(parent_pid: int):
+    exit_with_parent(parent_pid, interval_seconds=0.1)
+    sleep(60)
+
+
+def test_watchdog_ends_orphaned_worker():
+    context = get_context("fork")
+    pid_queue = context.Queue()
+    parent = context.Process(target=_start_orphan, args=(pid_queue,))
+    parent.start()
+    orphan_pid = pid_queue.get(timeout=10)
+    parent.join()
+
+    deadline = time() + 10
+    while _process_state(orphan_pid) not in ("", "Z") and time() < deadline:
+        sleep(0.1)
+    assert _process_state(orphan_pid) in ("", "Z")
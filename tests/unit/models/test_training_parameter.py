@@ -0,0 +1,112 @@
+"""Test training parameter object."""
+from pytest import approx
+from schoolnn.models import (
+    LearningRateSchedule,
+    TrainingParameter,
+    TerminationCondition,
+    LossFunction,
+    Optimizer,
+    Precision,
+    AugmentationOptions,
+)
+from schoolnn.models.training import (
+    PLATEAU_PATIENCE,
+    blocks_without_improvement,
+    plateau_count,
+)
+from schoolnn.resources.static.default_training_parameters import (
+    default_training_parameters,
+)
+
+
+def _get_training_parameter() -> TrainingParameter:
+    return TrainingParameter(
+        validation_split=0.2,
+        learning_rate=0.05,
+        termination_condition=TerminationCondition(seconds=60, epochs=2),
+        batch_size=8,
+        loss_function=LossFunction.CATEGORICAL_CROSSENTROPY,
+        optimizer=Optimizer.ADAM,
+        augmentation_options=AugmentationOptions(),
+        jit_compile=True,
+        precision=Precision.MIXED_BFLOAT16,
+    )
+
+
+def test_training_parameter_from_to_dict():
+    """Dump the compile options and read them back."""
+    dictionary = _get_training_parameter().to_dict()
+    assert dictionary["jit_compile"] is True
+    assert dictionary["precision"] == "mixed_bfloat16"
+
+    restored = TrainingParameter.from_dict(dictionary)
+    assert restored.jit_compile is True
+    assert restored.precision == Precision.MIXED_BFLOAT16
+    assert restored.to_dict() == dictionary
+
+
+def test_training_parameter_from_dict_without_compile_options():
+    """Parameters stored before the compile options existed still load."""
+    dictionary = _get_training_parameter().to_dict()
+    del dictionary["jit_compile"]
+    del dictionary["precision"]
+
+    restored = TrainingParameter.from_dict(dictionary)
+    assert restored.jit_compile is False
+    assert restored.precision == Precision.FLOAT32
+
+
+def test_default_training_parameters():
+    """The defaults are parseable and use float32 without XLA."""
+    parameters = TrainingParameter.from_dict(default_training_parameters())
+    assert parameters.jit_compile is False
+    assert parameters.precision == Precision.FLOAT32
+
+
+def test_from_dict_without_schedules():
+    """Parameters stored before early stopping and schedules still load."""
+    dictionary = _get_training_parameter().to_dict()
+    del dictionary["learning_rate_schedule"]
+    del dictionary["termination_condition"]["patience"]
+    del dictionary["termination_condition"]["min_delta"]
+
+    restored = TrainingParameter.from_dict(dictionary)
+    assert restored.learning_rate_schedule == LearningRateSchedule.CONSTANT
+    assert restored.termination_condition.patience is None
+
+
+def test_blocks_without_improvement():
+    assert blocks_without_improvement([]) == 0
+    assert blocks_without_improvement([1.0, 0.9, 0.95, None, 0.92]) == 2
+    assert blocks_without_improvement([1.0, 0.99, 0.98], min_delta=0.05) == 2
+    assert plateau_count([1.0] * 11, patience=5) == 2
+    assert plateau_count([1.0, 0.9, 0.8, 0.7], patience=1) == 0
+
+
+def test_early_stopping():
+    condition = TerminationCondition(seconds=60, patience=2)
+    assert not condition.termination_criteria_fulfilled(
+        1, 0, validation_losses=[1.0, 0.9, 0.95]
+    )
+    assert condition.termination_criteria_fulfilled(
+        1, 0, validation_losses=[1.0, 0.9, 0.95, 0.91]
+    )
+
+
+def test_scheduled_learning_rate():
+    parameter = _get_training_parameter()
+    condition = parameter.termination_condition
+    assert condition.progress(running_for_seconds=30, epoche=1.5) == 0.75
+    assert TerminationCondition().progress(30, 1) is None
+
+    assert parameter.scheduled_learning_rate([1.0] * 20, 0.5) == 0.05
+
+    parameter.learning_rate_schedule = LearningRateSchedule.COSINE
+    assert parameter.scheduled_learning_rate([], 0.0) == approx(0.05)
+    assert parameter.scheduled_learning_rate([], 0.5) == approx(0.025)
+    assert parameter.scheduled_learning_rate([], 1.0) == approx(0.0005)
+    assert parameter.scheduled_learning_rate([], None) == 0.05
+
+    parameter.learning_rate_schedule = LearningRateSchedule.REDUCE_ON_PLATEAU
+    losses = [1.0] + [1.0] * PLATEAU_PATIENCE
+    assert parameter.scheduled_learning_rate(losses, None) == approx(0.025)
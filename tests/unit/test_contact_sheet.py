@@ -0,0 +1,41 @@
+"""Test schoolnn.contact_sheet."""
+from numpy import arange, uint8
+from schoolnn.contact_sheet import (
+    SHEET_COLUMNS,
+    SHEET_IMAGE_COUNT,
+    TILE_SIZE,
+    Tile,
+    sheet_key,
+    tile_grid,
+    tiles,
+)
+
+
+def test_tile_grid():
+    tile_arrays = (arange(5, dtype=uint8) + 1).reshape(5, 1, 1, 1)
+    tile_arrays = tile_arrays.repeat(2, axis=1).repeat(3, axis=2)
+    grid = tile_grid(tile_arrays, columns=2)
+
+    assert grid.shape == (6, 6, 1)
+    # Every tile keeps its pixels, missing tiles stay black
+    assert grid[0:2, 0:3].min() == grid[0:2, 0:3].max() == 1
+    assert grid[0:2, 3:6].min() == grid[0:2, 3:6].max() == 2
+    assert grid[2:4, 0:3].min() == grid[2:4, 0:3].max() == 3
+    assert grid[4:6, 0:3].min() == grid[4:6, 0:3].max() == 5
+    assert grid[4:6, 3:6].max() == 0
+
+
+def test_tiles():
+    image_ids = list(range(100, 100 + SHEET_IMAGE_COUNT + 1))
+    image_tiles = tiles(image_ids)
+
+    assert image_tiles[100] == Tile(100, 0, 0, 0)
+    assert image_tiles[100 + SHEET_COLUMNS + 1] == Tile(
+        100 + SHEET_COLUMNS + 1, 0, TILE_SIZE, TILE_SIZE
+    )
+    assert image_tiles[100 + SHEET_IMAGE_COUNT].page == 1
+
+
+def test_sheet_key():
+    assert sheet_key([1, 2, 3]) == sheet_key([1, 2, 3])
+    assert sheet_key([1, 2, 3]) != sheet_key([1, 2])
@@ -0,0 +1,116 @@
+"""Contains tests for the in-process metrics."""
+from json import dumps
+from os import getpid, listdir, path
+from tempfile import TemporaryDirectory
+from schoolnn.instrumentation import Registry
+
+# Highest possible pid on Linux is 2^22, this one never exists
+_DEAD_PID = 2 ** 22 + 1
+
+
+def _get_registry(snapshot_dir=None):
+    registry = Registry(snapshot_dir=snapshot_dir)
+    counter = registry.counter("test_total", "A counter.")
+    gauge = registry.gauge("test_fill", "A gauge.")
+    histogram = registry.histogram(
+        "test_seconds", "A histogram.", buckets=(0.1, 1.0, float("inf"))
+    )
+    return registry, counter, gauge, histogram
+
+
+def test_render_text():
+    """Export counters, gauges and histograms."""
+    registry, counter, gauge, histogram = _get_registry()
+    counter.inc()
+    counter.inc(2, stage="a")
+    gauge.set(4, generator="training")
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+
+    lines = registry.render_text().splitlines()
+
+    assert "# TYPE test_total counter" in lines
+    assert "test_total 1.0" in lines
+    assert 'test_total{stage="a"} 2.0' in lines
+    assert "# TYPE test_fill gauge" in lines
+    assert 'test_fill{generator="training"} 4.0' in lines
+    assert "# TYPE test_seconds histogram" in lines
+    assert 'test_seconds_bucket{le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{le="+Inf"} 2' in lines
+    assert "test_seconds_sum 0.55" in lines
+    assert "test_seconds_count 2" in lines
+
+
+def test_collector():
+    """Collectors update gauges right before the export."""
+    registry, _, gauge, _ = _get_registry()
+    registry.register_collector(lambda: gauge.set(7))
+    assert "test_fill 7.0" in registry.render_text().splitlines()
+
+
+def test_merge_snapshots_of_other_processes():
+    """Sum counters of all processes, gauges only of living ones."""
+    with TemporaryDirectory() as snapshot_dir:
+        other_registry, counter, gauge, histogram = _get_registry()
+        counter.inc(3)
+        gauge.set(5)
+        histogram.observe(2.0)
+        snapshot_path = path.join(snapshot_dir, "{}.json".format(_DEAD_PID))
+        with open(snapshot_path, "w") as f:
+            f.write(dumps(other_registry.snapshot()))
+
+        registry, counter, gauge, histogram = _get_registry(snapshot_dir)
+        counter.inc(1)
+        gauge.set(1)
+        histogram.observe(0.5)
+        registry.flush()  # own snapshot must not be counted twice
+
+        lines = registry.render_text().splitlines()
+
+        assert "test_total 4.0" in lines
+        assert "test_fill 1.0" in lines
+        assert 'test_seconds_bucket{le="1.0"} 1' in lines
+        assert 'test_seconds_bucket{le="+Inf"} 2' in lines
+        assert "test_seconds_count 2" in lines
+
+
+def test_retire_dead_snapshots():
+    """Keep counters of dead processes when their pids are reused."""
+    with TemporaryDirectory() as snapshot_dir:
+        registry, counter, gauge, _ = _get_registry(snapshot_dir)
+        counter.inc()
+        gauge.set(2)
+        dead_snapshot_path = path.join(
+            snapshot_dir, "{}.json".format(_DEAD_PID)
+        )
+        stray_path = path.join(snapshot_dir, "backup.json")
+        for snapshot_path in (dead_snapshot_path, stray_path):
+            with open(snapshot_path, "w") as f:
+                f.write(dumps(registry.snapshot()))
+        registry.flush()
+
+        lines = registry.render_text().splitlines()
+
+        assert "test_total 2.0" in lines
+        assert "test_fill 2.0" in lines
+        assert set(listdir(snapshot_dir)) == {
+            ".lock",
+            "backup.json",
+            "retired.json",
+            "{}.json".format(getpid()),
+        }
+
+        # The snapshot of a new process reusing the pid is added up
+        with open(dead_snapshot_path, "w") as f:
+            f.write(dumps(registry.snapshot()))
+        registry.retire_dead_snapshots()
+
+        assert "test_total 3.0" in registry.render_text().splitlines()
+
+
+def test_reset():
+    registry, counter, _, _ = _get_registry()
+    counter.inc()
+    registry.reset()
+    assert "test_total 1.0" not in registry.render_text().splitlines()
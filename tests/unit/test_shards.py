@@ -0,0 +1,65 @@
+"""Test schoolnn.shards."""
+from os import listdir
+from schoolnn.shards import (
+    INDEX_ENTRY,
+    ShardReader,
+    ShardWriter,
+    index_path,
+    read_pointer,
+)
+
+
+def test_write_and_read_records(tmp_path):
+    dataset_dir = str(tmp_path)
+    with ShardWriter(dataset_dir) as writer:
+        pointer = writer.append(1, 7, b"first")
+        writer.append(2, None, b"second")
+
+    assert read_pointer(pointer) == b"first"
+    reader = ShardReader(dataset_dir)
+    assert len(reader) == 2
+    assert reader.read(1) == b"first"
+    assert reader.read(2) == b"second"
+    assert 3 not in reader
+
+
+def test_reader_sees_appended_records(tmp_path):
+    dataset_dir = str(tmp_path)
+    with ShardWriter(dataset_dir) as writer:
+        writer.append(1, 1, b"a" * 100)
+    reader = ShardReader(dataset_dir)
+    assert reader.read(1) == b"a" * 100
+
+    with ShardWriter(dataset_dir) as writer:
+        writer.append(2, 1, b"b" * 100)
+        # Written twice, the later record wins
+        writer.append(1, 2, b"c" * 10)
+    # The miss of image 2 reloads the index
+    assert reader.read(2) == b"b" * 100
+    assert reader.read(1) == b"c" * 10
+
+
+def test_shard_rotation(tmp_path):
+    dataset_dir = str(tmp_path)
+    with ShardWriter(dataset_dir, shard_max_bytes=64) as writer:
+        for image_id in range(10):
+            writer.append(image_id, 1, bytes([image_id]) * 40)
+
+    # Two records of 60 bytes including the header fit into one shard
+    shard_files = [f for f in listdir(dataset_dir) if f.startswith("shard")]
+    assert len(shard_files) == 5
+    reader = ShardReader(dataset_dir)
+    for image_id in range(10):
+        assert reader.read(image_id) == bytes([image_id]) * 40
+
+
+def test_partially_written_index_entry_is_ignored(tmp_path):
+    dataset_dir = str(tmp_path)
+    with ShardWriter(dataset_dir) as writer:
+        writer.append(1, 1, b"complete")
+    with open(index_path(dataset_dir), "ab") as f:
+        f.write(INDEX_ENTRY.pack(2, 0, 0, 5)[:10])
+
+    reader = ShardReader(dataset_dir)
+    assert len(reader) == 1
+    assert reader.read(1) == b"complete"
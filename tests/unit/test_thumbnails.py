@@ -0,0 +1,24 @@
+"""Test schoolnn.thumbnails."""
+from io import BytesIO
+from PIL import Image as ImagePillow
+from schoolnn.thumbnails import nearest_thumbnail_size, thumbnail_jpegs
+
+
+def test_nearest_thumbnail_size():
+    assert nearest_thumbnail_size(32) == 64
+    assert nearest_thumbnail_size(64) == 64
+    assert nearest_thumbnail_size(65) == 128
+    assert nearest_thumbnail_size(224) == 256
+    assert nearest_thumbnail_size(300) is None
+
+
+def test_thumbnail_jpegs():
+    image_pil = ImagePillow.new("RGB", (200, 200), color=(10, 200, 30))
+    thumbnails = thumbnail_jpegs(image_pil)
+
+    sizes = {
+        size: ImagePillow.open(BytesIO(jpeg)).size
+        for size, jpeg in thumbnails.items()
+    }
+    # Smaller images are not enlarged
+    assert sizes == {64: (64, 64), 128: (128, 128), 256: (200, 200)}
@@ -0,0 +1,34 @@
+"""Test the downsampling of schoolnn.training_metrics."""
+from numpy import arange, sin, zeros
+from schoolnn.training_metrics import chart_points, lttb_indices
+
+
+def test_lttb_indices_short_series():
+    assert list(lttb_indices(arange(5, dtype=float), 10)) == list(range(5))
+
+
+def test_lttb_indices():
+    y_values = sin(arange(1000) / 50)
+    indices = lttb_indices(y_values, 100)
+
+    assert len(indices) == 100
+    assert indices[0] == 0
+    assert indices[-1] == 999
+    assert all(indices[1:] > indices[:-1])
+    # Peaks survive the downsampling
+    assert abs(y_values[indices].max() - y_values.max()) < 0.01
+    assert abs(y_values[indices].min() - y_values.min()) < 0.01
+
+
+def test_lttb_keeps_spike():
+    y_values = zeros(1000)
+    y_values[537] = 5
+    assert 537 in lttb_indices(y_values, 50)
+
+
+def test_chart_points():
+    assert chart_points(arange(3, dtype=float) / 2, 10) == [
+        [0, 0.0],
+        [1, 0.5],
+        [2, 1.0],
+    ]
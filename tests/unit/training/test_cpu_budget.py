@@ -0,0 +1,39 @@
+"""Test the splitting of CPUs between training and decode workers."""
+import tensorflow
+from schoolnn.training.cpu_budget import (
+    CpuBudget,
+    cpu_budgets,
+    limit_threads,
+    parse_cpu_list,
+    split_cpus,
+)
+
+
+def test_parse_cpu_list():
+    assert parse_cpu_list("0-3,8, 10-11") == [0, 1, 2, 3, 8, 10, 11]
+    assert parse_cpu_list("") == []
+
+
+def test_split_cpus_contiguous():
+    assert split_cpus(range(10), 3) == [(0, 1, 2, 3), (4, 5, 6), (7, 8, 9)]
+    assert split_cpus([0, 1], 3) == [(0,), (1,), (0,)]
+
+
+def test_cpu_budgets():
+    assert cpu_budgets(range(8), 2, 1) == [
+        CpuBudget(compute_cpus=(1, 2, 3), decode_cpus=(0,)),
+        CpuBudget(compute_cpus=(5, 6, 7), decode_cpus=(4,)),
+    ]
+    # TensorFlow keeps a CPU, decoding shares it
+    assert cpu_budgets([0, 1], 2, 4) == [
+        CpuBudget(compute_cpus=(0,), decode_cpus=(0,)),
+        CpuBudget(compute_cpus=(1,), decode_cpus=(1,)),
+    ]
+
+
+def test_limit_threads_warns_after_tensorflow_started(caplog, monkeypatch):
+    monkeypatch.setenv("OMP_NUM_THREADS", "")
+    # Executing an operation initializes the thread pools
+    tensorflow.constant(1.0) + 1.0
+    limit_threads([0])
+    assert "not limited to 1 threads" in caplog.text
@@ -0,0 +1,49 @@
+"""Test the parameter sets of sweeps."""
+from schoolnn.models import SweepStrategy
+from schoolnn.training.sweeps import parameter_sets
+
+BASE = {
+    "batch_size": 8,
+    "learning_rate": 0.01,
+    "optimizer": "adam",
+    "augmentation_options": {"flip": False},
+}
+
+
+def test_grid_search_combines_all_values():
+    search_space = {
+        "batch_size": [8, 32],
+        "optimizer": ["adam", "sgd", "nadam"],
+        "learning_rate": [],
+    }
+    parameter_dicts = parameter_sets(BASE, search_space, SweepStrategy.GRID)
+    assert len(parameter_dicts) == 6
+    assert {(p["batch_size"], p["optimizer"]) for p in parameter_dicts} == {
+        (batch_size, optimizer)
+        for batch_size in [8, 32]
+        for optimizer in ["adam", "sgd", "nadam"]
+    }
+    assert all(p["learning_rate"] == 0.01 for p in parameter_dicts)
+    assert BASE["batch_size"] == 8
+
+
+def test_grid_search_varies_augmentation():
+    parameter_dicts = parameter_sets(
+        BASE, {"augmentation": [True, False]}, SweepStrategy.GRID
+    )
+    assert any(parameter_dicts[0]["augmentation_options"].values())
+    assert not any(parameter_dicts[1]["augmentation_options"].values())
+
+
+def test_random_search_draws_learning_rate_in_range():
+    search_space = {"learning_rate": [0.001, 0.1], "batch_size": [8, 16]}
+    parameter_dicts = parameter_sets(
+        BASE, search_space, SweepStrategy.RANDOM, count=20, seed=1
+    )
+    assert len(parameter_dicts) == 20
+    assert all(0.001 <= p["learning_rate"] <= 0.1 for p in parameter_dicts)
+    assert len({p["learning_rate"] for p in parameter_dicts}) > 2
+    assert {p["batch_size"] for p in parameter_dicts} <= {8, 16}
+    assert parameter_dicts == parameter_sets(
+        BASE, search_space, SweepStrategy.RANDOM, count=20, seed=1
+    )
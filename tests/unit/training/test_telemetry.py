@@ -0,0 +1,29 @@
+"""Contains tests for the block telemetry."""
+from time import sleep
+from schoolnn.training.telemetry import BlockPhase, BlockTelemetry
+
+
+def test_block_telemetry_measure():
+    """Measured and added durations are summed up per phase."""
+    telemetry = BlockTelemetry()
+    with telemetry.measure(BlockPhase.VALIDATION):
+        sleep(0.01)
+    telemetry.add(BlockPhase.COMPUTE, 2.0)
+    telemetry.add(BlockPhase.DATA_WAIT, 2.0)
+    telemetry.add(BlockPhase.COMPUTE, 4.0)
+    telemetry.images_trained = 80
+
+    dictionary = telemetry.to_dict()
+
+    assert set(dictionary["seconds"]) == set(BlockPhase.to_array())
+    assert dictionary["seconds"][BlockPhase.VALIDATION] >= 0.01
+    assert dictionary["seconds"][BlockPhase.COMPUTE] == 6.0
+    assert dictionary["seconds"][BlockPhase.MODEL_LOAD] == 0.0
+    assert dictionary["images_per_second"] == 10.0
+    assert dictionary["total_seconds"] >= 0.01
+    assert dictionary["peak_rss_megabytes"] > 0
+
+
+def test_block_telemetry_without_training():
+    """No division by zero if nothing was trained."""
+    assert BlockTelemetry().to_dict()["images_per_second"] == 0.0